@@ -0,0 +1,159 @@
+from typing import Any, Callable, Dict, List, Optional
+import logging
+import os
+import select
+import threading
+
+import orjson
+import psycopg2
+import psycopg2.extensions
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from adapters.user_client import clear_user_role_caches, clear_user_role_ids_cache, invalidate_user_role_caches
+
+logger = logging.getLogger(__name__)
+
+CACHE_INVALIDATION_CHANNEL = "farms_cache_invalidation"
+CACHE_INVALIDATION_ENABLED = os.getenv("CACHE_INVALIDATION_ENABLED", "true").lower() in ("1", "true", "yes")
+# Seconds between checks of the stop flag while waiting for notifications
+_POLL_INTERVAL = 1.0
+_MAX_RECONNECT_DELAY = 30.0
+
+USER_ROLE_EVENT = "user_role"
+FARM_EVENT = "farm"
+PLOT_EVENT = "plot"
+
+_handlers: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {}
+_reset_handlers: List[Callable[[], None]] = []
+
+def register_invalidation_handler(kind: str, handler: Callable[[Dict[str, Any]], None]):
+    """Registers a function that evicts local state when an event of `kind` is received."""
+    _handlers.setdefault(kind, []).append(handler)
+
+def register_reset_handler(handler: Callable[[], None]):
+    """
+    Registers a function that drops all local state. It is called when the
+    listener (re)connects, since notifications sent while disconnected are lost.
+    """
+    _reset_handlers.append(handler)
+
+def publish_invalidation(db: Session, kind: str, **keys: Any):
+    """
+    Queues an invalidation event on the current transaction.
+
+    Postgres delivers NOTIFY messages only when the transaction commits (and
+    drops them on rollback), so this must be called before `db.commit()`.
+    Every worker, including this one, evicts the matching keys when it
+    receives the event. With the listener disabled the event is applied to
+    this process only, right after the commit.
+    """
+    payload = orjson.dumps({"kind": kind, **keys}).decode()
+    if not CACHE_INVALIDATION_ENABLED:
+        _dispatch_after_commit(db, payload)
+        return
+    db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CACHE_INVALIDATION_CHANNEL, "payload": payload})
+
+def _dispatch_after_commit(db: Session, payload: str):
+    def on_commit(session):
+        event.remove(db, "after_soft_rollback", on_rollback)
+        handle_invalidation(payload)
+
+    def on_rollback(session, previous_transaction):
+        event.remove(db, "after_commit", on_commit)
+
+    event.listen(db, "after_commit", on_commit, once=True)
+    event.listen(db, "after_soft_rollback", on_rollback, once=True)
+
+def handle_invalidation(payload: str):
+    """Dispatches a received notification payload to the registered handlers."""
+    try:
+        event = orjson.loads(payload)
+    except orjson.JSONDecodeError:
+        logger.warning(f"Ignoring malformed cache invalidation payload: {payload!r}")
+        return
+    for handler in _handlers.get(event.get("kind"), []):
+        try:
+            handler(event)
+        except Exception as e:
+            logger.error(f"Cache invalidation handler for '{event.get('kind')}' failed: {e}")
+
+def _reset_all():
+    for handler in _reset_handlers:
+        try:
+            handler()
+        except Exception as e:
+            logger.error(f"Cache reset handler failed: {e}")
+
+class InvalidationListener(threading.Thread):
+    """
+    Background thread that LISTENs on the invalidation channel with its own
+    connection and applies every notification to the local caches. It
+    reconnects with backoff if the connection drops.
+    """
+
+    def __init__(self, connect: Callable[[], Any], channel: str = CACHE_INVALIDATION_CHANNEL):
+        super().__init__(name="cache-invalidation-listener", daemon=True)
+        self._connect = connect
+        self.channel = channel
+        self._stop_event = threading.Event()
+        self.listening = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        delay = 1.0
+        while not self._stop_event.is_set():
+            connection = None
+            try:
+                connection = self._connect()
+                connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.channel}")
+                # Anything cached before (re)connecting may have missed notifications
+                _reset_all()
+                self.listening.set()
+                delay = 1.0
+                logger.info(f"Listening for cache invalidations on channel '{self.channel}'")
+                while not self._stop_event.is_set():
+                    if select.select([connection], [], [], _POLL_INTERVAL) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        handle_invalidation(connection.notifies.pop(0).payload)
+            except Exception as e:
+                self.listening.clear()
+                logger.error(f"Cache invalidation listener error: {e}; reconnecting in {delay:.0f}s")
+                self._stop_event.wait(delay)
+                delay = min(delay * 2, _MAX_RECONNECT_DELAY)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+
+def start_invalidation_listener(engine) -> Optional[InvalidationListener]:
+    """Starts the listener thread for the given SQLAlchemy engine, unless disabled."""
+    if not CACHE_INVALIDATION_ENABLED:
+        logger.info("Cache invalidation listener disabled")
+        return None
+    connect_args = engine.url.translate_connect_args(username="user", database="dbname")
+    listener = InvalidationListener(lambda: psycopg2.connect(client_encoding="utf8", **connect_args))
+    listener.start()
+    return listener
+
+def _invalidate_user_role(event: Dict[str, Any]):
+    invalidate_user_role_caches(user_id=event.get("user_id"), user_role_id=event.get("user_role_id"))
+    if event.get("new_user_role_ids") and event.get("user_id") is None:
+        # New user_roles of unknown users (attached by the user service): any cached list may be missing them
+        clear_user_role_ids_cache()
+
+def _invalidate_farm_roles(event: Dict[str, Any]):
+    for user_role_id in event.get("user_role_ids", []):
+        invalidate_user_role_caches(user_role_id=user_role_id)
+
+register_invalidation_handler(USER_ROLE_EVENT, _invalidate_user_role)
+register_invalidation_handler(FARM_EVENT, _invalidate_farm_roles)
+register_reset_handler(clear_user_role_caches)
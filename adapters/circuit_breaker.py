@@ -0,0 +1,155 @@
+from collections import deque
+from typing import Any, Callable, Dict, List
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+CIRCUIT_BREAKER_FAILURE_RATE = float(os.getenv("USER_SERVICE_CB_FAILURE_RATE", "0.5"))
+CIRCUIT_BREAKER_WINDOW_SIZE = int(os.getenv("USER_SERVICE_CB_WINDOW_SIZE", "20"))
+CIRCUIT_BREAKER_MINIMUM_CALLS = int(os.getenv("USER_SERVICE_CB_MINIMUM_CALLS", "10"))
+CIRCUIT_BREAKER_OPEN_SECONDS = float(os.getenv("USER_SERVICE_CB_OPEN_SECONDS", "30"))
+CIRCUIT_BREAKER_HALF_OPEN_CALLS = int(os.getenv("USER_SERVICE_CB_HALF_OPEN_CALLS", "3"))
+
+class CircuitBreaker:
+    """
+    Count-based circuit breaker for a single upstream operation.
+
+    While closed, the outcome of the last `window_size` calls is kept. Once at
+    least `minimum_calls` have been recorded and the failure rate reaches
+    `failure_rate_threshold`, the breaker opens and rejects calls immediately
+    for `open_duration` seconds. It then moves to half-open and lets up to
+    `half_open_max_calls` trial calls through: if all of them succeed the
+    breaker closes again, and any failure re-opens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = CIRCUIT_BREAKER_FAILURE_RATE,
+        window_size: int = CIRCUIT_BREAKER_WINDOW_SIZE,
+        minimum_calls: int = CIRCUIT_BREAKER_MINIMUM_CALLS,
+        open_duration: float = CIRCUIT_BREAKER_OPEN_SECONDS,
+        half_open_max_calls: int = CIRCUIT_BREAKER_HALF_OPEN_CALLS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_calls = min(minimum_calls, window_size)
+        self.open_duration = open_duration
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._window = deque(maxlen=window_size)
+        self._state = CLOSED
+        self._opened_at = None
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+        self._successes = 0
+        self._failures = 0
+        self._rejected = 0
+        self._times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh_state()
+            return self._state
+
+    def _refresh_state(self):
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_duration:
+            self._transition(HALF_OPEN)
+
+    def _transition(self, state: str):
+        logger.warning(f"Circuit breaker '{self.name}' changed from {self._state} to {state}")
+        self._state = state
+        if state == OPEN:
+            self._opened_at = self._clock()
+            self._times_opened += 1
+        elif state == CLOSED:
+            self._window.clear()
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+
+    def _failure_rate(self) -> float:
+        if not self._window:
+            return 0.0
+        return self._window.count(False) / len(self._window)
+
+    def allow_request(self) -> bool:
+        """Returns True if a call may proceed, False if it must fail fast."""
+        with self._lock:
+            self._refresh_state()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._half_open_in_flight < self.half_open_max_calls:
+                self._half_open_in_flight += 1
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._successes += 1
+            if self._state == HALF_OPEN:
+                self._half_open_successes += 1
+                if self._half_open_successes >= self.half_open_max_calls:
+                    self._transition(CLOSED)
+            elif self._state == CLOSED:
+                self._window.append(True)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN:
+                self._transition(OPEN)
+            elif self._state == CLOSED:
+                self._window.append(False)
+                if len(self._window) >= self.minimum_calls and self._failure_rate() >= self.failure_rate_threshold:
+                    self._transition(OPEN)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh_state()
+            return {
+                "name": self.name,
+                "state": self._state,
+                "failure_rate": round(self._failure_rate(), 4),
+                "window_calls": len(self._window),
+                "successes": self._successes,
+                "failures": self._failures,
+                "rejected": self._rejected,
+                "times_opened": self._times_opened,
+                "open_remaining_seconds": (
+                    round(max(0.0, self.open_duration - (self._clock() - self._opened_at)), 3)
+                    if self._state == OPEN else 0.0
+                ),
+            }
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Returns the circuit breaker for an upstream operation, creating it on first use."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+def get_circuit_breaker_metrics() -> List[Dict[str, Any]]:
+    """Returns the metrics of every circuit breaker created so far."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [breaker.metrics() for breaker in sorted(breakers, key=lambda b: b.name)]
+
+def reset_circuit_breakers():
+    """Removes every circuit breaker. Intended for tests."""
+    with _breakers_lock:
+        _breakers.clear()
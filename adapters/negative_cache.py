@@ -0,0 +1,115 @@
+from collections import OrderedDict
+from typing import Callable
+import hashlib
+import os
+import threading
+import time
+
+INVALID_TOKEN_CACHE_TTL_SECONDS = float(os.getenv("INVALID_TOKEN_CACHE_TTL_SECONDS", "30"))
+INVALID_TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("INVALID_TOKEN_CACHE_MAX_ENTRIES", "100000"))
+
+class NegativeCache:
+    """
+    Short-lived set of values known to be invalid (e.g. session tokens that
+    the user service rejected).
+
+    Values are stored as SHA-256 digests, never in clear text. A bloom-style
+    bit array in front of the dictionary answers "definitely not cached" for
+    valid tokens without touching the dictionary or its lock. Entries expire
+    after `ttl` seconds and the cache never holds more than `max_entries`;
+    the oldest entries are evicted first.
+    """
+
+    def __init__(
+        self,
+        ttl: float = INVALID_TOKEN_CACHE_TTL_SECONDS,
+        max_entries: int = INVALID_TOKEN_CACHE_MAX_ENTRIES,
+        bloom_bits: int = 1 << 20,
+        bloom_hashes: int = 4,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.bloom_bits = bloom_bits
+        self.bloom_hashes = bloom_hashes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._expires: "OrderedDict[bytes, float]" = OrderedDict()
+        self._bloom = bytearray(bloom_bits // 8)
+        self._bloom_insertions = 0
+        self.prefilter_rejections = 0
+        self.hits = 0
+
+    @staticmethod
+    def _digest(value: str) -> bytes:
+        return hashlib.sha256(value.encode("utf-8")).digest()
+
+    def _bit_positions(self, digest: bytes):
+        # The digest is already uniformly distributed: slice it into independent hash values
+        for i in range(self.bloom_hashes):
+            yield int.from_bytes(digest[i * 4:(i + 1) * 4], "big") % self.bloom_bits
+
+    def _bloom_add(self, digest: bytes):
+        for position in self._bit_positions(digest):
+            self._bloom[position >> 3] |= 1 << (position & 7)
+        self._bloom_insertions += 1
+
+    def _bloom_may_contain(self, digest: bytes) -> bool:
+        bloom = self._bloom
+        return all(bloom[position >> 3] & (1 << (position & 7)) for position in self._bit_positions(digest))
+
+    def _purge_expired(self, now: float):
+        while self._expires:
+            expires_at = next(iter(self._expires.values()))
+            if expires_at > now:
+                break
+            self._expires.popitem(last=False)
+        # Bits cannot be removed from a bloom filter: rebuild it once most of its insertions are gone
+        if self._bloom_insertions > 2 * len(self._expires) + 1024:
+            self._bloom = bytearray(self.bloom_bits // 8)
+            self._bloom_insertions = 0
+            for digest in self._expires:
+                self._bloom_add(digest)
+
+    def add(self, value: str):
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        digest = self._digest(value)
+        with self._lock:
+            now = self._clock()
+            self._expires.pop(digest, None)
+            self._expires[digest] = now + self.ttl
+            if len(self._expires) > self.max_entries:
+                self._purge_expired(now)
+                while len(self._expires) > self.max_entries:
+                    self._expires.popitem(last=False)
+            self._bloom_add(digest)
+
+    def contains(self, value: str) -> bool:
+        digest = self._digest(value)
+        if not self._bloom_may_contain(digest):
+            self.prefilter_rejections += 1
+            return False
+        with self._lock:
+            expires_at = self._expires.get(digest)
+            if expires_at is None:
+                return False
+            if expires_at <= self._clock():
+                del self._expires[digest]
+                return False
+            self.hits += 1
+            return True
+
+    def discard(self, value: str):
+        with self._lock:
+            self._expires.pop(self._digest(value), None)
+
+    def clear(self):
+        with self._lock:
+            self._expires.clear()
+            self._bloom = bytearray(self.bloom_bits // 8)
+            self._bloom_insertions = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._expires)
@@ -0,0 +1,319 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+import os
+
+import numpy as np
+
+from adapters.cache_invalidation import PLOT_EVENT, register_invalidation_handler, register_reset_handler
+from adapters.ttl_cache import RefreshingTTLCache
+
+logger = logging.getLogger(__name__)
+
+PLOT_CLUSTER_CACHE_TTL_SECONDS = float(os.getenv("PLOT_CLUSTER_CACHE_TTL_SECONDS", "300"))
+PLOT_CLUSTER_CACHE_MAX_ENTRIES = int(os.getenv("PLOT_CLUSTER_CACHE_MAX_ENTRIES", "5000"))
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+MAX_CLUSTER_PRECISION = 8
+MAX_CLUSTER_ZOOM = 22
+# Clusters are computed and cached per tile: a geohash cell this many characters shorter than the clusters
+TILE_PRECISION_OFFSET = 1
+# Width of a cluster cell relative to the width of a 256 px map tile at the requested zoom
+CELLS_PER_MAP_TILE = 8
+
+# (farm_id, coffee_variety_id, latitude, longitude)
+PlotRow = Tuple[int, int, float, float]
+# (farm_id, coffee_variety_id, latitude grid index, longitude grid index, plot count, latitude sum, longitude sum)
+CellRow = Tuple[int, int, int, int, int, float, float]
+
+
+def _bits(precision: int) -> Tuple[int, int]:
+    """Longitude and latitude bits of a geohash of `precision` characters."""
+    bits = 5 * precision
+    return (bits + 1) // 2, bits // 2
+
+
+def precision_for_zoom(zoom: int) -> int:
+    """
+    Geohash precision of the clusters for a map zoom level: the shortest
+    geohash whose cells are at most 1/CELLS_PER_MAP_TILE of a map tile wide.
+    """
+    tile_width = 360.0 / (2 ** zoom)
+    for precision in range(1, MAX_CLUSTER_PRECISION + 1):
+        lon_bits, _ = _bits(precision)
+        if 360.0 / (2 ** lon_bits) <= tile_width / CELLS_PER_MAP_TILE:
+            return precision
+    return MAX_CLUSTER_PRECISION
+
+
+def grid_size(precision: int) -> Tuple[int, int]:
+    """
+    Number of (latitude, longitude) grid cells of geohashes of `precision`
+    characters. The grid index of a coordinate is
+    `floor((latitude + 90) / 180 * latitude_cells)` (likewise for longitude),
+    so plots can be grouped by cell in SQL.
+    """
+    lon_bits, lat_bits = _bits(precision)
+    return 2 ** lat_bits, 2 ** lon_bits
+
+
+def tile_precision(precision: int) -> int:
+    return max(1, precision - TILE_PRECISION_OFFSET)
+
+
+def _grid_index(values, low: float, span: float, bits: int) -> np.ndarray:
+    cells = 2 ** bits
+    index = np.floor((np.asarray(values, dtype=np.float64) - low) / span * cells)
+    return np.clip(index, 0, cells - 1).astype(np.int64)
+
+
+def _interleave(lon_index: np.ndarray, lat_index: np.ndarray, precision: int) -> np.ndarray:
+    """Integer geohash codes: longitude and latitude bits interleaved, longitude first."""
+    lon_bits, lat_bits = _bits(precision)
+    codes = np.zeros(np.shape(lon_index), dtype=np.int64)
+    for i in range(lon_bits + lat_bits):
+        if i % 2 == 0:
+            bit = (lon_index >> (lon_bits - 1 - i // 2)) & 1
+        else:
+            bit = (lat_index >> (lat_bits - 1 - i // 2)) & 1
+        codes = (codes << 1) | bit
+    return codes
+
+
+def geohash_codes(latitudes, longitudes, precision: int) -> np.ndarray:
+    """Vectorized geohash encoding of coordinate arrays, as integers of 5 bits per character."""
+    lon_bits, lat_bits = _bits(precision)
+    return _interleave(
+        _grid_index(longitudes, -180.0, 360.0, lon_bits),
+        _grid_index(latitudes, -90.0, 180.0, lat_bits),
+        precision
+    )
+
+
+def geohash_string(code: int, precision: int) -> str:
+    return "".join(GEOHASH_ALPHABET[(int(code) >> (5 * (precision - 1 - i))) & 31] for i in range(precision))
+
+
+def geohash(latitude: float, longitude: float, precision: int) -> str:
+    return geohash_string(geohash_codes([latitude], [longitude], precision)[0], precision)
+
+
+def geohash_code(value: str) -> int:
+    code = 0
+    for char in value:
+        code = (code << 5) | GEOHASH_ALPHABET.index(char)
+    return code
+
+
+def tile_bounds(tile: str) -> Tuple[float, float, float, float]:
+    """(min_latitude, min_longitude, max_latitude, max_longitude) of a geohash cell."""
+    code = geohash_code(tile)
+    lon_bits, lat_bits = _bits(len(tile))
+    lon_index = lat_index = 0
+    for i in range(lon_bits + lat_bits):
+        bit = (code >> (lon_bits + lat_bits - 1 - i)) & 1
+        if i % 2 == 0:
+            lon_index = (lon_index << 1) | bit
+        else:
+            lat_index = (lat_index << 1) | bit
+    lat_size = 180.0 / (2 ** lat_bits)
+    lon_size = 360.0 / (2 ** lon_bits)
+    return (
+        -90.0 + lat_index * lat_size,
+        -180.0 + lon_index * lon_size,
+        -90.0 + (lat_index + 1) * lat_size,
+        -180.0 + (lon_index + 1) * lon_size
+    )
+
+
+def covering_tiles(min_latitude: float, min_longitude: float, max_latitude: float, max_longitude: float, precision: int) -> List[str]:
+    """
+    Geohash cells of `precision` characters that cover the rectangle. If
+    `min_longitude` is greater than `max_longitude` the rectangle crosses the
+    antimeridian.
+    """
+    lon_bits, lat_bits = _bits(precision)
+    lat_range = np.arange(
+        _grid_index(min_latitude, -90.0, 180.0, lat_bits), _grid_index(max_latitude, -90.0, 180.0, lat_bits) + 1
+    )
+    first_lon = int(_grid_index(min_longitude, -180.0, 360.0, lon_bits))
+    last_lon = int(_grid_index(max_longitude, -180.0, 360.0, lon_bits))
+    if first_lon <= last_lon:
+        lon_range = np.arange(first_lon, last_lon + 1)
+    else:
+        lon_range = np.concatenate([np.arange(first_lon, 2 ** lon_bits), np.arange(0, last_lon + 1)])
+    lon_index, lat_index = np.meshgrid(lon_range, lat_range)
+    codes = _interleave(lon_index.ravel(), lat_index.ravel(), precision)
+    return [geohash_string(code, precision) for code in codes]
+
+
+def count_covering_tiles(min_latitude: float, min_longitude: float, max_latitude: float, max_longitude: float, precision: int) -> int:
+    lon_bits, lat_bits = _bits(precision)
+    lat_count = int(_grid_index(max_latitude, -90.0, 180.0, lat_bits) - _grid_index(min_latitude, -90.0, 180.0, lat_bits)) + 1
+    first_lon = int(_grid_index(min_longitude, -180.0, 360.0, lon_bits))
+    last_lon = int(_grid_index(max_longitude, -180.0, 360.0, lon_bits))
+    lon_count = last_lon - first_lon + 1 if first_lon <= last_lon else 2 ** lon_bits - first_lon + last_lon + 1
+    return lat_count * lon_count
+
+
+class TileClusters:
+    """
+    Plot counts of one tile grouped by (farm, cluster cell, coffee variety),
+    with the coordinate sums needed for the centroids. Keeping the farm lets
+    one cached tile serve every user, each seeing only their own farms.
+    """
+
+    __slots__ = ("farm_ids", "cells", "variety_ids", "counts", "latitude_sums", "longitude_sums", "farms")
+
+    def __init__(self, farm_ids, cells, variety_ids, counts, latitude_sums, longitude_sums):
+        self.farm_ids = farm_ids
+        self.cells = cells
+        self.variety_ids = variety_ids
+        self.counts = counts
+        self.latitude_sums = latitude_sums
+        self.longitude_sums = longitude_sums
+        self.farms = frozenset(int(farm_id) for farm_id in np.unique(farm_ids))
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[PlotRow], precision: int, tile: Optional[str] = None) -> "TileClusters":
+        """Bins the plots of a tile into cluster cells. Plots outside `tile` (on its upper edges) are dropped."""
+        data = np.array([tuple(map(float, row)) for row in rows], dtype=np.float64).reshape(-1, 4)
+        latitudes, longitudes = data[:, 2], data[:, 3]
+        return cls._aggregate(
+            data[:, 0].astype(np.int64),
+            data[:, 1].astype(np.int64),
+            geohash_codes(latitudes, longitudes, precision),
+            np.ones(len(data)),
+            latitudes,
+            longitudes,
+            precision,
+            tile
+        )
+
+    @classmethod
+    def from_cell_rows(cls, rows: Iterable[CellRow], precision: int, tile: Optional[str] = None) -> "TileClusters":
+        """
+        Builds the tile from plots already grouped by (farm, coffee variety,
+        grid cell), e.g. by the database. Cells outside `tile` are dropped.
+        """
+        data = np.array([tuple(map(float, row)) for row in rows], dtype=np.float64).reshape(-1, 7)
+        lat_cells, lon_cells = grid_size(precision)
+        # A coordinate on the +90/+180 edge falls one past the last cell
+        lat_index = np.clip(data[:, 2].astype(np.int64), 0, lat_cells - 1)
+        lon_index = np.clip(data[:, 3].astype(np.int64), 0, lon_cells - 1)
+        return cls._aggregate(
+            data[:, 0].astype(np.int64),
+            data[:, 1].astype(np.int64),
+            _interleave(lon_index, lat_index, precision),
+            data[:, 4],
+            data[:, 5],
+            data[:, 6],
+            precision,
+            tile
+        )
+
+    @classmethod
+    def _aggregate(cls, farm_ids, variety_ids, cells, counts, latitude_sums, longitude_sums, precision: int, tile: Optional[str]) -> "TileClusters":
+        if tile is not None and len(cells):
+            inside = (cells >> (5 * (precision - len(tile)))) == geohash_code(tile)
+            farm_ids, variety_ids, cells, counts, latitude_sums, longitude_sums = (
+                farm_ids[inside], variety_ids[inside], cells[inside], counts[inside], latitude_sums[inside], longitude_sums[inside]
+            )
+
+        keys, inverse = np.unique(np.stack([farm_ids, cells, variety_ids], axis=1), axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        return cls(
+            keys[:, 0],
+            keys[:, 1],
+            keys[:, 2],
+            np.bincount(inverse, weights=counts, minlength=len(keys)).astype(np.int64),
+            np.bincount(inverse, weights=latitude_sums, minlength=len(keys)),
+            np.bincount(inverse, weights=longitude_sums, minlength=len(keys))
+        )
+
+
+def merge_clusters(tiles: Iterable[TileClusters], farm_ids: Iterable[int], precision: int) -> List[Dict[str, Any]]:
+    """
+    Combines the tiles into one cluster per cell, counting only the plots of
+    `farm_ids`. Each cluster has its plot count, centroid and dominant coffee
+    variety (the one with most plots; ties go to the lowest id). Clusters are
+    ordered by geohash.
+    """
+    tiles = [tile for tile in tiles if len(tile.cells)]
+    if not tiles:
+        return []
+    def column(name):
+        return np.concatenate([getattr(tile, name) for tile in tiles])
+
+    keep = np.isin(column("farm_ids"), np.fromiter(farm_ids, dtype=np.int64))
+    cells = column("cells")[keep]
+    variety_ids = column("variety_ids")[keep]
+    counts = column("counts")[keep]
+    latitude_sums = column("latitude_sums")[keep]
+    longitude_sums = column("longitude_sums")[keep]
+    if not len(cells):
+        return []
+
+    unique_cells, cell_index = np.unique(cells, return_inverse=True)
+    cell_counts = np.bincount(cell_index, weights=counts)
+    latitudes = np.bincount(cell_index, weights=latitude_sums) / cell_counts
+    longitudes = np.bincount(cell_index, weights=longitude_sums) / cell_counts
+
+    # Plots per (cell, variety), then the variety with most plots of each cell
+    unique_varieties, variety_index = np.unique(variety_ids, return_inverse=True)
+    pairs, pair_index = np.unique(cell_index * len(unique_varieties) + variety_index, return_inverse=True)
+    pair_counts = np.bincount(pair_index, weights=counts)
+    pair_cells = pairs // len(unique_varieties)
+    pair_varieties = unique_varieties[pairs % len(unique_varieties)]
+    order = np.lexsort((pair_varieties, -pair_counts, pair_cells))
+    first = order[np.r_[True, pair_cells[order][1:] != pair_cells[order][:-1]]]
+    dominant = pair_varieties[first]
+
+    return [
+        {
+            "geohash": geohash_string(unique_cells[i], precision),
+            "count": int(cell_counts[i]),
+            "latitude": round(float(latitudes[i]), 6),
+            "longitude": round(float(longitudes[i]), 6),
+            "dominant_coffee_variety_id": int(dominant[i])
+        }
+        for i in range(len(unique_cells))
+    ]
+
+
+# Key: (precision, tile geohash)
+plot_cluster_cache = RefreshingTTLCache(
+    "plot_clusters",
+    ttl=PLOT_CLUSTER_CACHE_TTL_SECONDS,
+    refresh_ahead=0,
+    stale_grace=0,
+    max_entries=PLOT_CLUSTER_CACHE_MAX_ENTRIES
+)
+
+
+def get_tile_clusters(precision: int, tile: str, loader: Callable[[str], Iterable[CellRow]]) -> TileClusters:
+    """
+    Cached clusters of a tile. `loader(tile)` returns the active plots inside
+    the tile bounds grouped by farm, coffee variety and grid cell of `precision`
+    (see `grid_size`), so a tile costs at most one row per farm, variety and
+    cluster cell whatever the number of plots.
+    """
+    return plot_cluster_cache.get((precision, tile), lambda: TileClusters.from_cell_rows(loader(tile), precision, tile))
+
+
+def _invalidate_plot_tiles(event: Dict[str, Any]):
+    farm_id = event.get("farm_id")
+    if event.get("plot_id") is None:
+        # Bulk change of a farm: its new plots may fall in any tile
+        plot_cluster_cache.clear()
+        return
+    point = None
+    if event.get("latitude") is not None and event.get("longitude") is not None:
+        point = geohash(event["latitude"], event["longitude"], MAX_CLUSTER_PRECISION)
+    # Tiles with plots of the farm (the plot may have moved out of them) and tiles at its new position
+    plot_cluster_cache.invalidate_where(
+        lambda key, tile: farm_id in tile.farms or (point is not None and point.startswith(key[1]))
+    )
+
+
+register_invalidation_handler(PLOT_EVENT, _invalidate_plot_tiles)
+register_reset_handler(plot_cluster_cache.clear)
@@ -0,0 +1,223 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+import threading
+
+import numpy as np
+
+from adapters.cache_invalidation import (
+    FARM_EVENT,
+    PLOT_EVENT,
+    publish_invalidation,
+    register_invalidation_handler,
+    register_reset_handler,
+)
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+
+# (farm_id, plot_id, name, latitude, longitude)
+PlotPoint = Tuple[int, int, str, float, float]
+
+class _FarmPoints:
+    """Coordinates of the active plots of one farm, with NumPy arrays rebuilt lazily after changes."""
+
+    __slots__ = ("plots", "plot_ids", "names", "lat", "lon", "cos_lat", "dirty")
+
+    def __init__(self):
+        self.plots: Dict[int, Tuple[str, float, float]] = {}
+        self.dirty = True
+
+    def arrays(self):
+        if self.dirty:
+            items = list(self.plots.items())
+            self.plot_ids = np.fromiter((plot_id for plot_id, _ in items), dtype=np.int64, count=len(items))
+            self.names = [name for _, (name, _, _) in items]
+            self.lat = np.radians(np.fromiter((lat for _, (_, lat, _) in items), dtype=np.float64, count=len(items)))
+            self.lon = np.radians(np.fromiter((lon for _, (_, _, lon) in items), dtype=np.float64, count=len(items)))
+            self.cos_lat = np.cos(self.lat)
+            self.dirty = False
+        return self.plot_ids, self.names, self.lat, self.lon, self.cos_lat
+
+def haversine_km(lat1: float, lon1: float, lat2: np.ndarray, lon2: np.ndarray, cos_lat2: Optional[np.ndarray] = None) -> np.ndarray:
+    """Great-circle distances in km from one point (degrees) to arrays of points (radians)."""
+    lat1 = np.radians(lat1)
+    lon1 = np.radians(lon1)
+    if cos_lat2 is None:
+        cos_lat2 = np.cos(lat2)
+    a = np.sin((lat2 - lat1) / 2.0) ** 2 + np.cos(lat1) * cos_lat2 * np.sin((lon2 - lon1) / 2.0) ** 2
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+class PlotSpatialIndex:
+    """
+    In-memory index of active plot coordinates, partitioned by farm, for
+    k-nearest-neighbour queries.
+
+    A farm is loaded from the database the first time it is queried (one
+    indexed query per batch of missing farms) and kept in memory afterwards.
+    Plot changes are applied incrementally through the cache invalidation
+    bus (PLOT_EVENT), so every worker stays up to date without reloading.
+    An event for the whole farm (e.g. a bulk import) drops that farm, which
+    is then reloaded on the next query.
+
+    A query concatenates the arrays of the requested farms, computes the
+    haversine distance to every candidate and selects the k closest with
+    `np.argpartition`, so its cost is linear in the plots of those farms and
+    never touches the plots table once they are loaded.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._farms: Dict[int, _FarmPoints] = {}
+        # Incremented on every change to a farm, so that loads that raced with a change are not stored
+        self._generations: Dict[int, int] = {}
+        self.loads = 0
+
+    def _ensure_loaded(self, farm_ids: List[int], loader: Callable[[List[int]], Iterable[PlotPoint]]) -> Dict[int, _FarmPoints]:
+        with self._lock:
+            missing = [farm_id for farm_id in farm_ids if farm_id not in self._farms]
+            generations = {farm_id: self._generations.get(farm_id, 0) for farm_id in missing}
+            loaded = {farm_id: self._farms[farm_id] for farm_id in farm_ids if farm_id in self._farms}
+        if not missing:
+            return loaded
+
+        fresh = {farm_id: _FarmPoints() for farm_id in missing}
+        for farm_id, plot_id, name, latitude, longitude in loader(missing):
+            fresh[farm_id].plots[plot_id] = (name, float(latitude), float(longitude))
+        self.loads += 1
+
+        with self._lock:
+            for farm_id, points in fresh.items():
+                current = self._farms.get(farm_id)
+                if current is not None:
+                    # Loaded concurrently by another request
+                    points = current
+                elif self._generations.get(farm_id, 0) == generations[farm_id]:
+                    self._farms[farm_id] = points
+                loaded[farm_id] = points
+        return loaded
+
+    def nearest(
+        self,
+        farm_ids: Iterable[int],
+        latitude: float,
+        longitude: float,
+        k: int,
+        loader: Callable[[List[int]], Iterable[PlotPoint]],
+        max_distance_km: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Returns up to `k` plots of the given farms closest to the point,
+        ordered by distance. `loader(farm_ids)` must return the active plots
+        with coordinates of farms that are not in memory yet.
+        """
+        farm_ids = list(dict.fromkeys(farm_ids))
+        if not farm_ids or k <= 0:
+            return []
+        farms = self._ensure_loaded(farm_ids, loader)
+
+        with self._lock:
+            parts = [(farm_id, farms[farm_id].arrays()) for farm_id in farm_ids if farms[farm_id].plots]
+        if not parts:
+            return []
+
+        plot_ids = np.concatenate([arrays[0] for _, arrays in parts])
+        lat = np.concatenate([arrays[2] for _, arrays in parts])
+        lon = np.concatenate([arrays[3] for _, arrays in parts])
+        cos_lat = np.concatenate([arrays[4] for _, arrays in parts])
+        farm_of = np.concatenate([np.full(len(arrays[0]), farm_id, dtype=np.int64) for farm_id, arrays in parts])
+        names = [name for _, arrays in parts for name in arrays[1]]
+
+        distances = haversine_km(latitude, longitude, lat, lon, cos_lat)
+        candidates = np.arange(len(distances))
+        if max_distance_km is not None:
+            candidates = candidates[distances <= max_distance_km]
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(distances[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(distances[candidates], kind="stable")]
+
+        return [
+            {
+                "plot_id": int(plot_ids[i]),
+                "farm_id": int(farm_of[i]),
+                "name": names[i],
+                "latitude": float(np.degrees(lat[i])),
+                "longitude": float(np.degrees(lon[i])),
+                "distance_km": round(float(distances[i]), 4)
+            }
+            for i in candidates
+        ]
+
+    def upsert_plot(self, farm_id: int, plot_id: int, name: str, latitude: Optional[float], longitude: Optional[float]):
+        """Adds or moves an active plot. Plots without coordinates are removed from the index."""
+        if latitude is None or longitude is None:
+            self.remove_plot(farm_id, plot_id)
+            return
+        with self._lock:
+            self._generations[farm_id] = self._generations.get(farm_id, 0) + 1
+            points = self._farms.get(farm_id)
+            if points is not None:
+                points.plots[plot_id] = (name, float(latitude), float(longitude))
+                points.dirty = True
+
+    def remove_plot(self, farm_id: int, plot_id: int):
+        with self._lock:
+            self._generations[farm_id] = self._generations.get(farm_id, 0) + 1
+            points = self._farms.get(farm_id)
+            if points is not None and points.plots.pop(plot_id, None) is not None:
+                points.dirty = True
+
+    def evict_farm(self, farm_id: int):
+        with self._lock:
+            self._generations[farm_id] = self._generations.get(farm_id, 0) + 1
+            self._farms.pop(farm_id, None)
+
+    def clear(self):
+        with self._lock:
+            for farm_id in self._farms:
+                self._generations[farm_id] = self._generations.get(farm_id, 0) + 1
+            self._farms.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(points.plots) for points in self._farms.values())
+
+plot_spatial_index = PlotSpatialIndex()
+
+def _apply_plot_event(event: Dict[str, Any]):
+    farm_id = event.get("farm_id")
+    plot_id = event.get("plot_id")
+    if farm_id is None:
+        return
+    if plot_id is None:
+        plot_spatial_index.evict_farm(farm_id)
+    elif event.get("active"):
+        plot_spatial_index.upsert_plot(farm_id, plot_id, event.get("name"), event.get("latitude"), event.get("longitude"))
+    else:
+        plot_spatial_index.remove_plot(farm_id, plot_id)
+
+def _evict_farm(event: Dict[str, Any]):
+    if event.get("farm_id") is not None:
+        plot_spatial_index.evict_farm(event["farm_id"])
+
+register_invalidation_handler(PLOT_EVENT, _apply_plot_event)
+register_invalidation_handler(FARM_EVENT, _evict_farm)
+register_reset_handler(plot_spatial_index.clear)
+
+def _as_float(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+def publish_plot_change(db, plot, active: bool = True):
+    """
+    Queues a PLOT_EVENT with the plot's current name and coordinates on the
+    current transaction (call it before `db.commit()`, after the plot has an id).
+    """
+    publish_invalidation(
+        db, PLOT_EVENT,
+        farm_id=plot.farm_id,
+        plot_id=plot.plot_id,
+        name=plot.name,
+        latitude=_as_float(plot.latitude),
+        longitude=_as_float(plot.longitude),
+        active=active
+    )
@@ -0,0 +1,80 @@
+from typing import Callable
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+USER_SERVICE_MAX_RETRIES = int(os.getenv("USER_SERVICE_MAX_RETRIES", "2"))
+USER_SERVICE_RETRY_BASE_DELAY = float(os.getenv("USER_SERVICE_RETRY_BASE_DELAY", "0.1"))
+USER_SERVICE_RETRY_MAX_DELAY = float(os.getenv("USER_SERVICE_RETRY_MAX_DELAY", "1.0"))
+USER_SERVICE_RETRY_BUDGET_RATIO = float(os.getenv("USER_SERVICE_RETRY_BUDGET_RATIO", "0.2"))
+USER_SERVICE_RETRY_BUDGET_MIN_PER_SECOND = float(os.getenv("USER_SERVICE_RETRY_BUDGET_MIN_PER_SECOND", "1"))
+
+def backoff_delay(
+    attempt: int,
+    base_delay: float = USER_SERVICE_RETRY_BASE_DELAY,
+    max_delay: float = USER_SERVICE_RETRY_MAX_DELAY,
+    rng: Callable[[float, float], float] = random.uniform
+) -> float:
+    """
+    Returns the delay before retry number `attempt` (starting at 0) using
+    "full jitter": a random value between 0 and the capped exponential backoff.
+    """
+    return rng(0.0, min(max_delay, base_delay * (2 ** attempt)))
+
+class RetryBudget:
+    """
+    Token bucket that caps retries to a fraction of the regular traffic.
+
+    Every first attempt deposits `ratio` tokens and every retry withdraws one,
+    so retries can add at most `ratio` extra load on top of the normal request
+    rate. A small time-based refill (`min_per_second`) keeps retries possible
+    when traffic is low. During an outage the bucket drains and retries stop,
+    instead of multiplying the load on the struggling service.
+    """
+
+    def __init__(
+        self,
+        ratio: float = USER_SERVICE_RETRY_BUDGET_RATIO,
+        min_per_second: float = USER_SERVICE_RETRY_BUDGET_MIN_PER_SECOND,
+        capacity: float = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity if capacity is not None else max(1.0, 10 * min_per_second)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._last_refill = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.min_per_second)
+        self._last_refill = now
+
+    def record_request(self):
+        """Registers a first attempt, which earns credit for future retries."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def try_acquire(self) -> bool:
+        """Withdraws one token for a retry; returns False if the budget is exhausted."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+retry_budget = RetryBudget()
@@ -0,0 +1,185 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from jose import JWTError, jwt
+
+from domain.schemas import UserResponse
+
+logger = logging.getLogger(__name__)
+
+# "remote" (default) asks the user service for every token; "local" verifies signed tokens in-process
+SESSION_TOKEN_VERIFICATION = os.getenv("SESSION_TOKEN_VERIFICATION", "remote").lower()
+SESSION_TOKEN_KEY = os.getenv("SESSION_TOKEN_KEY")
+SESSION_TOKEN_KEY_FILE = os.getenv("SESSION_TOKEN_KEY_FILE")
+SESSION_TOKEN_ALGORITHMS = [a.strip() for a in os.getenv("SESSION_TOKEN_ALGORITHMS", "RS256").split(",") if a.strip()]
+SESSION_TOKEN_ISSUER = os.getenv("SESSION_TOKEN_ISSUER")
+SESSION_TOKEN_AUDIENCE = os.getenv("SESSION_TOKEN_AUDIENCE")
+SESSION_TOKEN_REVOCATION_CHECK_SECONDS = float(os.getenv("SESSION_TOKEN_REVOCATION_CHECK_SECONDS", "60"))
+# Upper bound on the tokens whose revocation state is tracked
+SESSION_TOKEN_TRACKED_MAX_ENTRIES = 100000
+
+_revocation_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="token-revocation")
+
+class _TokenState:
+    __slots__ = ("expires_at", "next_check", "checking")
+
+    def __init__(self, expires_at: float, next_check: float):
+        self.expires_at = expires_at
+        self.next_check = next_check
+        self.checking = False
+
+class LocalTokenVerifier:
+    """
+    Verifies signed session tokens (JWS/JWT) without calling the user service.
+
+    The signature, expiry and (if configured) issuer and audience are checked
+    locally, and the user is built from the `user_id` (or `sub`), `name` and
+    `email` claims. A signed token stays valid until it expires even if the
+    session is closed, so every token seen is also checked against the user
+    service in the background, at most once every `revocation_check_interval`
+    seconds. A token the user service rejects is remembered as revoked until
+    its own expiry. If the user service cannot be reached the token keeps
+    being accepted and is checked again on the next interval.
+
+    `remote_check(token)` must return True if the user service accepts the
+    token, False if it rejects it, and raise if it gives no answer.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        remote_check: Callable[[str], bool],
+        algorithms: Optional[List[str]] = None,
+        issuer: Optional[str] = None,
+        audience: Optional[str] = None,
+        revocation_check_interval: float = SESSION_TOKEN_REVOCATION_CHECK_SECONDS,
+        max_entries: int = SESSION_TOKEN_TRACKED_MAX_ENTRIES,
+        clock: Callable[[], float] = time.time,
+        executor: Optional[ThreadPoolExecutor] = None
+    ):
+        self.key = key
+        self.algorithms = algorithms or SESSION_TOKEN_ALGORITHMS
+        self.issuer = issuer
+        self.audience = audience
+        self.revocation_check_interval = revocation_check_interval
+        self.max_entries = max_entries
+        self._remote_check = remote_check
+        self._clock = clock
+        self._executor = executor or _revocation_executor
+        self._lock = threading.Lock()
+        self._tokens: "OrderedDict[bytes, _TokenState]" = OrderedDict()
+        self._revoked: Dict[bytes, float] = {}
+        self.revocation_checks = 0
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def decode(self, token: str) -> Optional[Dict[str, Any]]:
+        """Returns the claims of a token with a valid signature, or None."""
+        try:
+            return jwt.decode(
+                token,
+                self.key,
+                algorithms=self.algorithms,
+                issuer=self.issuer,
+                audience=self.audience,
+                options={"verify_aud": self.audience is not None, "require_exp": True}
+            )
+        except JWTError as e:
+            logger.debug(f"Session token rejected locally: {e}")
+            return None
+
+    def verify(self, token: str) -> Optional[UserResponse]:
+        claims = self.decode(token)
+        if claims is None:
+            return None
+        try:
+            user = UserResponse(
+                user_id=claims.get("user_id", claims.get("sub")),
+                name=claims.get("name"),
+                email=claims.get("email")
+            )
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Signed session token is missing user claims: {e}")
+            return None
+
+        digest = self._digest(token)
+        now = self._clock()
+        with self._lock:
+            if digest in self._revoked:
+                return None
+            state = self._tokens.get(digest)
+            if state is None:
+                state = self._tokens[digest] = _TokenState(float(claims["exp"]), now)
+                self._evict(now)
+            else:
+                self._tokens.move_to_end(digest)
+            if not state.checking and now >= state.next_check:
+                state.checking = True
+                try:
+                    self._executor.submit(self._check_revocation, token, digest, state)
+                except RuntimeError:
+                    state.checking = False
+        return user
+
+    def _evict(self, now: float):
+        # Called with the lock held
+        for digest in [digest for digest, expires_at in self._revoked.items() if expires_at <= now]:
+            del self._revoked[digest]
+        while len(self._tokens) > self.max_entries:
+            self._tokens.popitem(last=False)
+
+    def _check_revocation(self, token: str, digest: bytes, state: _TokenState):
+        self.revocation_checks += 1
+        try:
+            accepted = self._remote_check(token)
+        except Exception as e:
+            logger.warning(f"Revocation check of a session token failed, keeping it for now: {e}")
+            accepted = True
+        with self._lock:
+            state.checking = False
+            state.next_check = self._clock() + self.revocation_check_interval
+            if not accepted:
+                self._tokens.pop(digest, None)
+                self._revoked[digest] = state.expires_at
+
+    def is_revoked(self, token: str) -> bool:
+        with self._lock:
+            return self._digest(token) in self._revoked
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+            self._revoked.clear()
+
+def load_verification_key(key: Optional[str] = SESSION_TOKEN_KEY, key_file: Optional[str] = SESSION_TOKEN_KEY_FILE) -> Optional[str]:
+    """Returns the configured verification key (PEM public key or shared secret), read once at startup."""
+    if key:
+        return key
+    if key_file:
+        try:
+            with open(key_file, encoding="utf-8") as f:
+                return f.read()
+        except OSError as e:
+            logger.error(f"Could not read SESSION_TOKEN_KEY_FILE '{key_file}': {e}")
+    return None
+
+def build_local_token_verifier(remote_check: Callable[[str], bool], mode: str = SESSION_TOKEN_VERIFICATION) -> Optional[LocalTokenVerifier]:
+    """
+    Returns a LocalTokenVerifier when local verification is enabled and a key
+    is configured; otherwise None, and tokens are verified remotely.
+    """
+    if mode != "local":
+        return None
+    key = load_verification_key()
+    if not key:
+        logger.error("SESSION_TOKEN_VERIFICATION=local but no SESSION_TOKEN_KEY or SESSION_TOKEN_KEY_FILE is set; verifying tokens remotely")
+        return None
+    return LocalTokenVerifier(key, remote_check, issuer=SESSION_TOKEN_ISSUER, audience=SESSION_TOKEN_AUDIENCE)
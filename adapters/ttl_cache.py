@@ -0,0 +1,151 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Hashable, Optional
+import logging
+import os
+import threading
+import time
+
+from adapters.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+USER_SERVICE_CACHE_TTL_SECONDS = float(os.getenv("USER_SERVICE_CACHE_TTL_SECONDS", "60"))
+USER_SERVICE_CACHE_REFRESH_AHEAD_SECONDS = float(os.getenv("USER_SERVICE_CACHE_REFRESH_AHEAD_SECONDS", "10"))
+USER_SERVICE_CACHE_STALE_GRACE_SECONDS = float(os.getenv("USER_SERVICE_CACHE_STALE_GRACE_SECONDS", "30"))
+USER_SERVICE_CACHE_MAX_ENTRIES = int(os.getenv("USER_SERVICE_CACHE_MAX_ENTRIES", "10000"))
+
+# Shared pool for background refreshes of every cache
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+
+class _Entry:
+    __slots__ = ("value", "loaded_at")
+
+    def __init__(self, value: Any, loaded_at: float):
+        self.value = value
+        self.loaded_at = loaded_at
+
+class RefreshingTTLCache:
+    """
+    In-memory TTL cache with refresh-ahead and stale-while-revalidate.
+
+    For an entry of age `age`:
+
+    - `age < ttl - refresh_ahead`: fresh, returned as is.
+    - `ttl - refresh_ahead <= age < ttl`: returned, and a background refresh
+      is started so the entry is renewed before it expires.
+    - `ttl <= age < ttl + stale_grace`: stale, still returned while a
+      background refresh runs.
+    - `age >= ttl + stale_grace`: hard-expired, loaded synchronously.
+
+    Only successful loads are stored: if the loader raises, the exception
+    reaches the caller (synchronous load) or is logged and the previous value
+    is kept (background refresh). Concurrent synchronous loads of one key are
+    coalesced. A `ttl` of 0 disables caching.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float = USER_SERVICE_CACHE_TTL_SECONDS,
+        refresh_ahead: float = USER_SERVICE_CACHE_REFRESH_AHEAD_SECONDS,
+        stale_grace: float = USER_SERVICE_CACHE_STALE_GRACE_SECONDS,
+        max_entries: int = USER_SERVICE_CACHE_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+        executor: Optional[ThreadPoolExecutor] = None
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.refresh_ahead = min(refresh_ahead, ttl)
+        self.stale_grace = stale_grace
+        self.max_entries = max_entries
+        self._clock = clock
+        self._executor = executor or _refresh_executor
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._refreshing = set()
+        self._generation = 0
+        self._flight = SingleFlight()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        if self.ttl <= 0:
+            return loader()
+
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = now - entry.loaded_at
+                if age < self.ttl + self.stale_grace:
+                    self._entries.move_to_end(key)
+                    if age >= self.ttl:
+                        self.stale_hits += 1
+                    else:
+                        self.hits += 1
+                    if age >= self.ttl - self.refresh_ahead:
+                        self._schedule_refresh(key, loader)
+                    return entry.value
+                del self._entries[key]
+            self.misses += 1
+            generation = self._generation
+
+        return self._flight.do(key, lambda: self._load(key, loader, generation))
+
+    def _load(self, key: Hashable, loader: Callable[[], Any], generation: int) -> Any:
+        value = loader()
+        self._store(key, value, generation)
+        return value
+
+    def _store(self, key: Hashable, value: Any, generation: int):
+        with self._lock:
+            # Results of loads that started before an invalidation are discarded
+            if generation != self._generation:
+                return
+            self._entries[key] = _Entry(value, self._clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _schedule_refresh(self, key: Hashable, loader: Callable[[], Any]):
+        # Called with the lock held
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        generation = self._generation
+        try:
+            self._executor.submit(self._refresh, key, loader, generation)
+        except RuntimeError:
+            self._refreshing.discard(key)
+
+    def _refresh(self, key: Hashable, loader: Callable[[], Any], generation: int):
+        try:
+            self._store(key, loader(), generation)
+        except Exception as e:
+            logger.warning(f"Background refresh of cache '{self.name}' for key {key} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generation += 1
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]):
+        """Removes every entry for which `predicate(key, value)` is true."""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if predicate(key, entry.value)]:
+                del self._entries[key]
+            self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -1,4 +1,5 @@
-from typing import Optional, Any, Dict, List, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Any, Dict, Iterable, List, Union
 from fastapi import Depends
 from domain.schemas import UserResponse
 from dotenv import load_dotenv
@@ -6,9 +7,19 @@ from sqlalchemy.orm import Session
 from models.models import UserRoleFarm
 from dataBase import get_db_session
 from utils.state import get_state
+from adapters.circuit_breaker import get_circuit_breaker
+from adapters.retry import USER_SERVICE_MAX_RETRIES, backoff_delay, retry_budget
+from adapters.single_flight import AsyncSingleFlight, SingleFlight
+from adapters.ttl_cache import RefreshingTTLCache
+from adapters.negative_cache import NegativeCache
+from adapters.session_token import build_local_token_verifier
+from utils.deadline import get_remaining_time
+import asyncio
+import contextvars
 import httpx
 import logging
 import os
+import time
 
 # Load environment variables
 load_dotenv(override=True, encoding="utf-8")
@@ -17,6 +28,24 @@ logger = logging.getLogger(__name__)
 
 USER_SERVICE_URL = os.getenv("USER_SERVICE_URL", "http://localhost:8000")
 DEFAULT_TIMEOUT = 10.0
+# Maximum number of concurrent requests used by the bulk helpers
+USER_SERVICE_MAX_CONCURRENCY = int(os.getenv("USER_SERVICE_MAX_CONCURRENCY", "8"))
+# Upstream status codes that indicate a transient failure worth retrying
+RETRYABLE_STATUS_CODES = (502, 503, 504)
+# Upstream status codes that definitely reject a session token (cached as invalid)
+SESSION_TOKEN_REJECTION_STATUS_CODES = (401, 403)
+
+# In-flight coalescing of identical concurrent calls (sync and async callers)
+_session_token_flight = SingleFlight()
+_user_role_ids_flight = SingleFlight()
+_async_session_token_flight = AsyncSingleFlight()
+_async_user_role_ids_flight = AsyncSingleFlight()
+
+# Caches of role data; see RefreshingTTLCache for the fresh/refresh-ahead/stale/hard-expiry windows
+_user_role_ids_cache = RefreshingTTLCache("user_role_ids")
+_permissions_cache = RefreshingTTLCache("role_permissions")
+# Short-lived cache of session tokens the user service rejected
+_invalid_session_tokens = NegativeCache()
 
 class UserRoleRetrievalError(Exception):
     """Custom exception for errors retrieving user roles."""
@@ -42,15 +71,39 @@ class RoleNameNotFoundError(Exception):
     """Custom exception for when a role name cannot be found for a given role_id."""
     pass
 
+class UserServiceUnavailableError(Exception):
+    """Custom exception for when the user service could not give an answer (transport error, 5xx, open circuit)."""
+    pass
+
+class UserServiceClientError(Exception):
+    """Custom exception for when the user service answered with a non-5xx error status."""
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+class PermissionsRetrievalError(Exception):
+    """Custom exception for errors retrieving the permissions of a user role."""
+    pass
+
 def _make_request(
     endpoint: str,
     method: str = "GET",
     data: Optional[Dict[str, Any]] = None,
     params: Optional[Dict[str, Any]] = None,
-    timeout: float = DEFAULT_TIMEOUT
+    timeout: float = DEFAULT_TIMEOUT,
+    operation: str = "user_service"
 ) -> Optional[Dict[str, Any]]:
     """
     Base function to make HTTP requests to the user service.
+
+    Each upstream operation has its own circuit breaker: while it is open the
+    call fails fast (returns None) instead of waiting for the timeout.
+    Transport errors and 5xx responses count as failures.
+
+    GET requests are idempotent, so transport errors and 502/503/504 responses
+    are retried up to USER_SERVICE_MAX_RETRIES times with full-jitter backoff.
+    Retries stop when the global retry budget is exhausted, and no attempt (or
+    backoff) may go past the remaining deadline of the current request.
     
     Args:
         endpoint (str): The API endpoint to call (without base URL)
@@ -58,31 +111,103 @@ def _make_request(
         data (dict, optional): JSON data to send in the request body
         params (dict, optional): Query parameters to include in the request
         timeout (float): Request timeout in seconds
+        operation (str): Name of the upstream operation, used to select its circuit breaker
         
     Returns:
         dict: Response data as dictionary if successful, None otherwise
     """
-    url = f"{USER_SERVICE_URL}{endpoint}"
-    
     try:
-        with httpx.Client(timeout=timeout) as client:
-            if method.upper() == "GET":
-                response = client.get(url, params=params)
-            elif method.upper() == "POST":
-                response = client.post(url, json=data)
-            else:
-                logger.error(f"Unsupported HTTP method: {method}")
-                return None
-                
-            if response.status_code in (200, 201):
-                return response.json()
-            else:
-                logger.error(f"Error calling {url}: {response.status_code} - {response.text}")
-                return None
-    except Exception as e:
-        logger.error(f"Exception calling {url}: {str(e)}")
+        return _make_request_or_raise(endpoint, method=method, data=data, params=params, timeout=timeout, operation=operation)
+    except (UserServiceUnavailableError, UserServiceClientError):
         return None
 
+def _make_request_or_raise(
+    endpoint: str,
+    method: str = "GET",
+    data: Optional[Dict[str, Any]] = None,
+    params: Optional[Dict[str, Any]] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    operation: str = "user_service"
+) -> Optional[Dict[str, Any]]:
+    """
+    Same as _make_request, but tells apart the user service answering "no"
+    from not getting an answer at all.
+
+    Returns:
+        dict: Response data if the user service answered 200/201
+
+    Raises:
+        UserServiceClientError: If the user service answered with any other non-5xx status
+        UserServiceUnavailableError: On transport errors, 5xx responses, an open
+        circuit breaker, an exceeded deadline or an unreadable response body
+    """
+    url = f"{USER_SERVICE_URL}{endpoint}"
+    method = method.upper()
+
+    if method not in ("GET", "POST"):
+        logger.error(f"Unsupported HTTP method: {method}")
+        return None
+
+    breaker = get_circuit_breaker(operation)
+    max_retries = USER_SERVICE_MAX_RETRIES if method == "GET" else 0
+    retry_budget.record_request()
+
+    for attempt in range(max_retries + 1):
+        remaining = get_remaining_time()
+        if remaining is not None and remaining <= 0:
+            logger.error(f"Request deadline exceeded before calling {url}")
+            raise UserServiceUnavailableError(f"Request deadline exceeded before calling {url}")
+        if not breaker.allow_request():
+            logger.warning(f"Circuit breaker '{operation}' is open, failing fast for {url}")
+            raise UserServiceUnavailableError(f"Circuit breaker '{operation}' is open")
+
+        error = None
+        response = None
+        try:
+            attempt_timeout = timeout if remaining is None else min(timeout, remaining)
+            with httpx.Client(timeout=attempt_timeout) as client:
+                if method == "GET":
+                    response = client.get(url, params=params)
+                else:
+                    response = client.post(url, json=data)
+        except Exception as e:
+            error = e
+
+        if error is not None or response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+        retryable = error is not None or response.status_code in RETRYABLE_STATUS_CODES
+        if not retryable or attempt == max_retries:
+            break
+
+        delay = backoff_delay(attempt)
+        remaining = get_remaining_time()
+        if remaining is not None and remaining <= delay:
+            logger.warning(f"Not retrying {url}: request deadline would be exceeded")
+            break
+        if not retry_budget.try_acquire():
+            logger.warning(f"Not retrying {url}: retry budget exhausted")
+            break
+        logger.warning(f"Retrying {url} in {delay:.3f}s (attempt {attempt + 2} of {max_retries + 1})")
+        time.sleep(delay)
+
+    if error is not None:
+        logger.error(f"Exception calling {url}: {str(error)}")
+        raise UserServiceUnavailableError(f"Exception calling {url}: {str(error)}")
+
+    if response.status_code in (200, 201):
+        try:
+            return response.json()
+        except Exception as e:
+            logger.error(f"Exception calling {url}: {str(e)}")
+            raise UserServiceUnavailableError(f"Invalid response from {url}: {str(e)}")
+    logger.error(f"Error calling {url}: {response.status_code} - {response.text}")
+    if response.status_code >= 500:
+        raise UserServiceUnavailableError(f"Error calling {url}: {response.status_code}")
+    raise UserServiceClientError(response.status_code, f"Error calling {url}: {response.status_code}")
+
 def get_role_name_for_user_role(user_role_id: int) -> str:
     """
     Gets the role name associated with a user_role_id by calling the user service API.
@@ -93,7 +218,7 @@ def get_role_name_for_user_role(user_role_id: int) -> str:
     Returns:
         str: The name of the role, or "Unknown" if not found
     """
-    response = _make_request(f"/users-service/user-role/{user_role_id}")
+    response = _make_request(f"/users-service/user-role/{user_role_id}", operation="get_role_name_for_user_role")
     return response.get("role_name", "Unknown") if response else "Unknown"
 
 def get_user_role_ids(user_id: int) -> List[int]:
@@ -109,17 +234,68 @@ def get_user_role_ids(user_id: int) -> List[int]:
     Raises:
         Exception: If the request fails or response is invalid
     """
-    response = _make_request(f"/users-service/user-role-ids/{user_id}")
+    # Cached with refresh-ahead/stale-while-revalidate; concurrent misses for the
+    # same user share a single upstream request
+    return list(_user_role_ids_cache.get(
+        user_id, lambda: _user_role_ids_flight.do(user_id, lambda: _fetch_user_role_ids(user_id))
+    ))
+
+def _fetch_user_role_ids(user_id: int) -> List[int]:
+    response = _make_request(f"/users-service/user-role-ids/{user_id}", operation="get_user_role_ids")
     
     if response:
         return response.get("user_role_ids", [])
     else:
         raise UserRoleRetrievalError(f"Error retrieving user_role_ids for user {user_id}")
 
+async def get_user_role_ids_async(user_id: int) -> List[int]:
+    """
+    Async variant of get_user_role_ids. Concurrent coroutines for the same user
+    share one call, which runs in a worker thread (and is also coalesced with
+    concurrent sync callers).
+    """
+    result = await _async_user_role_ids_flight.do(user_id, lambda: asyncio.to_thread(get_user_role_ids, user_id))
+    return list(result)
+
+def get_user_role_ids_bulk(user_ids: Iterable[int], max_concurrency: int = USER_SERVICE_MAX_CONCURRENCY) -> Dict[int, Optional[List[int]]]:
+    """
+    Retrieves user_role_ids for many users, deduplicating the user ids and
+    issuing at most `max_concurrency` requests to the user service at a time.
+
+    Args:
+        user_ids (Iterable[int]): IDs of the users (duplicates are allowed)
+        max_concurrency (int): Maximum number of simultaneous requests
+
+    Returns:
+        dict: Mapping of user_id to its list of user_role_ids, or None if the
+        lookup failed for that user
+    """
+    unique_user_ids = list(dict.fromkeys(user_ids))
+    if not unique_user_ids:
+        return {}
+
+    def _lookup(user_id: int) -> Optional[List[int]]:
+        try:
+            return get_user_role_ids(user_id)
+        except Exception as e:
+            logger.error(f"Could not get user_role_ids for user {user_id}: {e}")
+            return None
+
+    workers = max(1, min(max_concurrency, len(unique_user_ids)))
+    # Each lookup runs in a copy of the caller's context so it keeps the request deadline
+    contexts = [contextvars.copy_context() for _ in unique_user_ids]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(lambda args: args[0].run(_lookup, args[1]), zip(contexts, unique_user_ids))
+        return dict(zip(unique_user_ids, results))
+
 def verify_session_token(session_token: str) -> Optional[Union[Dict[str, Any], UserResponse]]:
     """
     Verifies a session token by making a request to the user service.
     Returns user data if the token is valid, None otherwise.
+
+    With SESSION_TOKEN_VERIFICATION=local, signed tokens are verified
+    in-process instead and the user service is only asked in the background
+    whether they were revoked (see LocalTokenVerifier).
     
     Args:
         session_token (str): Session token to verify
@@ -127,17 +303,64 @@ def verify_session_token(session_token: str) -> Optional[Union[Dict[str, Any], U
     Returns:
         UserResponse: User data object if token is valid, None otherwise
     """
-    response = _make_request(
-        "/users-service/session-token-verification", 
-        method="POST", 
-        data={"session_token": session_token}
-    )
-    
-    if response and response.get("status") == "success" and "user" in response.get("data", {}):
-        # Convertir diccionario a objeto Pydantic
-        return UserResponse(**response["data"]["user"])
+    # Tokens recently rejected by the user service are rejected locally
+    if _invalid_session_tokens.contains(session_token):
+        return None
+    if _local_token_verifier is not None:
+        return _local_token_verifier.verify(session_token)
+    # Concurrent verifications of the same token share a single upstream request
+    return _session_token_flight.do(session_token, lambda: _verify_session_token(session_token))
+
+def _verify_session_token(session_token: str) -> Optional[UserResponse]:
+    try:
+        return _verify_session_token_or_raise(session_token)
+    except UserServiceUnavailableError:
+        # No answer from the user service: the token may be valid, so it is not cached
+        return None
+
+def _verify_session_token_or_raise(session_token: str) -> Optional[UserResponse]:
+    """
+    Returns the user if the token is valid, or None if the user service
+    definitely rejected it (401/403, or an explicit "error" status). Any other
+    answer (e.g. 429, 400 or an unexpected body) says nothing about the token
+    and raises UserServiceUnavailableError, so it is never cached as invalid.
+    """
+    try:
+        response = _make_request_or_raise(
+            "/users-service/session-token-verification", 
+            method="POST", 
+            data={"session_token": session_token},
+            operation="verify_session_token"
+        )
+    except UserServiceClientError as e:
+        if e.status_code not in SESSION_TOKEN_REJECTION_STATUS_CODES:
+            raise UserServiceUnavailableError(f"No verdict on session token: {e}") from e
+    else:
+        status = response.get("status") if isinstance(response, dict) else None
+        data = response.get("data") if status == "success" else None
+        if isinstance(data, dict) and "user" in data:
+            # Convertir diccionario a objeto Pydantic
+            return UserResponse(**data["user"])
+        if status != "error":
+            raise UserServiceUnavailableError(f"Unexpected session token verification response: {response!r}")
+    # The user service answered and rejected the token
+    _invalid_session_tokens.add(session_token)
     return None
 
+def _is_session_token_accepted(session_token: str) -> bool:
+    """Remote revocation check used by local verification; raises if the user service gives no answer."""
+    return _verify_session_token_or_raise(session_token) is not None
+
+# Local verification of signed session tokens, if enabled
+_local_token_verifier = build_local_token_verifier(_is_session_token_accepted)
+
+async def verify_session_token_async(session_token: str) -> Optional[UserResponse]:
+    """
+    Async variant of verify_session_token. Concurrent coroutines verifying the
+    same token share one call, which runs in a worker thread.
+    """
+    return await _async_session_token_flight.do(session_token, lambda: asyncio.to_thread(verify_session_token, session_token))
+
 def create_user_role(user_id: int, role_name: str) -> dict:
     """
     Creates a UserRole for the given user in the user service.
@@ -155,8 +378,10 @@ def create_user_role(user_id: int, role_name: str) -> dict:
     response = _make_request(
         "/users-service/user-role",
         method="POST",
-        data={"user_id": user_id, "role_name": role_name}
+        data={"user_id": user_id, "role_name": role_name},
+        operation="create_user_role"
     )
+    invalidate_user_role_caches(user_id=user_id)
     if response and "user_role_id" in response:
         return response
     else:
@@ -172,10 +397,44 @@ def get_role_permissions_for_user_role(user_role_id: int) -> list:
     Returns:
         list: List of permission names (str)
     """
-    response = _make_request(f"/users-service/user-role/{user_role_id}/permissions")
+    try:
+        return list(_permissions_cache.get(user_role_id, lambda: _fetch_role_permissions(user_role_id)))
+    except PermissionsRetrievalError as e:
+        logger.error(str(e))
+        return []
+
+def _fetch_role_permissions(user_role_id: int) -> List[str]:
+    response = _make_request(f"/users-service/user-role/{user_role_id}/permissions", operation="get_role_permissions_for_user_role")
     if response and "permissions" in response:
         return [perm["name"] for perm in response["permissions"]]
-    return []
+    # Raised (instead of returning []) so that failures are never cached
+    raise PermissionsRetrievalError(f"Error retrieving permissions for user_role {user_role_id}")
+
+def invalidate_user_role_caches(user_id: Optional[int] = None, user_role_id: Optional[int] = None):
+    """
+    Drops cached role data after a change in the user service.
+
+    Args:
+        user_id (int, optional): User whose user_role_ids changed
+        user_role_id (int, optional): UserRole whose role or permissions changed, or that was deleted
+    """
+    if user_id is not None:
+        _user_role_ids_cache.invalidate(user_id)
+    if user_role_id is not None:
+        _permissions_cache.invalidate(user_role_id)
+        _user_role_ids_cache.invalidate_where(lambda _, user_role_ids: user_role_id in user_role_ids)
+
+def clear_user_role_ids_cache():
+    """
+    Drops every cached user_role_ids list. Used when a new user_role is attached
+    to a farm and its user is not known: no cached list can contain it yet.
+    """
+    _user_role_ids_cache.clear()
+
+def clear_user_role_caches():
+    """Drops every cached user_role_ids and permissions entry."""
+    _user_role_ids_cache.clear()
+    _permissions_cache.clear()
 
 def get_role_name_by_id(role_id: int) -> Optional[str]:
     """
@@ -187,7 +446,7 @@ def get_role_name_by_id(role_id: int) -> Optional[str]:
     Returns:
         str: The name of the role, or None if not found or error occurs.
     """
-    response = _make_request(f"/users-service/{role_id}/name")
+    response = _make_request(f"/users-service/{role_id}/name", operation="get_role_name_by_id")
     if response and "role_name" in response:
         return response["role_name"]
     logger.error(f"Could not retrieve role name for role_id {role_id}")
@@ -201,8 +460,10 @@ def update_user_role(user_role_id: int, new_role_id: int) -> None:
     response = _make_request(
         f"/users-service/user-role/{user_role_id}/update-role",
         method="POST",
-        data={"new_role_id": new_role_id} # Changed from new_role_name
+        data={"new_role_id": new_role_id}, # Changed from new_role_name
+        operation="update_user_role"
     )
+    invalidate_user_role_caches(user_role_id=user_role_id)
     if not response or response.get("status") != "success":
         # Include response details in the exception message if available
         error_detail = response.get("message", "Unknown error") if response else "No response"
@@ -219,7 +480,8 @@ def get_collaborators_info(user_role_ids: list) -> list:
     response = _make_request(
         "/users-service/user-role/bulk-info",
         method="POST",
-        data={"user_role_ids": user_role_ids}
+        data={"user_role_ids": user_role_ids},
+        operation="get_collaborators_info"
     )
     if response and "collaborators" in response:
         return response["collaborators"]
@@ -233,8 +495,10 @@ def delete_user_role(user_role_id: int) -> None:
     """
     response = _make_request(
         f"/users-service/user-role/{user_role_id}/delete",
-        method="POST"
+        method="POST",
+        operation="delete_user_role"
     )
+    invalidate_user_role_caches(user_role_id=user_role_id)
     if not response or response.get("status") != "success":
         raise UserRoleDeletionError(f"No se pudo eliminar el user_role_id {user_role_id}: {response}")
 
@@ -296,8 +560,10 @@ def create_user_role_for_farm(user_id: int, role_id: int) -> int:
     response = _make_request(
         "/users-service/user-role",
         method="POST",
-        data={"user_id": user_id, "role_name": role_name}
+        data={"user_id": user_id, "role_name": role_name},
+        operation="create_user_role"
     )
+    invalidate_user_role_caches(user_id=user_id)
     if response and "user_role_id" in response:
         return response["user_role_id"]
     else:
@@ -0,0 +1,45 @@
+"""
+Mide el costo de CPU frente a los bytes ahorrados al comprimir las respuestas
+típicas del servicio (list-farm, list-plots y list-collaborators).
+
+Uso:
+    uv run python -m benchmarks.compression_benchmark
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.payloads import PAYLOADS, SIZES  # noqa: E402
+from utils.compression import compress_body  # noqa: E402
+from utils.response import create_response  # noqa: E402
+
+CODECS = [("gzip", 1), ("gzip", 6), ("gzip", 9), ("br", 1), ("br", 4), ("br", 11)]
+
+
+def measure(body, encoding, level, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        compressed = compress_body(body, encoding, gzip_level=level, brotli_quality=level)
+    elapsed = (time.perf_counter() - start) / repeat
+    return len(compressed), elapsed * 1e6
+
+
+def main():
+    random.seed(42)
+    print(f"{'payload':<20}{'items':>6}{'raw B':>9}{'codec':>9}{'comp B':>9}{'saved':>8}{'µs':>10}{'B saved/µs':>12}")
+    for name, builder in PAYLOADS:
+        for n in SIZES:
+            body = create_response("success", "ok", builder(n)).body
+            repeat = max(5, 20000 // len(body))
+            for encoding, level in CODECS:
+                size, micros = measure(body, encoding, level, repeat)
+                saved = len(body) - size
+                print(f"{name:<20}{n:>6}{len(body):>9}{f'{encoding}-{level}':>9}{size:>9}"
+                      f"{saved / len(body):>8.0%}{micros:>10.1f}{saved / micros:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
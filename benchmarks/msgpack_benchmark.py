@@ -0,0 +1,47 @@
+"""
+Compara el tamaño y el tiempo de codificación/decodificación de las respuestas
+típicas del servicio en JSON (ORJSON) y en MessagePack, usando el mismo sobre
+`status`, `message`, `data` que produce `create_response`.
+
+Uso:
+    uv run python -m benchmarks.msgpack_benchmark
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import msgpack  # noqa: E402
+import orjson  # noqa: E402
+
+from benchmarks.payloads import PAYLOADS, SIZES  # noqa: E402
+from utils.response import process_data_for_json  # noqa: E402
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    random.seed(42)
+    print(f"{'payload':<20}{'items':>6}{'json B':>9}{'mp B':>9}{'size':>7}"
+          f"{'json enc µs':>13}{'mp enc µs':>11}{'json dec µs':>13}{'mp dec µs':>11}")
+    for name, builder in PAYLOADS:
+        for n in SIZES:
+            envelope = {"status": "success", "message": "ok", "data": process_data_for_json(builder(n))}
+            repeat = max(20, 20000 // n)
+            json_body, json_enc = timed(lambda: orjson.dumps(envelope), repeat)
+            mp_body, mp_enc = timed(lambda: msgpack.packb(envelope, use_bin_type=True), repeat)
+            _, json_dec = timed(lambda: orjson.loads(json_body), repeat)
+            _, mp_dec = timed(lambda: msgpack.unpackb(mp_body, raw=False), repeat)
+            print(f"{name:<20}{n:>6}{len(json_body):>9}{len(mp_body):>9}{len(mp_body) / len(json_body):>7.0%}"
+                  f"{json_enc:>13.1f}{mp_enc:>11.1f}{json_dec:>13.1f}{mp_dec:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
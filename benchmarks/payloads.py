@@ -0,0 +1,49 @@
+"""
+Generadores de payloads con la forma de las respuestas típicas del servicio,
+usados por los scripts de benchmarks.
+"""
+import random
+from decimal import Decimal
+
+VARIETIES = ["Castillo", "Caturra", "Colombia", "Típica", "Borbón", "Geisha", "Tabi"]
+ROLES = ["Propietario", "Administrador de finca", "Operador de campo"]
+SIZES = (5, 50, 500)
+
+
+def farms_payload(n):
+    return {"farms": [{
+        "farm_id": i,
+        "name": f"Finca La Esperanza {i}",
+        "area": Decimal(f"{random.uniform(1, 500):.2f}"),
+        "area_unit_id": 1,
+        "area_unit": "Hectárea",
+        "farm_state_id": 1,
+        "farm_state": "Activo",
+        "user_role_id": 1000 + i,
+        "role": random.choice(ROLES),
+    } for i in range(n)]}
+
+
+def plots_payload(n):
+    return {"plots": [{
+        "plot_id": i,
+        "name": f"Lote {i}",
+        "coffee_variety_name": random.choice(VARIETIES),
+        "latitude": Decimal(f"{random.uniform(4, 6):.8f}"),
+        "longitude": Decimal(f"{random.uniform(-76, -74):.8f}"),
+        "altitude": Decimal(f"{random.uniform(1200, 2000):.2f}"),
+    } for i in range(n)]}
+
+
+def collaborators_payload(n):
+    return {"collaborators": [{
+        "user_role_id": 1000 + i,
+        "user_id": i,
+        "user_name": f"Colaborador {i}",
+        "user_email": f"colaborador{i}@coffeetech.com",
+        "role_id": random.randint(1, 3),
+        "role_name": random.choice(ROLES),
+    } for i in range(n)]}
+
+
+PAYLOADS = [("list-farm", farms_payload), ("list-plots", plots_payload), ("list-collaborators", collaborators_payload)]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List
+from typing import List, Optional
 
 # --- Farms ---
 class CreateFarmRequest(BaseModel):
@@ -106,6 +106,58 @@ class UserRoleFarmCreateRequest(BaseModel):
     farm_id: int
     user_role_farm_state_id: int
 
+class UserRoleFarmsBulkCreateRequest(BaseModel):
+    items: List[UserRoleFarmCreateRequest] = Field(..., min_length=1, max_length=500, description="Relaciones a crear. Máximo 500.")
+
+class UserRoleFarmCreateResult(BaseModel):
+    user_role_id: int
+    farm_id: int
+    status: str = Field(..., description="created, already_exists, duplicate o invalid")
+    user_role_farm_id: Optional[int] = None
+    message: Optional[str] = None
+
+class UserRoleFarmsBulkCreateResponse(BaseModel):
+    results: List[UserRoleFarmCreateResult]
+
+class UserFarmPair(BaseModel):
+    user_id: int
+    farm_id: int
+
+class UserRoleFarmsBulkRequest(BaseModel):
+    pairs: List[UserFarmPair] = Field(..., min_length=1, max_length=500, description="Pares (usuario, finca) a consultar. Máximo 500.")
+
+class UserRoleFarmLookup(BaseModel):
+    user_id: int
+    farm_id: int
+    found: bool
+    user_role_farm: Optional[UserRoleFarmResponse] = None
+    error: Optional[str] = None
+
+class UserRoleFarmsBulkResponse(BaseModel):
+    results: List[UserRoleFarmLookup]
+
+class FarmsBatchRequest(BaseModel):
+    farm_ids: List[int] = Field(..., min_length=1, max_length=100, description="IDs de las fincas a consultar. Máximo 100.")
+
+class FarmsBatchResponse(BaseModel):
+    farms: List[FarmDetailResponse]
+    not_found: List[int]
+
+class PlotsVerifyRequest(BaseModel):
+    plot_ids: List[int] = Field(..., min_length=1, max_length=5000, description="IDs de los lotes a verificar. Máximo 5000.")
+
+class PlotVerification(BaseModel):
+    plot_id: int
+    exists: bool
+    active: bool
+    farm_id: Optional[int] = None
+    name: Optional[str] = None
+    plot_state_id: Optional[int] = None
+    plot_state: Optional[str] = None
+
+class PlotsVerifyResponse(BaseModel):
+    plots: List[PlotVerification]
+
 # --- User Service Models ---
 class UserResponse(BaseModel):
     user_id: int
@@ -1,14 +1,20 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, Query
 from sqlalchemy.orm import Session
 from dataBase import get_db_session
 from utils.response import session_token_invalid_response
 from utils.response import create_response
+from utils.idempotency import IDEMPOTENCY_KEY_HEADER, run_idempotent
 from use_cases.create_farm_use_case import create_farm
 from adapters.user_client import verify_session_token
 from use_cases.list_farms_use_case import list_farms
 from use_cases.update_farm_use_case import update_farm
 from use_cases.get_farm_use_case import get_farm
 from use_cases.delete_farm_use_case import delete_farm
+from use_cases.get_farm_summary_use_case import get_farm_summary
+from use_cases.get_farm_dashboard_use_case import get_farm_dashboard
+from use_cases.farm_area_stats_use_case import get_farm_area_stats
+from use_cases.search_use_case import DEFAULT_SEARCH_PAGE_SIZE, MAX_SEARCH_PAGE_SIZE, search_farms_and_plots
 import logging
 from domain.schemas import CreateFarmRequest, ListFarmResponse, UpdateFarmRequest
 
@@ -19,26 +25,37 @@ router = APIRouter()
 INVALID_SESSION_TOKEN_MESSAGE = "Token de sesión inválido o usuario no encontrado"
 
 @router.post("/create-farm")
-def create_farm_endpoint(request: CreateFarmRequest, session_token: str, db: Session = Depends(get_db_session)):
+def create_farm_endpoint(
+    request: CreateFarmRequest,
+    session_token: str,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_KEY_HEADER),
+    db: Session = Depends(get_db_session)
+):
     """
     Crea una nueva finca y asigna al usuario como propietario.
 
     **Parámetros**:
     - **request**: Objeto que contiene los datos de la finca (nombre, área, y unidad de medida).
     - **session_token**: Token de sesión del usuario.
+    - **Idempotency-Key** (encabezado opcional): Clave única del intento; los reintentos con la misma clave reciben la respuesta original sin volver a crear la finca.
     - **db**: Sesión de base de datos, se obtiene automáticamente.
 
     **Respuestas**:
     - **200 OK**: Finca creada y usuario asignado correctamente.
     - **400 Bad Request**: Si los datos de la finca no son válidos o no se encuentra el estado requerido.
     - **401 Unauthorized**: Si el token de sesión es inválido o el usuario no tiene permisos.
+    - **409 Conflict**: Si hay otra petición en curso con la misma clave de idempotencia.
+    - **422 Unprocessable Entity**: Si la clave de idempotencia ya se usó con datos diferentes.
     - **500 Internal Server Error**: Si ocurre un error al intentar crear la finca o asignar el usuario.
     """
-    user = verify_session_token(session_token)
-    if not user:
-        logger.warning(INVALID_SESSION_TOKEN_MESSAGE)
-        return session_token_invalid_response()
-    return create_farm(request, user, db)
+    def _create_farm():
+        user = verify_session_token(session_token)
+        if not user:
+            logger.warning(INVALID_SESSION_TOKEN_MESSAGE)
+            return session_token_invalid_response()
+        return create_farm(request, user, db)
+
+    return run_idempotent(db, idempotency_key, session_token, "create-farm", request.model_dump_json(), _create_farm)
 
 @router.post("/list-farm")
 def list_farm_endpoint(session_token: str, db: Session = Depends(get_db_session)):
@@ -85,6 +102,102 @@ def get_farm_endpoint(farm_id: int, session_token: str, db: Session = Depends(ge
         return session_token_invalid_response()
     return get_farm(farm_id, user, db, ListFarmResponse)
 
+@router.get("/get-farm-summary/{farm_id}")
+def get_farm_summary_endpoint(farm_id: int, session_token: str, db: Session = Depends(get_db_session)):
+    """
+    Obtiene el resumen de los lotes de una finca sin listarlos.
+
+    **Parámetros:**
+    - `farm_id` (int): ID de la finca a consultar.
+    - `session_token` (str): Token de sesión del usuario que está haciendo la solicitud.
+
+    **Respuesta exitosa (200):**
+    - **Descripción**: Devuelve el área de la finca, la cantidad de lotes activos, la cantidad de lotes por variedad de café y las altitudes mínima, máxima y promedio.
+
+    **Errores:**
+    - **401 Unauthorized**: Si el token de sesión es inválido o el usuario no se encuentra.
+    - **403 Forbidden**: Si el usuario no tiene permiso para ver los lotes de la finca.
+    """
+    user = verify_session_token(session_token)
+    if not user:
+        logger.warning(INVALID_SESSION_TOKEN_MESSAGE)
+        return session_token_invalid_response()
+    return get_farm_summary(farm_id, user, db)
+
+@router.get("/get-farm-dashboard/{farm_id}")
+def get_farm_dashboard_endpoint(farm_id: int, session_token: str, include_collaborators_info: bool = False, db: Session = Depends(get_db_session)):
+    """
+    Obtiene en una sola llamada la finca, sus lotes activos y sus colaboradores.
+
+    **Parámetros:**
+    - `farm_id` (int): ID de la finca a consultar.
+    - `session_token` (str): Token de sesión del usuario que está haciendo la solicitud.
+    - `include_collaborators_info` (bool): Si es `true`, incluye nombre, correo y rol de cada colaborador (consulta adicional al servicio de usuarios).
+
+    **Respuesta exitosa (200):**
+    - **Descripción**: Devuelve la finca (con el rol del usuario), los permisos del rol y las secciones `plots` y `collaborators`. Cada sección tiene `status`: `success`, `forbidden` si el rol no tiene el permiso `read_plots` o `read_collaborators`, o `error` si falló su consulta.
+
+    **Errores:**
+    - **401 Unauthorized**: Si el token de sesión es inválido o el usuario no se encuentra.
+    - **404 Not Found**: Si la finca no se encuentra o no pertenece al usuario.
+    """
+    user = verify_session_token(session_token)
+    if not user:
+        logger.warning(INVALID_SESSION_TOKEN_MESSAGE)
+        return session_token_invalid_response()
+    return get_farm_dashboard(farm_id, user, db, include_collaborators_info)
+
+@router.get("/farm-area-stats")
+def farm_area_stats_endpoint(session_token: str, order: str = Query("desc", pattern="^(asc|desc)$"), db: Session = Depends(get_db_session)):
+    """
+    Obtiene el área total y promedio, en hectáreas, de las fincas activas del usuario.
+
+    **Parámetros:**
+    - `session_token` (str): Token de sesión del usuario que está haciendo la solicitud.
+    - `order` (str): `desc` (por defecto) o `asc`, orden de las fincas según su área en hectáreas.
+
+    **Respuesta exitosa (200):**
+    - **Descripción**: Devuelve `farm_count`, `total_area_hectares`, `average_area_hectares` y las fincas (`farms`) con su área convertida (`area_hectares`). Las fincas con una unidad sin equivalencia en hectáreas se cuentan en `unconverted_farm_count`, van al final de la lista y no se suman.
+
+    **Errores:**
+    - **401 Unauthorized**: Si el token de sesión es inválido o el usuario no se encuentra.
+    """
+    user = verify_session_token(session_token)
+    if not user:
+        logger.warning(INVALID_SESSION_TOKEN_MESSAGE)
+        return session_token_invalid_response()
+    return get_farm_area_stats(user, db, order)
+
+@router.get("/search")
+def search_endpoint(
+    session_token: str,
+    q: str = Query(..., max_length=100),
+    limit: int = Query(DEFAULT_SEARCH_PAGE_SIZE, ge=1, le=MAX_SEARCH_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db_session)
+):
+    """
+    Busca fincas y lotes por nombre.
+
+    **Parámetros:**
+    - `session_token` (str): Token de sesión del usuario que está haciendo la solicitud.
+    - `q` (str): Texto a buscar (al menos 3 caracteres). Se buscan los nombres que lo contienen, sin distinguir mayúsculas ni tildes.
+    - `limit` (int): Cantidad máxima de resultados por página.
+    - `offset` (int): Resultados a saltar; usar el `next_offset` de la página anterior.
+
+    **Respuesta exitosa (200):**
+    - **Descripción**: Devuelve `results`, cada uno con `type` (`farm` o `plot`), `farm_id`, `plot_id` (None para fincas), `name` y `similarity`, ordenados de mayor a menor similitud, y `next_offset` (None en la última página). Solo incluye las fincas del usuario y los lotes de las fincas en las que tiene el permiso `read_plots`.
+
+    **Errores:**
+    - **400 Bad Request**: Si la búsqueda tiene menos de 3 caracteres.
+    - **401 Unauthorized**: Si el token de sesión es inválido o el usuario no se encuentra.
+    """
+    user = verify_session_token(session_token)
+    if not user:
+        logger.warning(INVALID_SESSION_TOKEN_MESSAGE)
+        return session_token_invalid_response()
+    return search_farms_and_plots(q, user, db, limit, offset)
+
 @router.post("/delete-farm/{farm_id}")
 def delete_farm_endpoint(farm_id: int, session_token: str, db: Session = Depends(get_db_session)):
     """
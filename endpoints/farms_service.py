@@ -1,11 +1,30 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from dataBase import get_db_session
 from utils.response import create_response
-from models.models import Farms, PlotStates, Plots, UserRoleFarm, UserRoleFarmStates
-from adapters.user_client import get_user_role_ids
+from models.models import Farms, FarmStates, AreaUnits, PlotStates, Plots, UserRoleFarm, UserRoleFarmStates
+from adapters.user_client import get_user_role_ids, get_user_role_ids_bulk
+from adapters.circuit_breaker import get_circuit_breaker_metrics
+from adapters.cache_invalidation import USER_ROLE_EVENT, publish_invalidation
+from utils.farm_summary import rebuild_farm_summaries
 import logging
-from domain.schemas import FarmDetailResponse, UserRoleFarmResponse, UserRoleFarmCreateRequest
+from domain.schemas import (
+    FarmDetailResponse,
+    FarmsBatchRequest,
+    FarmsBatchResponse,
+    PlotsVerifyRequest,
+    PlotsVerifyResponse,
+    PlotVerification,
+    UserRoleFarmLookup,
+    UserRoleFarmResponse,
+    UserRoleFarmCreateRequest,
+    UserRoleFarmCreateResult,
+    UserRoleFarmsBulkCreateRequest,
+    UserRoleFarmsBulkCreateResponse,
+    UserRoleFarmsBulkRequest,
+    UserRoleFarmsBulkResponse,
+)
 
 router = APIRouter()
 
@@ -30,6 +49,47 @@ def get_farm_endpoint(farm_id: int, db: Session = Depends(get_db_session)):
         farm_state=farm.state.name if farm.state else None,
     )
 
+@router.post("/get-farms", response_model=FarmsBatchResponse, include_in_schema=False)
+def get_farms_endpoint(request: FarmsBatchRequest, db: Session = Depends(get_db_session)):
+    """
+    Obtiene varias fincas por sus IDs en una sola consulta.
+
+    La unidad de área y el estado se obtienen con un JOIN en la misma consulta, en lugar
+    de una carga diferida por finca. Los IDs que no existen se reportan en `not_found`.
+    """
+    farm_ids = list(dict.fromkeys(request.farm_ids))
+    logger.info(f"Received request for /get-farms with {len(farm_ids)} farm ids")
+    rows = db.query(
+        Farms.farm_id,
+        Farms.name,
+        Farms.area,
+        Farms.area_unit_id,
+        AreaUnits.name.label("area_unit"),
+        Farms.farm_state_id,
+        FarmStates.name.label("farm_state")
+    ).join(
+        AreaUnits, Farms.area_unit_id == AreaUnits.area_unit_id
+    ).join(
+        FarmStates, Farms.farm_state_id == FarmStates.farm_state_id
+    ).filter(Farms.farm_id.in_(farm_ids)).all()
+
+    farms_by_id = {row.farm_id: row for row in rows}
+    return FarmsBatchResponse(
+        farms=[
+            FarmDetailResponse(
+                farm_id=row.farm_id,
+                name=row.name,
+                area=float(row.area),
+                area_unit_id=row.area_unit_id,
+                area_unit=row.area_unit,
+                farm_state_id=row.farm_state_id,
+                farm_state=row.farm_state,
+            )
+            for row in (farms_by_id.get(farm_id) for farm_id in farm_ids) if row
+        ],
+        not_found=[farm_id for farm_id in farm_ids if farm_id not in farms_by_id]
+    )
+
 @router.get("/get-user-role-farm/{user_id}/{farm_id}", response_model=UserRoleFarmResponse, include_in_schema=False)
 def get_user_role_farm(user_id: int, farm_id:int, db: Session = Depends(get_db_session)):
     """
@@ -65,6 +125,70 @@ def get_user_role_farm(user_id: int, farm_id:int, db: Session = Depends(get_db_s
         # Raise HTTPException for internal errors to ensure proper FastAPI handling
         raise HTTPException(status_code=500, detail="Internal server error retrieving user role farm relationship")
 
+@router.post("/get-user-role-farms", response_model=UserRoleFarmsBulkResponse, include_in_schema=False)
+def get_user_role_farms_endpoint(request: UserRoleFarmsBulkRequest, db: Session = Depends(get_db_session)):
+    """
+    Obtiene la relación user_role_farm y su estado para muchos pares (usuario, finca).
+
+    Los usuarios se deduplican y sus user_role_ids se resuelven en paralelo con
+    concurrencia limitada; luego todos los pares se responden con una sola consulta a `UserRoleFarm`.
+    """
+    pairs = list(dict.fromkeys((pair.user_id, pair.farm_id) for pair in request.pairs))
+    logger.info(f"Received request for /get-user-role-farms with {len(pairs)} pairs")
+    try:
+        user_role_ids_by_user = get_user_role_ids_bulk(user_id for user_id, _ in pairs)
+
+        all_user_role_ids = {
+            user_role_id
+            for user_role_ids in user_role_ids_by_user.values() if user_role_ids
+            for user_role_id in user_role_ids
+        }
+        farm_ids = {farm_id for _, farm_id in pairs}
+
+        urfs_by_key = {}
+        if all_user_role_ids:
+            rows = db.query(
+                UserRoleFarm.user_role_farm_id,
+                UserRoleFarm.user_role_id,
+                UserRoleFarm.farm_id,
+                UserRoleFarm.user_role_farm_state_id,
+                UserRoleFarmStates.name.label("user_role_farm_state")
+            ).join(
+                UserRoleFarmStates, UserRoleFarm.user_role_farm_state_id == UserRoleFarmStates.user_role_farm_state_id
+            ).filter(
+                UserRoleFarm.user_role_id.in_(all_user_role_ids),
+                UserRoleFarm.farm_id.in_(farm_ids)
+            ).order_by(UserRoleFarm.user_role_farm_id).all()
+            for row in rows:
+                urfs_by_key.setdefault((row.user_role_id, row.farm_id), row)
+
+        results = []
+        for user_id, farm_id in pairs:
+            user_role_ids = user_role_ids_by_user.get(user_id)
+            if user_role_ids is None:
+                results.append(UserRoleFarmLookup(user_id=user_id, farm_id=farm_id, found=False, error="No se pudieron obtener los roles del usuario"))
+                continue
+            urf = next((urfs_by_key[(user_role_id, farm_id)] for user_role_id in user_role_ids if (user_role_id, farm_id) in urfs_by_key), None)
+            if not urf:
+                results.append(UserRoleFarmLookup(user_id=user_id, farm_id=farm_id, found=False))
+                continue
+            results.append(UserRoleFarmLookup(
+                user_id=user_id,
+                farm_id=farm_id,
+                found=True,
+                user_role_farm=UserRoleFarmResponse(
+                    user_role_farm_id=urf.user_role_farm_id,
+                    user_role_id=urf.user_role_id,
+                    farm_id=farm_id,
+                    user_role_farm_state_id=urf.user_role_farm_state_id,
+                    user_role_farm_state=urf.user_role_farm_state
+                )
+            ))
+        return UserRoleFarmsBulkResponse(results=results)
+    except Exception as e:
+        logger.error(f"Error getting user_role_farms in bulk: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error retrieving user role farm relationships")
+
 @router.get("/get-user-role-farm-state/{state_name}", include_in_schema=False)
 def get_user_role_farm_state_by_name(state_name: str, db: Session = Depends(get_db_session)):
     """
@@ -97,6 +221,8 @@ def create_user_role_farm_endpoint(data: UserRoleFarmCreateRequest, db: Session
             user_role_farm_state_id=data.user_role_farm_state_id
         )
         db.add(new_urf)
+        # El user_role suele ser nuevo (invitaciones) y no se conoce su usuario: se invalidan las listas de roles en caché
+        publish_invalidation(db, USER_ROLE_EVENT, new_user_role_ids=[data.user_role_id])
         db.commit()
         db.refresh(new_urf)
         return {
@@ -107,6 +233,74 @@ def create_user_role_farm_endpoint(data: UserRoleFarmCreateRequest, db: Session
         logger.error(f"Error creando user_role_farm: {str(e)}")
         raise HTTPException(status_code=500, detail="Error creando user_role_farm")
     
+@router.post("/create-user-role-farms", response_model=UserRoleFarmsBulkCreateResponse, include_in_schema=False)
+def create_user_role_farms_endpoint(request: UserRoleFarmsBulkCreateRequest, db: Session = Depends(get_db_session)):
+    """
+    Crea muchas relaciones UserRoleFarm en una sola transacción.
+
+    Las fincas y estados se validan con una consulta cada uno y las relaciones válidas se
+    insertan con un único `INSERT ... ON CONFLICT DO NOTHING RETURNING`. Cada elemento
+    se reporta como `created`, `already_exists`, `duplicate` (repetido en la petición) o `invalid`.
+    """
+    logger.info(f"Received request for /create-user-role-farms with {len(request.items)} items")
+    try:
+        farm_ids = {item.farm_id for item in request.items}
+        state_ids = {item.user_role_farm_state_id for item in request.items}
+        existing_farm_ids = {farm_id for (farm_id,) in db.query(Farms.farm_id).filter(Farms.farm_id.in_(farm_ids)).all()}
+        existing_state_ids = {
+            state_id for (state_id,) in db.query(UserRoleFarmStates.user_role_farm_state_id).filter(
+                UserRoleFarmStates.user_role_farm_state_id.in_(state_ids)
+            ).all()
+        }
+
+        results = []
+        seen = set()
+        to_insert = []
+        for item in request.items:
+            key = (item.user_role_id, item.farm_id)
+            result = UserRoleFarmCreateResult(user_role_id=item.user_role_id, farm_id=item.farm_id, status="invalid")
+            if key in seen:
+                result.status = "duplicate"
+                result.message = "La relación está repetida en la petición"
+            elif item.farm_id not in existing_farm_ids:
+                result.message = "Finca no encontrada"
+            elif item.user_role_farm_state_id not in existing_state_ids:
+                result.message = "Estado de user_role_farm no encontrado"
+            else:
+                seen.add(key)
+                to_insert.append(item.model_dump())
+            results.append(result)
+
+        created = {}
+        if to_insert:
+            statement = pg_insert(UserRoleFarm).values(to_insert).on_conflict_do_nothing(
+                index_elements=[UserRoleFarm.user_role_id, UserRoleFarm.farm_id]
+            ).returning(UserRoleFarm.user_role_farm_id, UserRoleFarm.user_role_id, UserRoleFarm.farm_id)
+            created = {
+                (row.user_role_id, row.farm_id): row.user_role_farm_id
+                for row in db.execute(statement)
+            }
+            if created:
+                publish_invalidation(db, USER_ROLE_EVENT, new_user_role_ids=sorted({user_role_id for user_role_id, _ in created}))
+            db.commit()
+
+        for result in results:
+            if result.message:
+                continue
+            key = (result.user_role_id, result.farm_id)
+            if key in created:
+                result.status = "created"
+                result.user_role_farm_id = created[key]
+            else:
+                result.status = "already_exists"
+                result.message = "La relación user_role_farm ya existe"
+
+        return UserRoleFarmsBulkCreateResponse(results=results)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error creando user_role_farms en bloque: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error creando user_role_farms")
+
 @router.get("/verify-plot/{plot_id}", include_in_schema=False)
 def verify_plot_endpoint(plot_id: int, db: Session = Depends(get_db_session)):
     """
@@ -143,4 +337,62 @@ def verify_plot_endpoint(plot_id: int, db: Session = Depends(get_db_session)):
         "farm_id": plot.farm_id,
         "plot_state_id": plot.plot_state_id,
         "plot_state": active_plot_state.name
-    }
\ No newline at end of file
+    }
+
+@router.post("/verify-plots", response_model=PlotsVerifyResponse, include_in_schema=False)
+def verify_plots_endpoint(request: PlotsVerifyRequest, db: Session = Depends(get_db_session)):
+    """
+    Verifica varios lotes en una sola consulta.
+
+    Para cada ID retorna si el lote existe, si está activo, su `farm_id` y su nombre.
+    El nombre del estado se obtiene con un JOIN, por lo que no se consulta `PlotStates` por separado.
+    """
+    plot_ids = list(dict.fromkeys(request.plot_ids))
+    logger.info(f"Verificando {len(plot_ids)} lotes")
+    rows = db.query(
+        Plots.plot_id,
+        Plots.name,
+        Plots.farm_id,
+        Plots.plot_state_id,
+        PlotStates.name.label("plot_state")
+    ).outerjoin(
+        PlotStates, Plots.plot_state_id == PlotStates.plot_state_id
+    ).filter(Plots.plot_id.in_(plot_ids)).all()
+
+    plots_by_id = {row.plot_id: row for row in rows}
+    verifications = []
+    for plot_id in plot_ids:
+        row = plots_by_id.get(plot_id)
+        if not row:
+            verifications.append(PlotVerification(plot_id=plot_id, exists=False, active=False))
+            continue
+        verifications.append(PlotVerification(
+            plot_id=plot_id,
+            exists=True,
+            active=row.plot_state == "Activo",
+            farm_id=row.farm_id,
+            name=row.name,
+            plot_state_id=row.plot_state_id,
+            plot_state=row.plot_state
+        ))
+    return PlotsVerifyResponse(plots=verifications)
+
+@router.get("/circuit-breakers", include_in_schema=False)
+def circuit_breakers_metrics_endpoint():
+    """
+    Expone el estado de los circuit breakers de las llamadas al servicio de usuarios
+    (estado, tasa de fallos de la ventana, llamadas rechazadas y veces abierto).
+    """
+    return {"circuit_breakers": get_circuit_breaker_metrics()}
+
+@router.post("/rebuild-farm-summaries", include_in_schema=False)
+def rebuild_farm_summaries_endpoint(db: Session = Depends(get_db_session)):
+    """
+    Recalcula desde cero la tabla `farm_summary` para todas las fincas activas.
+    """
+    try:
+        farms = rebuild_farm_summaries(db)
+    except Exception as e:
+        logger.error(f"Error al reconstruir el resumen de las fincas: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error al reconstruir el resumen de las fincas")
+    return {"farms": farms}
@@ -1,15 +1,24 @@
-from fastapi import APIRouter, Depends
+from typing import List, Optional
+from fastapi import APIRouter, Depends, File, Header, Query, UploadFile
 from sqlalchemy.orm import Session
 from dataBase import get_db_session
 from adapters.user_client import verify_session_token
 from utils.response import session_token_invalid_response
 from utils.response import create_response
+from utils.idempotency import IDEMPOTENCY_KEY_HEADER, run_idempotent
 from use_cases.create_plot_use_case import create_plot
+from use_cases.import_plots_use_case import import_plots
 from use_cases.update_plot_use_case import (
     update_plot_general_info,
     update_plot_location,
 )
 from use_cases.list_plots_use_case import list_plots
+from use_cases.viewport_plots_use_case import DEFAULT_VIEWPORT_PAGE_SIZE, MAX_VIEWPORT_PAGE_SIZE, list_plots_in_viewport
+from use_cases.nearest_plots_use_case import DEFAULT_NEAREST_PLOTS, MAX_NEAREST_PLOTS, find_nearest_plots
+from use_cases.plot_clusters_use_case import get_plot_clusters
+from use_cases.altitude_bands_use_case import get_altitude_bands
+from adapters.plot_clusters import MAX_CLUSTER_ZOOM
+from use_cases.export_plots_use_case import export_plots
 from use_cases.get_plot_use_case import get_plot
 from use_cases.delete_plot_use_case import delete_plot
 import logging
@@ -27,15 +36,49 @@ INVALID_SESSION_TOKEN_MESSAGE = "Token de sesión inválido o usuario no encontr
 
 # Endpoint para crear un lote
 @router.post("/create-plot")
-def create_plot_endpoint(request: CreatePlotRequest, session_token: str, db: Session = Depends(get_db_session)):
+def create_plot_endpoint(
+    request: CreatePlotRequest,
+    session_token: str,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_KEY_HEADER),
+    db: Session = Depends(get_db_session)
+):
     """
     Crea un nuevo lote (plot) en una finca.
+
+    Si se envía el encabezado `Idempotency-Key`, los reintentos con la misma clave
+    reciben la respuesta original sin volver a crear el lote.
+    """
+    def _create_plot():
+        user = verify_session_token(session_token)
+        if not user:
+            logger.warning(INVALID_SESSION_TOKEN_MESSAGE)
+            return session_token_invalid_response()
+        return create_plot(request, user, db)
+
+    return run_idempotent(db, idempotency_key, session_token, "create-plot", request.model_dump_json(), _create_plot)
+
+# Endpoint para importar lotes en bloque desde un archivo CSV o GeoJSON
+@router.post("/import-plots/{farm_id}", summary="Importar lotes desde CSV o GeoJSON")
+def import_plots_endpoint(farm_id: int, session_token: str, file: UploadFile = File(...), db: Session = Depends(get_db_session)):
+    """
+    Importa varios lotes a una finca a partir de un archivo CSV (columnas `name`,
+    `coffee_variety_id`, `latitude`, `longitude`, `altitude`) o de un GeoJSON
+    FeatureCollection con geometrías `Point`.
+
+    - **farm_id**: ID de la finca.
+    - **session_token**: Token de sesión del usuario autenticado.
+    - **file**: Archivo `.csv` o `.geojson`.
+
+    **Respuestas**:
+    - **200**: Lotes importados; las filas inválidas se reportan en `errors`.
+    - **400**: Token inválido, falta de permisos, formato no soportado o ninguna fila válida.
+    - **500**: Error al guardar los lotes.
     """
     user = verify_session_token(session_token)
     if not user:
         logger.warning(INVALID_SESSION_TOKEN_MESSAGE)
         return session_token_invalid_response()
-    return create_plot(request, user, db)
+    return import_plots(farm_id, file.file, file.filename, file.content_type, user, db)
 
 # Endpoint para actualizar información general del lote
 @router.post("/update-plot-general-info", summary="Actualizar información general del lote", description="Actualiza el nombre y la variedad de café de un lote específico.")
@@ -82,6 +125,145 @@ def list_plots_endpoint(farm_id: int, session_token: str, db: Session = Depends(
         return session_token_invalid_response()
     return list_plots(farm_id, user, db)
 
+# Endpoint para buscar los lotes dentro de un rectángulo del mapa
+@router.get("/plots-in-viewport", summary="Buscar lotes en un área del mapa")
+def plots_in_viewport_endpoint(
+    session_token: str,
+    min_latitude: float = Query(..., ge=-90, le=90),
+    min_longitude: float = Query(..., ge=-180, le=180),
+    max_latitude: float = Query(..., ge=-90, le=90),
+    max_longitude: float = Query(..., ge=-180, le=180),
+    limit: int = Query(DEFAULT_VIEWPORT_PAGE_SIZE, ge=1, le=MAX_VIEWPORT_PAGE_SIZE),
+    cursor: Optional[int] = Query(None, description="`next_cursor` de la página anterior"),
+    db: Session = Depends(get_db_session)
+):
+    """
+    Obtiene los lotes activos cuyas coordenadas están dentro del rectángulo
+    indicado, solo de las fincas en las que el usuario tiene el permiso `read_plots`.
+
+    - Si `min_longitude` es mayor que `max_longitude`, el rectángulo cruza el antimeridiano (±180°).
+    - Los resultados se paginan: se retornan como máximo `limit` lotes y un `next_cursor` para pedir la página siguiente (None en la última).
+
+    **Respuestas**:
+    - **200**: Lotes del área obtenidos exitosamente.
+    - **400**: Rectángulo inválido.
+    - **401**: Token de sesión inválido.
+    """
+    user = verify_session_token(session_token)
+    if not user:
+        logger.warning(INVALID_SESSION_TOKEN_MESSAGE)
+        return session_token_invalid_response()
+    return list_plots_in_viewport(min_latitude, min_longitude, max_latitude, max_longitude, user, db, limit, cursor)
+
+# Endpoint para buscar los lotes más cercanos a una posición
+@router.get("/nearest-plots", summary="Buscar los lotes más cercanos a una posición")
+def nearest_plots_endpoint(
+    session_token: str,
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    k: int = Query(DEFAULT_NEAREST_PLOTS, ge=1, le=MAX_NEAREST_PLOTS),
+    max_distance_km: Optional[float] = Query(None, gt=0),
+    db: Session = Depends(get_db_session)
+):
+    """
+    Obtiene los `k` lotes activos más cercanos a la posición indicada, entre
+    todas las fincas en las que el usuario tiene el permiso `read_plots`,
+    ordenados por distancia (`distance_km`, distancia sobre la superficie terrestre).
+
+    - `max_distance_km` descarta los lotes más lejanos que esa distancia.
+    - Los lotes sin coordenadas no se incluyen.
+
+    **Respuestas**:
+    - **200**: Lotes más cercanos obtenidos exitosamente.
+    - **401**: Token de sesión inválido.
+    """
+    user = verify_session_token(session_token)
+    if not user:
+        logger.warning(INVALID_SESSION_TOKEN_MESSAGE)
+        return session_token_invalid_response()
+    return find_nearest_plots(latitude, longitude, user, db, k, max_distance_km)
+
+# Endpoint para obtener los lotes de un área del mapa agrupados según el zoom
+@router.get("/plot-clusters", summary="Agrupar los lotes de un área del mapa")
+def plot_clusters_endpoint(
+    session_token: str,
+    min_latitude: float = Query(..., ge=-90, le=90),
+    min_longitude: float = Query(..., ge=-180, le=180),
+    max_latitude: float = Query(..., ge=-90, le=90),
+    max_longitude: float = Query(..., ge=-180, le=180),
+    zoom: int = Query(..., ge=0, le=MAX_CLUSTER_ZOOM),
+    db: Session = Depends(get_db_session)
+):
+    """
+    Obtiene los lotes activos del área agrupados por celdas de geohash, cuya
+    precisión depende del `zoom` del mapa, solo de las fincas en las que el
+    usuario tiene el permiso `read_plots`. Cada grupo incluye la cantidad de
+    lotes (`count`), su centroide y la variedad de café predominante.
+
+    - Si `min_longitude` es mayor que `max_longitude`, el área cruza el antimeridiano (±180°).
+    - Se retornan los grupos de las celdas completas que cubren el área, por lo que algunos pueden quedar fuera de ella.
+
+    **Respuestas**:
+    - **200**: Grupos de lotes obtenidos exitosamente.
+    - **400**: Área inválida o demasiado grande para el nivel de zoom.
+    - **401**: Token de sesión inválido.
+    """
+    user = verify_session_token(session_token)
+    if not user:
+        logger.warning(INVALID_SESSION_TOKEN_MESSAGE)
+        return session_token_invalid_response()
+    return get_plot_clusters(min_latitude, min_longitude, max_latitude, max_longitude, zoom, user, db)
+
+# Endpoint para obtener los lotes agrupados por franjas de altitud y variedad
+@router.get("/altitude-bands", summary="Lotes por franja de altitud y variedad")
+def altitude_bands_endpoint(
+    session_token: str,
+    farm_id: Optional[int] = Query(None, description="Finca a analizar; si se omite, todas las fincas del usuario"),
+    band_edges: Optional[List[float]] = Query(None, description="Límites de las franjas en msnm, en orden creciente (por ejemplo `band_edges=1200&band_edges=1600&band_edges=2000`)"),
+    db: Session = Depends(get_db_session)
+):
+    """
+    Agrupa los lotes activos en franjas de altitud y cuenta cuántos hay de
+    cada variedad de café en cada franja.
+
+    - Con `farm_id` se analizan los lotes de esa finca; sin él, los de todas las fincas en las que el usuario tiene el permiso `read_plots`.
+    - Las franjas van de cada límite al siguiente; la última incluye su límite superior. Por defecto: 0, 1200, 1400, 1600, 1800, 2000 y 3000 msnm.
+    - `without_altitude_count` cuenta los lotes sin altitud y `out_of_range_count` los que quedan fuera de los límites.
+
+    **Respuestas**:
+    - **200**: Franjas de altitud obtenidas exitosamente.
+    - **400**: Límites de altitud inválidos.
+    - **401**: Token de sesión inválido.
+    """
+    user = verify_session_token(session_token)
+    if not user:
+        logger.warning(INVALID_SESSION_TOKEN_MESSAGE)
+        return session_token_invalid_response()
+    return get_altitude_bands(user, db, farm_id, band_edges)
+
+# Endpoint para exportar todos los lotes de una finca en streaming (NDJSON)
+@router.get("/export-plots/{farm_id}", summary="Exportar los lotes de una finca (NDJSON)")
+def export_plots_endpoint(farm_id: int, session_token: str, db: Session = Depends(get_db_session)):
+    """
+    Exporta todos los lotes activos de una finca como JSON delimitado por saltos de línea
+    (`application/x-ndjson`), un lote por línea. La respuesta se envía en streaming,
+    por lo que es adecuada para fincas con muchos lotes.
+
+    - **farm_id**: ID de la finca.
+    - **session_token**: Token de sesión del usuario autenticado.
+
+    **Respuestas**:
+    - **200**: Stream NDJSON con los lotes de la finca.
+    - **400**: Token inválido o falta de permisos para ver los lotes.
+    - **404**: Finca no encontrada o inactiva.
+    - **500**: Error al obtener los roles o permisos del usuario.
+    """
+    user = verify_session_token(session_token)
+    if not user:
+        logger.warning(INVALID_SESSION_TOKEN_MESSAGE)
+        return session_token_invalid_response()
+    return export_plots(farm_id, user, db)
+
 # Endpoint para obtener la información de un lote específico
 @router.get("/get-plot/{plot_id}", summary="Obtener información de un lote")
 def get_plot_endpoint(plot_id: int, session_token: str, db: Session = Depends(get_db_session)):
@@ -1,12 +1,39 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from dataBase import engine
 from endpoints import farms, utils, collaborators, plots, farms_service
 from utils.logger import setup_logger
+from utils.compression import CompressionMiddleware
+from utils.content_negotiation import ContentNegotiationMiddleware
+from utils.deadline import DeadlineMiddleware
+from utils.migrations import run_migrations
+from adapters.cache_invalidation import start_invalidation_listener
+from utils.response import NegotiatedResponse
 
 # Setup logging for the entire application
 logger = setup_logger()
 logger.info("Starting CoffeeTech Farms Service")
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Migraciones de esquema pendientes (tabla de idempotencia, índices)
+    run_migrations(engine)
+    # Invalidación de cachés entre workers mediante LISTEN/NOTIFY de Postgres
+    listener = start_invalidation_listener(engine)
+    yield
+    if listener:
+        listener.stop()
+
+app = FastAPI(default_response_class=NegotiatedResponse, lifespan=lifespan)
+
+# Plazo de cada petición para limitar timeouts y reintentos hacia el servicio de usuarios
+app.add_middleware(DeadlineMiddleware)
+
+# Servir JSON o MessagePack según el encabezado Accept del cliente
+app.add_middleware(ContentNegotiationMiddleware)
+
+# Comprimir (br/gzip) las respuestas grandes según el Accept-Encoding del cliente
+app.add_middleware(CompressionMiddleware)
 
 # Incluir las rutas de gestión de fincas
 app.include_router(farms.router, prefix="/farm", tags=["Fincas"])
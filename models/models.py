@@ -1,8 +1,13 @@
-from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, UniqueConstraint, CheckConstraint
+from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, UniqueConstraint, CheckConstraint, DateTime, LargeBinary, Index, func, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship, declarative_base
 
 Base = declarative_base()
 
+# Id del estado 'Activo' de user_role_farm en los datos iniciales. Los índices parciales
+# se declaran con este id; la migración los construye con el id real de la base.
+ACTIVE_USER_ROLE_FARM_STATE_ID = 1
+
 class FarmStates(Base):
     __tablename__ = 'farm_states'
     farm_state_id = Column(Integer, primary_key=True)
@@ -38,6 +43,10 @@ class Plots(Base):
         CheckConstraint('longitude BETWEEN -180 AND 180'),
         CheckConstraint('latitude BETWEEN -90 AND 90'),
         CheckConstraint('altitude >= 0 AND altitude <= 3000'),
+        # Lotes de una finca por estado (la búsqueda por nombre usa la restricción única (name, farm_id))
+        Index('ix_plots_farm_id_state_id', 'farm_id', 'plot_state_id'),
+        # Búsqueda de lotes por rectángulo del mapa (rango de latitud y luego de longitud)
+        Index('ix_plots_latitude_longitude', 'latitude', 'longitude'),
     )
 
     plot_id = Column(Integer, primary_key=True, index=True)
@@ -69,6 +78,8 @@ class AreaUnits(Base):
     area_unit_id = Column(Integer, primary_key=True)
     name = Column(String(255), nullable=False, unique=True)
     abbreviation = Column(String(10), nullable=False, unique=True)
+    # Hectáreas que equivale una unidad, para sumar áreas de fincas con unidades distintas
+    hectares_per_unit = Column(Numeric(20, 10), nullable=True)
 
     # Relaciones
     farms = relationship("Farms", back_populates="area_unit")
@@ -86,8 +97,49 @@ class UserRoleFarm(Base):
     user_role_id = Column(Integer, nullable=False)
     farm_id = Column(Integer, ForeignKey('farms.farm_id', ondelete='CASCADE'), nullable=False)
     user_role_farm_state_id = Column(Integer, ForeignKey('user_role_farm_states.user_role_farm_state_id'), nullable=False)
-    __table_args__ = (UniqueConstraint('user_role_id', 'farm_id'),)
+    __table_args__ = (
+        # También resuelve el acceso de los roles de un usuario a una finca
+        UniqueConstraint('user_role_id', 'farm_id'),
+        # Colaboradores de una finca por estado
+        Index('ix_user_role_farm_farm_state', 'farm_id', 'user_role_farm_state_id'),
+        # Fincas y permisos de los roles activos de un usuario (solo filas activas)
+        Index(
+            'ix_user_role_farm_active_role_farm', 'user_role_id', 'farm_id',
+            postgresql_where=text(f'user_role_farm_state_id = {ACTIVE_USER_ROLE_FARM_STATE_ID}')
+        ),
+    )
 
     # Relaciones
     farm = relationship('Farms', back_populates='user_roles_farms')
     state = relationship('UserRoleFarmStates', back_populates='user_role_farm')
+
+class FarmSummary(Base):
+    __tablename__ = 'farm_summary'
+
+    farm_id = Column(Integer, ForeignKey('farms.farm_id', ondelete='CASCADE'), primary_key=True)
+    active_plot_count = Column(Integer, nullable=False, default=0)
+    # Cantidad de lotes activos por variedad: {"<coffee_variety_id>": cantidad}
+    variety_counts = Column(JSONB, nullable=False, server_default='{}')
+    min_altitude = Column(Numeric(10, 2), nullable=True)
+    max_altitude = Column(Numeric(10, 2), nullable=True)
+    avg_altitude = Column(Numeric(10, 2), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+class IdempotencyKeys(Base):
+    __tablename__ = 'idempotency_keys'
+
+    idempotency_key_id = Column(Integer, primary_key=True)
+    key = Column(String(255), nullable=False)
+    scope = Column(String(64), nullable=False)
+    endpoint = Column(String(100), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    media_type = Column(String(100), nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    __table_args__ = (
+        UniqueConstraint('key', 'scope', 'endpoint'),
+        # Purga por lotes de las claves expiradas
+        Index('ix_idempotency_keys_expires_at', 'expires_at'),
+    )
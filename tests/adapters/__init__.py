@@ -0,0 +1 @@
+# Este archivo hace de tests/adapters un paquete de Python
@@ -0,0 +1,17 @@
+"""
+Configuración de las pruebas de adapters: cada prueba empieza con las cachés del cliente de usuarios vacías.
+"""
+import pytest
+
+from adapters import user_client
+
+
+@pytest.fixture(autouse=True)
+def clear_user_client_caches():
+    user_client._user_role_ids_cache.clear()
+    user_client._permissions_cache.clear()
+    user_client._invalid_session_tokens.clear()
+    yield
+    user_client._user_role_ids_cache.clear()
+    user_client._permissions_cache.clear()
+    user_client._invalid_session_tokens.clear()
@@ -0,0 +1,118 @@
+"""
+Pruebas unitarias para adapters/circuit_breaker.py y su uso en adapters/user_client.py
+"""
+from unittest.mock import MagicMock, patch
+
+import httpx
+
+from adapters.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, get_circuit_breaker, reset_circuit_breakers
+from adapters.user_client import _make_request
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker:
+    """Pruebas de las transiciones de estado del circuit breaker"""
+
+    def setup_method(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(
+            "test", failure_rate_threshold=0.5, window_size=4, minimum_calls=4,
+            open_duration=10, half_open_max_calls=2, clock=self.clock
+        )
+
+    def _fail(self, times):
+        for _ in range(times):
+            assert self.breaker.allow_request()
+            self.breaker.record_failure()
+
+    def test_stays_closed_below_minimum_calls(self):
+        self._fail(3)
+        assert self.breaker.state == CLOSED
+
+    def test_opens_at_failure_rate(self):
+        self.breaker.record_success()
+        self.breaker.record_success()
+        self._fail(2)
+
+        assert self.breaker.state == OPEN
+        assert not self.breaker.allow_request()
+        assert self.breaker.metrics()["rejected"] == 1
+
+    def test_half_open_closes_after_successful_trials(self):
+        self._fail(4)
+        self.clock.now = 10
+
+        assert self.breaker.state == HALF_OPEN
+        assert self.breaker.allow_request()
+        assert self.breaker.allow_request()
+        # Solo se permiten half_open_max_calls llamadas de prueba simultáneas
+        assert not self.breaker.allow_request()
+        self.breaker.record_success()
+        self.breaker.record_success()
+        assert self.breaker.state == CLOSED
+
+    def test_half_open_failure_reopens(self):
+        self._fail(4)
+        self.clock.now = 10
+        assert self.breaker.allow_request()
+        self.breaker.record_failure()
+
+        metrics = self.breaker.metrics()
+        assert metrics["state"] == OPEN
+        assert metrics["times_opened"] == 2
+        assert metrics["open_remaining_seconds"] == 10
+
+
+class TestMakeRequestCircuitBreaker:
+    """Pruebas de la integración del circuit breaker en _make_request"""
+
+    def setup_method(self):
+        reset_circuit_breakers()
+
+    def teardown_method(self):
+        reset_circuit_breakers()
+
+    @patch('adapters.user_client.httpx.Client')
+    def test_fails_fast_when_open(self, mock_client_class):
+        client = MagicMock()
+        mock_client_class.return_value.__enter__.return_value = client
+        client.get.side_effect = httpx.ConnectTimeout("timeout")
+        breaker = get_circuit_breaker("get_user_role_ids")
+
+        for _ in range(breaker.minimum_calls):
+            assert _make_request("/users-service/user-role-ids/1", operation="get_user_role_ids") is None
+        calls = client.get.call_count
+
+        assert breaker.state == OPEN
+        assert _make_request("/users-service/user-role-ids/1", operation="get_user_role_ids") is None
+        assert client.get.call_count == calls
+        # Otras operaciones no se ven afectadas
+        assert get_circuit_breaker("verify_session_token").state == CLOSED
+
+    @patch('adapters.user_client.httpx.Client')
+    def test_client_errors_do_not_count_as_failures(self, mock_client_class):
+        client = MagicMock()
+        mock_client_class.return_value.__enter__.return_value = client
+        client.get.return_value = httpx.Response(404, json={"detail": "not found"})
+
+        for _ in range(30):
+            _make_request("/users-service/1/name", operation="get_role_name_by_id")
+
+        assert get_circuit_breaker("get_role_name_by_id").metrics()["failures"] == 0
+
+    @patch('adapters.user_client.httpx.Client')
+    def test_server_errors_count_as_failures(self, mock_client_class):
+        client = MagicMock()
+        mock_client_class.return_value.__enter__.return_value = client
+        client.get.return_value = httpx.Response(500, text="internal error")
+
+        _make_request("/users-service/1/name", operation="get_role_name_by_id")
+
+        assert get_circuit_breaker("get_role_name_by_id").metrics()["failures"] == 1
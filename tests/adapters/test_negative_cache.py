@@ -0,0 +1,120 @@
+"""
+Pruebas unitarias para adapters/negative_cache.py y la caché de tokens inválidos de adapters/user_client.py
+"""
+from unittest.mock import patch
+
+from adapters import user_client
+from adapters.negative_cache import NegativeCache
+from adapters.user_client import UserServiceClientError, UserServiceUnavailableError, verify_session_token
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestNegativeCache:
+    """Pruebas de la caché negativa"""
+
+    def setup_method(self):
+        self.clock = FakeClock()
+        self.cache = NegativeCache(ttl=30, max_entries=3, bloom_bits=1 << 12, clock=self.clock)
+
+    def test_added_values_are_found_until_expiry(self):
+        self.cache.add("token-viejo")
+
+        assert self.cache.contains("token-viejo")
+        self.clock.now = 30
+        assert not self.cache.contains("token-viejo")
+        assert len(self.cache) == 0
+
+    def test_prefilter_rejects_unknown_values(self):
+        self.cache.add("token-viejo")
+
+        assert not self.cache.contains("token-valido")
+        assert self.cache.prefilter_rejections == 1
+
+    def test_tokens_are_not_stored_in_clear_text(self):
+        self.cache.add("token-viejo")
+        assert all(isinstance(key, bytes) and len(key) == 32 for key in self.cache._expires)
+
+    def test_size_is_bounded(self):
+        for i in range(5):
+            self.clock.now = i
+            self.cache.add(f"token-{i}")
+
+        assert len(self.cache) == 3
+        assert not self.cache.contains("token-0")
+        assert self.cache.contains("token-4")
+
+    def test_bloom_is_rebuilt_after_expiry(self):
+        cache = NegativeCache(ttl=1, max_entries=5000, bloom_bits=1 << 12, clock=self.clock)
+        for i in range(2000):
+            cache.add(f"token-{i}")
+        self.clock.now = 5
+        cache._purge_expired(self.clock.now)
+        cache.add("nuevo")
+
+        assert cache._bloom_insertions == 1
+        assert cache.contains("nuevo")
+        assert not cache.contains("token-1")
+
+class TestInvalidSessionTokenCache:
+    """Pruebas del uso de la caché negativa en verify_session_token"""
+
+    @patch('adapters.user_client._make_request_or_raise')
+    def test_rejected_token_is_not_verified_again(self, mock_request):
+        mock_request.return_value = {"status": "error", "message": "Token inválido"}
+
+        assert verify_session_token("token-expirado") is None
+        assert verify_session_token("token-expirado") is None
+        mock_request.assert_called_once()
+
+    @patch('adapters.user_client._make_request_or_raise')
+    def test_unauthorized_is_cached(self, mock_request):
+        mock_request.side_effect = UserServiceClientError(401, "Error calling verification: 401")
+
+        verify_session_token("token-expirado")
+
+        assert user_client._invalid_session_tokens.contains("token-expirado")
+
+    @patch('adapters.user_client._make_request_or_raise')
+    def test_rate_limited_is_not_cached(self, mock_request):
+        mock_request.side_effect = [
+            UserServiceClientError(429, "Error calling verification: 429"),
+            {"status": "success", "data": {"user": {"user_id": 1, "name": "Ana", "email": "ana@example.com"}}},
+        ]
+
+        assert verify_session_token("token") is None
+        assert not user_client._invalid_session_tokens.contains("token")
+        assert verify_session_token("token").user_id == 1
+
+    @patch('adapters.user_client._make_request_or_raise')
+    def test_malformed_success_body_is_not_cached(self, mock_request):
+        mock_request.return_value = {"status": "success", "data": None}
+
+        assert verify_session_token("token") is None
+        assert not user_client._invalid_session_tokens.contains("token")
+
+    @patch('adapters.user_client._make_request_or_raise')
+    def test_unavailable_user_service_is_not_cached(self, mock_request):
+        mock_request.side_effect = [
+            UserServiceUnavailableError("timeout"),
+            {"status": "success", "data": {"user": {"user_id": 1, "name": "Ana", "email": "ana@example.com"}}},
+        ]
+
+        assert verify_session_token("token") is None
+        assert verify_session_token("token").user_id == 1
+
+    @patch('adapters.user_client._make_request_or_raise')
+    def test_valid_token_is_not_cached(self, mock_request):
+        mock_request.return_value = {"status": "success", "data": {"user": {"user_id": 1, "name": "Ana", "email": "ana@example.com"}}}
+
+        verify_session_token("token")
+        verify_session_token("token")
+
+        assert mock_request.call_count == 2
+        assert len(user_client._invalid_session_tokens) == 0
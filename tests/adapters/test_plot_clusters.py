@@ -0,0 +1,185 @@
+"""
+Pruebas unitarias para adapters/plot_clusters.py
+"""
+import math
+import random
+from collections import Counter, defaultdict
+
+import orjson
+import pytest
+
+from adapters.cache_invalidation import PLOT_EVENT, handle_invalidation
+from adapters.plot_clusters import (
+    TileClusters,
+    count_covering_tiles,
+    covering_tiles,
+    geohash,
+    get_tile_clusters,
+    grid_size,
+    merge_clusters,
+    plot_cluster_cache,
+    precision_for_zoom,
+    tile_bounds,
+)
+
+
+def cell_rows(rows, precision):
+    """Agrupa los lotes por (finca, variedad, celda) como lo hace la consulta de la base"""
+    lat_cells, lon_cells = grid_size(precision)
+    groups = defaultdict(lambda: [0, 0.0, 0.0])
+    for farm_id, variety_id, latitude, longitude in rows:
+        key = (
+            farm_id,
+            variety_id,
+            math.floor((latitude + 90.0) / 180.0 * lat_cells),
+            math.floor((longitude + 180.0) / 360.0 * lon_cells)
+        )
+        groups[key][0] += 1
+        groups[key][1] += latitude
+        groups[key][2] += longitude
+    return [key + tuple(values) for key, values in groups.items()]
+
+
+@pytest.fixture(autouse=True)
+def clear_cluster_cache():
+    plot_cluster_cache.clear()
+    yield
+    plot_cluster_cache.clear()
+
+
+class TestGeohash:
+    """Pruebas de la codificación y de las celdas de geohash"""
+
+    def test_known_geohashes(self):
+        assert geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"
+        assert geohash(4.60971, -74.08175, 6) == "d2g64p"
+
+    def test_tile_bounds_contain_point(self):
+        min_lat, min_lon, max_lat, max_lon = tile_bounds("d2g6")
+        assert min_lat <= 4.60971 < max_lat
+        assert min_lon <= -74.08175 < max_lon
+
+    def test_precision_grows_with_zoom(self):
+        precisions = [precision_for_zoom(zoom) for zoom in range(23)]
+        assert precisions == sorted(precisions)
+        assert precisions[0] == 1 and precisions[-1] == 8
+
+    def test_covering_tiles(self):
+        tiles = covering_tiles(4.0, -76.0, 5.0, -75.0, 4)
+        assert len(tiles) == len(set(tiles)) == count_covering_tiles(4.0, -76.0, 5.0, -75.0, 4)
+        assert geohash(4.5, -75.5, 4) in tiles
+        assert geohash(5.5, -75.5, 4) not in tiles
+
+    def test_covering_tiles_across_antimeridian(self):
+        tiles = covering_tiles(-1.0, 179.0, 1.0, -179.0, 3)
+        assert geohash(0.0, 179.5, 3) in tiles
+        assert geohash(0.0, -179.5, 3) in tiles
+        assert geohash(0.0, 0.0, 3) not in tiles
+        assert count_covering_tiles(-1.0, 179.0, 1.0, -179.0, 3) == len(tiles)
+
+
+class TestClusters:
+    """Pruebas del agrupamiento de lotes"""
+
+    def setup_method(self):
+        rng = random.Random(3)
+        min_lat, min_lon, max_lat, max_lon = tile_bounds("d2g6")
+        self.rows = [
+            (rng.choice([1, 2, 3]), rng.choice([1, 2, 3]), rng.uniform(min_lat, max_lat), rng.uniform(min_lon, max_lon))
+            for _ in range(500)
+        ]
+
+    def _expected(self, farm_ids):
+        groups = defaultdict(list)
+        for farm_id, variety_id, latitude, longitude in self.rows:
+            if farm_id in farm_ids:
+                groups[geohash(latitude, longitude, 5)].append((variety_id, latitude, longitude))
+        expected = {}
+        for cell, plots in groups.items():
+            varieties = Counter(variety_id for variety_id, _, _ in plots)
+            expected[cell] = (
+                len(plots),
+                round(sum(plot[1] for plot in plots) / len(plots), 6),
+                round(sum(plot[2] for plot in plots) / len(plots), 6),
+                min(varieties, key=lambda variety_id: (-varieties[variety_id], variety_id))
+            )
+        return expected
+
+    def test_merge_matches_brute_force(self):
+        """Prueba cantidades, centroides y variedad predominante contra un recorrido completo"""
+        tile = TileClusters.from_rows(self.rows, 5, "d2g6")
+        clusters = merge_clusters([tile], [1, 3], 5)
+
+        assert {
+            cluster["geohash"]: (cluster["count"], cluster["latitude"], cluster["longitude"], cluster["dominant_coffee_variety_id"])
+            for cluster in clusters
+        } == self._expected({1, 3})
+        assert [cluster["geohash"] for cluster in clusters] == sorted(cluster["geohash"] for cluster in clusters)
+
+    def test_cell_rows_match_plot_rows(self):
+        """Prueba que los lotes agrupados por la base dan los mismos grupos que los lotes sueltos"""
+        tile = TileClusters.from_cell_rows(cell_rows(self.rows, 5), 5, "d2g6")
+
+        assert len(cell_rows(self.rows, 5)) < len(self.rows)
+        assert merge_clusters([tile], [1, 3], 5) == merge_clusters([TileClusters.from_rows(self.rows, 5, "d2g6")], [1, 3], 5)
+
+    def test_cells_outside_the_tile_are_dropped(self):
+        _, _, max_lat, max_lon = tile_bounds("d2g6")
+        rows = cell_rows([(1, 1, 4.6, -74.1), (1, 1, max_lat, max_lon), (1, 1, 90.0, 180.0)], 5)
+
+        assert int(TileClusters.from_cell_rows(rows, 5, "d2g6").counts.sum()) == 1
+        assert int(TileClusters.from_cell_rows(rows, 5, "zzzz").counts.sum()) == 1
+
+    def test_only_requested_farms_are_counted(self):
+        tile = TileClusters.from_rows(self.rows, 5, "d2g6")
+
+        assert sum(cluster["count"] for cluster in merge_clusters([tile], [2], 5)) == sum(1 for row in self.rows if row[0] == 2)
+        assert merge_clusters([tile], [9], 5) == []
+        assert tile.farms == {1, 2, 3}
+
+    def test_plots_outside_the_tile_are_dropped(self):
+        """Prueba que los lotes sobre el borde superior de la celda (de la celda vecina) no se cuentan"""
+        _, _, max_lat, max_lon = tile_bounds("d2g6")
+        tile = TileClusters.from_rows([(1, 1, 4.6, -74.1), (1, 1, max_lat, max_lon)], 5, "d2g6")
+
+        assert int(tile.counts.sum()) == 1
+
+    def test_empty_tile(self):
+        tile = TileClusters.from_rows([], 5, "d2g6")
+        assert merge_clusters([tile], [1], 5) == []
+
+
+class TestClusterCache:
+    """Pruebas de la caché de celdas y de su invalidación"""
+
+    def setup_method(self):
+        self.loads = []
+
+    def _loader(self, tile):
+        self.loads.append(tile)
+        return cell_rows([(1, 1, 4.60971, -74.08175)], len(tile) + 1)
+
+    def _send(self, **event):
+        handle_invalidation(orjson.dumps(event).decode())
+
+    def test_tiles_are_cached(self):
+        get_tile_clusters(5, "d2g6", self._loader)
+        get_tile_clusters(5, "d2g6", self._loader)
+        get_tile_clusters(6, "d2g6d", self._loader)
+
+        assert self.loads == ["d2g6", "d2g6d"]
+
+    def test_plot_event_evicts_tiles_of_the_farm_and_of_the_new_position(self):
+        get_tile_clusters(5, "d2g6", self._loader)
+        get_tile_clusters(5, "d2g7", lambda tile: [])
+        get_tile_clusters(5, "d2g5", lambda tile: [])
+        min_lat, min_lon, _, _ = tile_bounds("d2g7")
+
+        self._send(kind=PLOT_EVENT, farm_id=1, plot_id=10, name="Lote", latitude=min_lat + 0.01, longitude=min_lon + 0.01, active=True)
+
+        assert set(key for key in plot_cluster_cache._entries) == {(5, "d2g5")}
+
+    def test_farm_level_event_clears_the_cache(self):
+        get_tile_clusters(5, "d2g6", self._loader)
+        self._send(kind=PLOT_EVENT, farm_id=2)
+        assert len(plot_cluster_cache) == 0
@@ -0,0 +1,190 @@
+"""
+Pruebas unitarias para adapters/plot_spatial_index.py
+"""
+import math
+from decimal import Decimal
+import random
+from unittest.mock import Mock, patch
+
+import orjson
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from adapters.cache_invalidation import FARM_EVENT, PLOT_EVENT, handle_invalidation
+from adapters.plot_spatial_index import (
+    PlotSpatialIndex,
+    haversine_km,
+    plot_spatial_index,
+    publish_plot_change,
+)
+
+
+def _brute_force(points, latitude, longitude, k):
+    def distance(point):
+        lat1, lon1, lat2, lon2 = map(math.radians, (latitude, longitude, point[3], point[4]))
+        a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+        return 2 * 6371.0088 * math.asin(math.sqrt(a))
+    return [point[1] for point in sorted(points, key=distance)[:k]]
+
+
+class FakeLoader:
+    """Cargador que cuenta las consultas y retorna los puntos de las fincas pedidas"""
+
+    def __init__(self, points):
+        self.points = points
+        self.calls = []
+
+    def __call__(self, farm_ids):
+        self.calls.append(list(farm_ids))
+        return [point for point in self.points if point[0] in farm_ids]
+
+
+@pytest.fixture(autouse=True)
+def clear_global_index():
+    plot_spatial_index.clear()
+    yield
+    plot_spatial_index.clear()
+
+
+class TestPlotSpatialIndex:
+    """Pruebas del índice de coordenadas de lotes"""
+
+    def setup_method(self):
+        rng = random.Random(7)
+        self.points = [
+            (farm_id, farm_id * 1000 + i, f"Lote {i}", 4 + rng.uniform(-1, 1), -75 + rng.uniform(-1, 1))
+            for farm_id in (1, 2, 3)
+            for i in range(200)
+        ]
+        self.loader = FakeLoader(self.points)
+        self.index = PlotSpatialIndex()
+
+    def test_haversine_known_distance(self):
+        """Prueba la distancia entre Bogotá y Medellín (~240 km)"""
+        distance = haversine_km(4.711, -74.0721, [math.radians(6.2442)], [math.radians(-75.5812)])
+        assert distance[0] == pytest.approx(240, abs=5)
+
+    def test_nearest_matches_brute_force(self):
+        """Prueba que los k más cercanos coinciden con un recorrido completo, ordenados por distancia"""
+        result = self.index.nearest([1, 2], 4.2, -75.3, 15, self.loader)
+
+        expected = _brute_force([p for p in self.points if p[0] in (1, 2)], 4.2, -75.3, 15)
+        assert [plot["plot_id"] for plot in result] == expected
+        distances = [plot["distance_km"] for plot in result]
+        assert distances == sorted(distances)
+        assert {plot["farm_id"] for plot in result} <= {1, 2}
+
+    def test_max_distance(self):
+        """Prueba que se descartan los lotes más lejanos que `max_distance_km`"""
+        result = self.index.nearest([1, 2, 3], 4.0, -75.0, 1000, self.loader, max_distance_km=20)
+
+        assert result
+        assert all(plot["distance_km"] <= 20 for plot in result)
+        assert len(result) < len(self.points)
+
+    def test_farms_are_loaded_once(self):
+        """Prueba que solo se consultan las fincas que aún no están en memoria"""
+        self.index.nearest([1, 2], 4.0, -75.0, 5, self.loader)
+        self.index.nearest([1, 2], 4.5, -75.5, 5, self.loader)
+        self.index.nearest([2, 3], 4.5, -75.5, 5, self.loader)
+
+        assert self.loader.calls == [[1, 2], [3]]
+        assert len(self.index) == 600
+
+    def test_empty_farms(self):
+        """Prueba que sin fincas o sin lotes con coordenadas no se retorna nada"""
+        assert self.index.nearest([], 4.0, -75.0, 5, self.loader) == []
+        assert self.index.nearest([9], 4.0, -75.0, 5, self.loader) == []
+        assert self.loader.calls == [[9]]
+
+    def test_upsert_and_remove(self):
+        """Prueba que los cambios de lotes se aplican sin recargar la finca"""
+        self.index.nearest([1], 4.0, -75.0, 1, self.loader)
+
+        self.index.upsert_plot(1, 99, "Lote nuevo", 10.0, -70.0)
+        assert self.index.nearest([1], 10.0, -70.0, 1, self.loader)[0]["plot_id"] == 99
+
+        self.index.upsert_plot(1, 99, "Lote nuevo", 10.0, -60.0)
+        nearest = self.index.nearest([1], 10.0, -60.0, 1, self.loader)[0]
+        assert (nearest["plot_id"], nearest["distance_km"]) == (99, 0)
+
+        self.index.remove_plot(1, 99)
+        assert self.index.nearest([1], 10.0, -60.0, 1, self.loader)[0]["plot_id"] != 99
+        assert self.loader.calls == [[1]]
+
+    def test_load_that_raced_with_a_change_is_not_kept(self):
+        """Prueba que una carga concurrente con un cambio de la finca no queda en memoria"""
+        def loader(farm_ids):
+            # El lote se mueve mientras se leía la finca
+            self.index.upsert_plot(1, 1000, "Lote 0", 0.0, 0.0)
+            return self.loader(farm_ids)
+
+        self.index.nearest([1], 4.0, -75.0, 1, loader)
+        self.index.nearest([1], 4.0, -75.0, 1, self.loader)
+
+        assert self.loader.calls == [[1], [1]]
+
+
+class TestPlotEvents:
+    """Pruebas de la actualización del índice global por eventos de invalidación"""
+
+    def setup_method(self):
+        self.loader = FakeLoader([(1, 10, "Lote A", 4.0, -75.0), (1, 11, "Lote B", 4.1, -75.1)])
+        plot_spatial_index.nearest([1], 4.0, -75.0, 5, self.loader)
+
+    def _ids(self):
+        return [plot["plot_id"] for plot in plot_spatial_index.nearest([1], 4.0, -75.0, 5, self.loader)]
+
+    def _send(self, **event):
+        handle_invalidation(orjson.dumps(event).decode())
+
+    def test_plot_event_upserts_and_removes(self):
+        self._send(kind=PLOT_EVENT, farm_id=1, plot_id=12, name="Lote C", latitude=4.05, longitude=-75.05, active=True)
+        assert self._ids() == [10, 12, 11]
+
+        self._send(kind=PLOT_EVENT, farm_id=1, plot_id=10, name="Lote A", latitude=4.0, longitude=-75.0, active=False)
+        assert self._ids() == [12, 11]
+        assert len(self.loader.calls) == 1
+
+    def test_farm_level_events_evict_the_farm(self):
+        self._send(kind=PLOT_EVENT, farm_id=1)
+        self._ids()
+        self._send(kind=FARM_EVENT, farm_id=1, user_role_ids=[])
+        self._ids()
+
+        assert self.loader.calls == [[1], [1], [1]]
+
+    def test_publish_plot_change_payload(self):
+        """Prueba que las coordenadas (Decimal en el modelo) se publican como números"""
+        db = Mock(spec=Session)
+        plot = Mock(farm_id=1, plot_id=12, latitude=Decimal("4.5"), longitude=None)
+        plot.name = "Lote C"
+
+        with patch('adapters.plot_spatial_index.publish_invalidation') as mock_publish:
+            publish_plot_change(db, plot, active=False)
+
+        mock_publish.assert_called_once_with(
+            db, PLOT_EVENT, farm_id=1, plot_id=12, name="Lote C", latitude=4.5, longitude=None, active=False
+        )
+
+    def test_local_dispatch_after_commit(self):
+        """Prueba que sin LISTEN/NOTIFY el evento se aplica al confirmar, y no tras un rollback"""
+        plot = Mock(farm_id=1, plot_id=12, latitude=4.05, longitude=-75.05)
+        plot.name = "Lote C"
+
+        with patch('adapters.cache_invalidation.CACHE_INVALIDATION_ENABLED', False):
+            db = Session(create_engine("sqlite://"))
+            db.execute(text("SELECT 1"))
+            publish_plot_change(db, plot)
+            assert self._ids() == [10, 11]
+            db.commit()
+            assert self._ids() == [10, 12, 11]
+
+            db.execute(text("SELECT 1"))
+            publish_plot_change(db, plot, active=False)
+            db.rollback()
+            assert self._ids() == [10, 12, 11]
+            db.execute(text("SELECT 1"))
+            db.commit()
+            assert self._ids() == [10, 12, 11]
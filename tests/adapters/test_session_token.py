@@ -0,0 +1,218 @@
+"""
+Pruebas unitarias para adapters/session_token.py (verificación local de tokens de sesión firmados)
+"""
+from unittest.mock import patch
+import time
+
+import pytest
+import rsa
+from jose import jwt
+
+from adapters import user_client
+from adapters.session_token import LocalTokenVerifier, build_local_token_verifier, load_verification_key
+from adapters.user_client import UserServiceClientError, UserServiceUnavailableError, verify_session_token
+
+SECRET = "secreto-de-pruebas"
+NOW = int(time.time())
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = NOW
+
+    def __call__(self):
+        return self.now
+
+
+class DeferredExecutor:
+    """Guarda las tareas enviadas para ejecutarlas a mano en la prueba."""
+
+    def __init__(self):
+        self.tasks = []
+
+    def submit(self, fn, *args):
+        self.tasks.append((fn, args))
+
+    def run_all(self):
+        tasks, self.tasks = self.tasks, []
+        for fn, args in tasks:
+            fn(*args)
+
+
+def make_token(key=SECRET, algorithm="HS256", **claims):
+    payload = {"user_id": 1, "name": "Ana", "email": "ana@example.com", "exp": NOW + 3600}
+    payload.update(claims)
+    return jwt.encode(payload, key, algorithm=algorithm)
+
+
+class TestLocalTokenVerifier:
+    """Pruebas del verificador local"""
+
+    def setup_method(self):
+        self.clock = FakeClock()
+        self.executor = DeferredExecutor()
+        self.remote_results = []
+        self.verifier = LocalTokenVerifier(
+            SECRET,
+            remote_check=self.remote_check,
+            algorithms=["HS256"],
+            revocation_check_interval=60,
+            clock=self.clock,
+            executor=self.executor
+        )
+
+    def remote_check(self, token):
+        result = self.remote_results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def test_valid_token_returns_user_without_remote_call(self):
+        user = self.verifier.verify(make_token())
+
+        assert user.user_id == 1
+        assert user.email == "ana@example.com"
+        assert self.verifier.revocation_checks == 0
+
+    def test_invalid_signature_is_rejected(self):
+        assert self.verifier.verify(make_token(key="otra-clave")) is None
+        assert self.executor.tasks == []
+
+    def test_expired_token_is_rejected(self):
+        assert self.verifier.verify(make_token(exp=NOW - 10)) is None
+
+    def test_token_without_expiry_is_rejected(self):
+        token = jwt.encode({"user_id": 1, "name": "Ana", "email": "ana@example.com"}, SECRET, algorithm="HS256")
+        assert self.verifier.verify(token) is None
+
+    def test_missing_user_claims_are_rejected(self):
+        assert self.verifier.verify(make_token(email=None)) is None
+
+    def test_sub_claim_is_used_as_user_id(self):
+        token = jwt.encode({"sub": "42", "name": "Ana", "email": "ana@example.com", "exp": NOW + 3600}, SECRET, algorithm="HS256")
+        assert self.verifier.verify(token).user_id == 42
+
+    def test_revocation_is_checked_once_per_interval(self):
+        token = make_token()
+        self.remote_results = [True, True]
+
+        self.verifier.verify(token)
+        self.verifier.verify(token)
+        assert len(self.executor.tasks) == 1
+        self.executor.run_all()
+
+        self.clock.now += 30
+        self.verifier.verify(token)
+        assert self.executor.tasks == []
+
+        self.clock.now += 31
+        self.verifier.verify(token)
+        assert len(self.executor.tasks) == 1
+        self.executor.run_all()
+        assert self.verifier.revocation_checks == 2
+
+    def test_revoked_token_is_rejected_until_it_expires(self):
+        token = make_token()
+        self.remote_results = [False]
+
+        assert self.verifier.verify(token) is not None
+        self.executor.run_all()
+
+        assert self.verifier.is_revoked(token)
+        assert self.verifier.verify(token) is None
+
+        self.clock.now = NOW + 3601
+        self.verifier.verify(make_token(user_id=2))
+        assert not self.verifier.is_revoked(token)
+
+    def test_unavailable_user_service_keeps_token(self):
+        token = make_token()
+        self.remote_results = [UserServiceUnavailableError("timeout")]
+
+        self.verifier.verify(token)
+        self.executor.run_all()
+
+        assert not self.verifier.is_revoked(token)
+        assert self.verifier.verify(token) is not None
+
+    def test_rs256_public_key(self):
+        public_key, private_key = rsa.newkeys(1024)
+        verifier = LocalTokenVerifier(
+            public_key.save_pkcs1().decode(),
+            remote_check=lambda token: True,
+            algorithms=["RS256"],
+            executor=self.executor
+        )
+
+        token = make_token(key=private_key.save_pkcs1().decode(), algorithm="RS256", exp=9_999_999_999)
+
+        assert verifier.verify(token).user_id == 1
+        assert verifier.verify(make_token(exp=9_999_999_999)) is None
+
+
+class TestVerifierConfiguration:
+    """Pruebas de la carga de la clave y la selección del modo"""
+
+    def test_key_is_read_from_file(self, tmp_path):
+        key_file = tmp_path / "session.pem"
+        key_file.write_text("clave-publica", encoding="utf-8")
+
+        assert load_verification_key(key=None, key_file=str(key_file)) == "clave-publica"
+
+    def test_missing_key_file(self, tmp_path):
+        assert load_verification_key(key=None, key_file=str(tmp_path / "no-existe.pem")) is None
+
+    def test_remote_mode_has_no_local_verifier(self):
+        assert build_local_token_verifier(lambda token: True, mode="remote") is None
+
+    @patch("adapters.session_token.load_verification_key", return_value=None)
+    def test_local_mode_without_key_falls_back_to_remote(self, mock_load_key):
+        assert build_local_token_verifier(lambda token: True, mode="local") is None
+
+
+class TestUserClientLocalVerification:
+    """Pruebas de verify_session_token con la verificación local activada"""
+
+    @pytest.fixture(autouse=True)
+    def local_verifier(self):
+        self.executor = DeferredExecutor()
+        verifier = LocalTokenVerifier(
+            SECRET,
+            remote_check=user_client._is_session_token_accepted,
+            algorithms=["HS256"],
+            executor=self.executor
+        )
+        with patch.object(user_client, "_local_token_verifier", verifier):
+            yield verifier
+
+    @patch("adapters.user_client._make_request_or_raise")
+    def test_user_service_is_not_in_the_hot_path(self, mock_request):
+        token = make_token(exp=9_999_999_999)
+
+        user = verify_session_token(token)
+
+        assert user.user_id == 1
+        mock_request.assert_not_called()
+
+    @patch("adapters.user_client._make_request_or_raise")
+    def test_background_check_revokes_token(self, mock_request, local_verifier):
+        mock_request.return_value = {"status": "error", "message": "Sesión cerrada"}
+        token = make_token(exp=9_999_999_999)
+
+        assert verify_session_token(token) is not None
+        self.executor.run_all()
+
+        mock_request.assert_called_once()
+        assert verify_session_token(token) is None
+        assert local_verifier.is_revoked(token)
+
+    @patch("adapters.user_client._make_request_or_raise")
+    def test_rate_limited_check_does_not_revoke(self, mock_request, local_verifier):
+        mock_request.side_effect = UserServiceClientError(429, "Error calling verification: 429")
+        token = make_token(exp=9_999_999_999)
+
+        verify_session_token(token)
+        self.executor.run_all()
+
+        assert not local_verifier.is_revoked(token)
+        assert verify_session_token(token) is not None
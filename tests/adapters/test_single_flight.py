@@ -0,0 +1,155 @@
+"""
+Pruebas unitarias para adapters/single_flight.py y la coalescencia de llamadas en adapters/user_client.py
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from adapters.single_flight import AsyncSingleFlight, SingleFlight
+from adapters.user_client import (
+    UserRoleRetrievalError,
+    get_user_role_ids,
+    get_user_role_ids_async,
+    verify_session_token,
+    verify_session_token_async,
+)
+
+
+class TestSingleFlight:
+    """Pruebas de la versión con hilos"""
+
+    def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def slow():
+            calls.append(1)
+            release.wait(1)
+            return "resultado"
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            futures = [executor.submit(flight.do, "clave", slow) for _ in range(5)]
+            time.sleep(0.05)
+            release.set()
+            results = [future.result() for future in futures]
+
+        assert results == ["resultado"] * 5
+        assert len(calls) == 1
+        assert flight.shared_calls == 4
+
+    def test_error_is_shared(self):
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def failing():
+            release.wait(1)
+            raise ValueError("boom")
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(flight.do, "clave", failing) for _ in range(3)]
+            time.sleep(0.05)
+            release.set()
+            for future in futures:
+                with pytest.raises(ValueError):
+                    future.result()
+
+    def test_sequential_calls_are_not_coalesced(self):
+        flight = SingleFlight()
+        counter = iter(range(10))
+
+        assert flight.do("clave", lambda: next(counter)) == 0
+        assert flight.do("clave", lambda: next(counter)) == 1
+
+    def test_different_keys_are_independent(self):
+        flight = SingleFlight()
+        assert flight.do("a", lambda: 1) == 1
+        assert flight.do("b", lambda: 2) == 2
+
+
+class TestAsyncSingleFlight:
+    """Pruebas de la versión asyncio"""
+
+    async def test_concurrent_coroutines_share_one_call(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "resultado"
+
+        results = await asyncio.gather(*(flight.do("clave", slow) for _ in range(5)))
+
+        assert results == ["resultado"] * 5
+        assert len(calls) == 1
+
+    async def test_error_is_shared(self):
+        flight = AsyncSingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(*(flight.do("clave", failing) for _ in range(3)), return_exceptions=True)
+
+        assert all(isinstance(result, ValueError) for result in results)
+
+
+class TestUserClientCoalescing:
+    """Pruebas de la coalescencia en las llamadas al servicio de usuarios"""
+
+    @patch('adapters.user_client._make_request')
+    def test_get_user_role_ids_threads(self, mock_make_request):
+        def slow_request(*args, **kwargs):
+            time.sleep(0.05)
+            return {"user_role_ids": [1, 2]}
+        mock_make_request.side_effect = slow_request
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(get_user_role_ids, [7] * 4))
+
+        assert results == [[1, 2]] * 4
+        mock_make_request.assert_called_once()
+        # Cada llamador recibe su propia lista
+        results[0].append(3)
+        assert results[1] == [1, 2]
+
+    @patch('adapters.user_client._make_request')
+    def test_get_user_role_ids_error_shared(self, mock_make_request):
+        def slow_failure(*args, **kwargs):
+            time.sleep(0.05)
+            return None
+        mock_make_request.side_effect = slow_failure
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(get_user_role_ids, 7) for _ in range(3)]
+            for future in futures:
+                with pytest.raises(UserRoleRetrievalError):
+                    future.result()
+        mock_make_request.assert_called_once()
+
+    @patch('adapters.user_client._make_request_or_raise')
+    async def test_async_paths(self, mock_make_request):
+        def slow_request(endpoint, **kwargs):
+            time.sleep(0.05)
+            if kwargs.get("operation") == "verify_session_token":
+                return {"status": "success", "data": {"user": {"user_id": 1, "name": "Ana", "email": "ana@example.com"}}}
+            return {"user_role_ids": [5]}
+        mock_make_request.side_effect = slow_request
+
+        users = await asyncio.gather(*(verify_session_token_async("token") for _ in range(3)))
+        role_ids = await asyncio.gather(*(get_user_role_ids_async(1) for _ in range(3)))
+
+        assert all(user.user_id == 1 for user in users)
+        assert role_ids == [[5]] * 3
+        assert mock_make_request.call_count == 2
+
+    @patch('adapters.user_client._make_request_or_raise')
+    def test_verify_session_token_invalid(self, mock_make_request):
+        mock_make_request.return_value = {"status": "error"}
+        assert verify_session_token("token") is None
@@ -0,0 +1,193 @@
+"""
+Pruebas unitarias para adapters/ttl_cache.py y las cachés de roles de adapters/user_client.py
+"""
+from unittest.mock import patch
+
+import pytest
+
+from adapters.ttl_cache import RefreshingTTLCache
+from adapters.user_client import (
+    delete_user_role,
+    get_role_permissions_for_user_role,
+    get_user_role_ids,
+    invalidate_user_role_caches,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ManualExecutor:
+    """Ejecutor que acumula las tareas para ejecutarlas de forma explícita en la prueba"""
+
+    def __init__(self):
+        self.tasks = []
+
+    def submit(self, fn, *args):
+        self.tasks.append((fn, args))
+
+    def run_all(self):
+        tasks, self.tasks = self.tasks, []
+        for fn, args in tasks:
+            fn(*args)
+
+
+class TestRefreshingTTLCache:
+    """Pruebas de las ventanas fresca, refresh-ahead, stale y expiración dura"""
+
+    def setup_method(self):
+        self.clock = FakeClock()
+        self.executor = ManualExecutor()
+        self.cache = RefreshingTTLCache(
+            "test", ttl=60, refresh_ahead=10, stale_grace=30, max_entries=3,
+            clock=self.clock, executor=self.executor
+        )
+        self.values = iter(range(100))
+        self.loads = 0
+
+    def loader(self):
+        self.loads += 1
+        return next(self.values)
+
+    def test_fresh_entry_is_served_from_cache(self):
+        assert self.cache.get("k", self.loader) == 0
+        self.clock.now = 49
+        assert self.cache.get("k", self.loader) == 0
+        assert self.loads == 1
+        assert self.executor.tasks == []
+
+    def test_refresh_ahead_window_refreshes_in_background(self):
+        self.cache.get("k", self.loader)
+        self.clock.now = 55
+
+        assert self.cache.get("k", self.loader) == 0
+        # Una sola actualización en segundo plano aunque lleguen varias lecturas
+        assert self.cache.get("k", self.loader) == 0
+        assert len(self.executor.tasks) == 1
+
+        self.executor.run_all()
+        assert self.cache.get("k", self.loader) == 1
+
+    def test_stale_value_served_during_grace(self):
+        self.cache.get("k", self.loader)
+        self.clock.now = 80
+
+        assert self.cache.get("k", self.loader) == 0
+        assert self.cache.stale_hits == 1
+        self.executor.run_all()
+        assert self.cache.get("k", self.loader) == 1
+
+    def test_hard_expiry_loads_synchronously(self):
+        self.cache.get("k", self.loader)
+        self.clock.now = 90
+
+        assert self.cache.get("k", self.loader) == 1
+        assert self.executor.tasks == []
+
+    def test_failures_are_not_cached(self):
+        def failing():
+            raise RuntimeError("upstream down")
+
+        with pytest.raises(RuntimeError):
+            self.cache.get("k", failing)
+        assert len(self.cache) == 0
+        assert self.cache.get("k", self.loader) == 0
+
+    def test_failed_background_refresh_keeps_stale_value(self):
+        self.cache.get("k", self.loader)
+        self.clock.now = 70
+
+        def failing():
+            raise RuntimeError("upstream down")
+
+        assert self.cache.get("k", failing) == 0
+        self.executor.run_all()
+        assert self.cache.get("k", self.loader) == 0
+
+    def test_invalidation_discards_in_flight_refresh(self):
+        self.cache.get("k", self.loader)
+        self.clock.now = 55
+        self.cache.get("k", self.loader)
+        self.cache.invalidate("k")
+        self.executor.run_all()
+
+        assert len(self.cache) == 0
+
+    def test_invalidate_where(self):
+        self.cache.get("a", lambda: [1, 2])
+        self.cache.get("b", lambda: [3])
+
+        self.cache.invalidate_where(lambda key, value: 2 in value)
+
+        assert self.cache.get("a", lambda: [9]) == [9]
+        assert self.cache.get("b", lambda: [9]) == [3]
+
+    def test_least_recently_used_entries_are_evicted(self):
+        for key in "abc":
+            self.cache.get(key, self.loader)
+        self.cache.get("a", self.loader)
+        self.cache.get("d", self.loader)
+
+        assert len(self.cache) == 3
+        loads = self.loads
+        self.cache.get("a", self.loader)
+        assert self.loads == loads
+        self.cache.get("b", self.loader)
+        assert self.loads == loads + 1
+
+    def test_zero_ttl_disables_cache(self):
+        cache = RefreshingTTLCache("off", ttl=0, clock=self.clock, executor=self.executor)
+        assert cache.get("k", self.loader) == 0
+        assert cache.get("k", self.loader) == 1
+
+
+class TestUserClientCaches:
+    """Pruebas del uso de las cachés en el cliente del servicio de usuarios"""
+
+    @patch('adapters.user_client._make_request')
+    def test_user_role_ids_are_cached(self, mock_make_request):
+        mock_make_request.return_value = {"user_role_ids": [1, 2]}
+
+        assert get_user_role_ids(1) == [1, 2]
+        assert get_user_role_ids(1) == [1, 2]
+        mock_make_request.assert_called_once()
+
+    @patch('adapters.user_client._make_request')
+    def test_permission_failures_are_not_cached(self, mock_make_request):
+        mock_make_request.side_effect = [None, {"permissions": [{"name": "read_plots"}]}]
+
+        assert get_role_permissions_for_user_role(5) == []
+        assert get_role_permissions_for_user_role(5) == ["read_plots"]
+        assert get_role_permissions_for_user_role(5) == ["read_plots"]
+        assert mock_make_request.call_count == 2
+
+    @patch('adapters.user_client._make_request')
+    def test_delete_user_role_invalidates_caches(self, mock_make_request):
+        mock_make_request.side_effect = [
+            {"user_role_ids": [5]},
+            {"permissions": [{"name": "read_plots"}]},
+            {"status": "success"},
+            {"user_role_ids": []},
+            {"permissions": []},
+        ]
+        get_user_role_ids(1)
+        get_role_permissions_for_user_role(5)
+
+        delete_user_role(5)
+
+        assert get_user_role_ids(1) == []
+        assert get_role_permissions_for_user_role(5) == []
+
+    @patch('adapters.user_client._make_request')
+    def test_invalidate_by_user(self, mock_make_request):
+        mock_make_request.side_effect = [{"user_role_ids": [5]}, {"user_role_ids": [5, 6]}]
+        get_user_role_ids(1)
+
+        invalidate_user_role_caches(user_id=1)
+
+        assert get_user_role_ids(1) == [5, 6]
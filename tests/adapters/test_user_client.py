@@ -0,0 +1,53 @@
+"""
+Pruebas unitarias para adapters/user_client.py
+"""
+import threading
+import time
+from unittest.mock import patch
+
+from adapters.user_client import UserRoleRetrievalError, get_user_role_ids_bulk
+
+
+class TestGetUserRoleIdsBulk:
+    """Pruebas para la resolución masiva de user_role_ids"""
+
+    @patch('adapters.user_client.get_user_role_ids')
+    def test_deduplicates_users(self, mock_get_user_role_ids):
+        mock_get_user_role_ids.side_effect = lambda user_id: [user_id * 10]
+
+        result = get_user_role_ids_bulk([1, 2, 1, 3, 2])
+
+        assert result == {1: [10], 2: [20], 3: [30]}
+        assert mock_get_user_role_ids.call_count == 3
+
+    @patch('adapters.user_client.get_user_role_ids')
+    def test_failed_lookup_maps_to_none(self, mock_get_user_role_ids):
+        def lookup(user_id):
+            if user_id == 2:
+                raise UserRoleRetrievalError("boom")
+            return [user_id]
+        mock_get_user_role_ids.side_effect = lookup
+
+        assert get_user_role_ids_bulk([1, 2]) == {1: [1], 2: None}
+
+    @patch('adapters.user_client.get_user_role_ids')
+    def test_concurrency_is_bounded(self, mock_get_user_role_ids):
+        lock = threading.Lock()
+        state = {"current": 0, "peak": 0}
+
+        def lookup(user_id):
+            with lock:
+                state["current"] += 1
+                state["peak"] = max(state["peak"], state["current"])
+            time.sleep(0.01)
+            with lock:
+                state["current"] -= 1
+            return []
+        mock_get_user_role_ids.side_effect = lookup
+
+        get_user_role_ids_bulk(range(20), max_concurrency=3)
+
+        assert 1 < state["peak"] <= 3
+
+    def test_empty_input(self):
+        assert get_user_role_ids_bulk([]) == {}
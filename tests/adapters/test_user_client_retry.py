@@ -0,0 +1,157 @@
+"""
+Pruebas de reintentos, plazo de la petición y presupuesto de reintentos de
+adapters/user_client.py contra un servicio de usuarios simulado con latencia inyectada.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import orjson
+import pytest
+
+from adapters.circuit_breaker import reset_circuit_breakers
+from adapters.retry import RetryBudget, backoff_delay
+from adapters.user_client import UserRoleRetrievalError, get_user_role_ids, verify_session_token
+from utils.deadline import _request_deadline
+
+
+class StubUserService:
+    """Servicio de usuarios local que responde según un guion de (demora, código de estado)"""
+
+    def __init__(self, script, default=(0.0, 200)):
+        self.script = list(script)
+        self.default = default
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self):
+                stub.requests.append((self.command, self.path))
+                delay, status = stub.script.pop(0) if stub.script else stub.default
+                time.sleep(delay)
+                body = orjson.dumps({"user_role_ids": [1, 2]} if status == 200 else {"detail": "error"})
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            do_GET = _respond
+            do_POST = _respond
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@contextmanager
+def request_deadline(seconds):
+    token = _request_deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _request_deadline.reset(token)
+
+
+class TestUserClientRetries:
+    """Pruebas de reintentos con latencia inyectada"""
+
+    def setup_method(self):
+        reset_circuit_breakers()
+        self.budget = RetryBudget(ratio=0.2, min_per_second=0, capacity=10)
+        patch('adapters.user_client.retry_budget', self.budget).start()
+        # Demoras de reintento pequeñas y deterministas
+        patch('adapters.user_client.backoff_delay', lambda attempt: 0.01).start()
+
+    def teardown_method(self):
+        patch.stopall()
+        reset_circuit_breakers()
+
+    def test_get_retries_transient_errors(self):
+        with StubUserService([(0, 503), (0, 502)]) as stub:
+            with patch('adapters.user_client.USER_SERVICE_URL', stub.url):
+                assert get_user_role_ids(1) == [1, 2]
+        assert len(stub.requests) == 3
+
+    def test_gives_up_after_max_retries(self):
+        with StubUserService([], default=(0, 503)) as stub:
+            with patch('adapters.user_client.USER_SERVICE_URL', stub.url), patch('adapters.user_client.USER_SERVICE_MAX_RETRIES', 2):
+                with pytest.raises(UserRoleRetrievalError):
+                    get_user_role_ids(1)
+        assert len(stub.requests) == 3
+
+    def test_client_errors_are_not_retried(self):
+        with StubUserService([], default=(0, 404)) as stub:
+            with patch('adapters.user_client.USER_SERVICE_URL', stub.url):
+                with pytest.raises(UserRoleRetrievalError):
+                    get_user_role_ids(1)
+        assert len(stub.requests) == 1
+
+    def test_post_is_not_retried(self):
+        with StubUserService([], default=(0, 503)) as stub:
+            with patch('adapters.user_client.USER_SERVICE_URL', stub.url):
+                assert verify_session_token("token") is None
+        assert len(stub.requests) == 1
+
+    def test_slow_upstream_respects_request_deadline(self):
+        """Un servicio lento no puede retener la petición más allá de su plazo"""
+        with StubUserService([], default=(1.0, 200)) as stub:
+            with patch('adapters.user_client.USER_SERVICE_URL', stub.url):
+                start = time.monotonic()
+                with request_deadline(0.3):
+                    with pytest.raises(UserRoleRetrievalError):
+                        get_user_role_ids(1)
+                elapsed = time.monotonic() - start
+        assert elapsed < 0.8
+
+    def test_retry_budget_stops_retries(self):
+        self.budget._tokens = 0
+        with StubUserService([], default=(0, 503)) as stub:
+            with patch('adapters.user_client.USER_SERVICE_URL', stub.url):
+                with pytest.raises(UserRoleRetrievalError):
+                    get_user_role_ids(1)
+        assert len(stub.requests) == 1
+
+
+class TestRetryBudget:
+    """Pruebas del presupuesto global de reintentos"""
+
+    def test_retries_limited_to_ratio_of_requests(self):
+        now = [0.0]
+        budget = RetryBudget(ratio=0.5, min_per_second=0, capacity=5, clock=lambda: now[0])
+        budget._tokens = 0
+        for _ in range(4):
+            budget.record_request()
+
+        assert budget.try_acquire()
+        assert budget.try_acquire()
+        assert not budget.try_acquire()
+
+    def test_time_based_refill(self):
+        now = [0.0]
+        budget = RetryBudget(ratio=0, min_per_second=2, capacity=5, clock=lambda: now[0])
+        budget._tokens = 0
+        assert not budget.try_acquire()
+        now[0] = 0.5
+        assert budget.try_acquire()
+
+    def test_full_jitter_backoff_is_capped(self):
+        assert backoff_delay(0, base_delay=0.1, max_delay=1.0, rng=lambda low, high: high) == pytest.approx(0.1)
+        assert backoff_delay(10, base_delay=0.1, max_delay=1.0, rng=lambda low, high: high) == 1.0
+        assert backoff_delay(3, base_delay=0.1, max_delay=1.0, rng=lambda low, high: low) == 0.0
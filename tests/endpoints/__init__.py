@@ -0,0 +1 @@
+# Este archivo hace de tests/endpoints un paquete de Python
@@ -0,0 +1,227 @@
+"""
+Pruebas unitarias para los endpoints internos de endpoints/farms_service.py
+"""
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from domain.schemas import (
+    FarmsBatchRequest,
+    PlotsVerifyRequest,
+    UserRoleFarmCreateRequest,
+    UserRoleFarmsBulkCreateRequest,
+    UserRoleFarmsBulkRequest,
+)
+from adapters.cache_invalidation import USER_ROLE_EVENT
+from endpoints.farms_service import (
+    create_user_role_farm_endpoint,
+    create_user_role_farms_endpoint,
+    get_farms_endpoint,
+    get_user_role_farms_endpoint,
+    verify_plots_endpoint,
+)
+
+
+class TestGetFarmsEndpoint:
+    """Clase de pruebas para la consulta de fincas por lote"""
+
+    def setup_method(self):
+        """Configuración inicial para cada prueba"""
+        self.db_mock = Mock(spec=Session)
+        self.all_mock = self.db_mock.query.return_value.join.return_value.join.return_value.filter.return_value.all
+
+    def _farm_row(self, farm_id, name):
+        return SimpleNamespace(
+            farm_id=farm_id, name=name, area=Decimal("10.50"), area_unit_id=1,
+            area_unit="Hectárea", farm_state_id=1, farm_state="Activo"
+        )
+
+    def test_get_farms_preserves_order_and_reports_not_found(self):
+        """Prueba que se respetan el orden y los IDs duplicados, y se reportan los inexistentes"""
+        self.all_mock.return_value = [self._farm_row(2, "Finca 2"), self._farm_row(1, "Finca 1")]
+
+        result = get_farms_endpoint(FarmsBatchRequest(farm_ids=[1, 99, 2, 1]), self.db_mock)
+
+        assert [farm.farm_id for farm in result.farms] == [1, 2]
+        assert result.farms[0].area == 10.5
+        assert result.farms[0].area_unit == "Hectárea"
+        assert result.not_found == [99]
+        # Una sola consulta para todas las fincas
+        self.db_mock.query.assert_called_once()
+
+    def test_get_farms_none_found(self):
+        """Prueba cuando ninguna de las fincas existe"""
+        self.all_mock.return_value = []
+
+        result = get_farms_endpoint(FarmsBatchRequest(farm_ids=[5, 6]), self.db_mock)
+
+        assert result.farms == []
+        assert result.not_found == [5, 6]
+
+    def test_get_farms_request_limits(self):
+        """Prueba los límites de cantidad de IDs de la petición"""
+        with pytest.raises(ValidationError):
+            FarmsBatchRequest(farm_ids=[])
+        with pytest.raises(ValidationError):
+            FarmsBatchRequest(farm_ids=list(range(101)))
+
+
+class TestVerifyPlotsEndpoint:
+    """Clase de pruebas para la verificación de lotes por lote"""
+
+    def setup_method(self):
+        """Configuración inicial para cada prueba"""
+        self.db_mock = Mock(spec=Session)
+        self.all_mock = self.db_mock.query.return_value.outerjoin.return_value.filter.return_value.all
+
+    def test_verify_plots(self):
+        """Prueba lotes activos, inactivos e inexistentes en una sola consulta"""
+        self.all_mock.return_value = [
+            SimpleNamespace(plot_id=1, name="Lote 1", farm_id=10, plot_state_id=1, plot_state="Activo"),
+            SimpleNamespace(plot_id=2, name="Lote 2", farm_id=10, plot_state_id=2, plot_state="Inactivo"),
+        ]
+
+        result = verify_plots_endpoint(PlotsVerifyRequest(plot_ids=[2, 1, 3]), self.db_mock)
+
+        plots = {plot.plot_id: plot for plot in result.plots}
+        assert [plot.plot_id for plot in result.plots] == [2, 1, 3]
+        assert plots[1].exists and plots[1].active
+        assert plots[1].farm_id == 10 and plots[1].name == "Lote 1"
+        assert plots[2].exists and not plots[2].active
+        assert not plots[3].exists and not plots[3].active
+        assert plots[3].farm_id is None
+        self.db_mock.query.assert_called_once()
+
+
+class TestGetUserRoleFarmsEndpoint:
+    """Clase de pruebas para la consulta masiva de relaciones user_role_farm"""
+
+    def setup_method(self):
+        """Configuración inicial para cada prueba"""
+        self.db_mock = Mock(spec=Session)
+        self.all_mock = self.db_mock.query.return_value.join.return_value.filter.return_value.order_by.return_value.all
+
+    @patch('endpoints.farms_service.get_user_role_ids_bulk')
+    def test_get_user_role_farms(self, mock_bulk):
+        """Prueba que todos los pares se responden con una sola consulta"""
+        mock_bulk.return_value = {1: [10, 11], 2: [20], 3: None}
+        self.all_mock.return_value = [
+            SimpleNamespace(user_role_farm_id=100, user_role_id=11, farm_id=5, user_role_farm_state_id=1, user_role_farm_state="Activo"),
+            SimpleNamespace(user_role_farm_id=101, user_role_id=20, farm_id=6, user_role_farm_state_id=2, user_role_farm_state="Inactivo"),
+        ]
+        request = UserRoleFarmsBulkRequest(pairs=[
+            {"user_id": 1, "farm_id": 5},
+            {"user_id": 1, "farm_id": 6},
+            {"user_id": 2, "farm_id": 6},
+            {"user_id": 3, "farm_id": 5},
+            {"user_id": 1, "farm_id": 5},
+        ])
+
+        result = get_user_role_farms_endpoint(request, self.db_mock)
+
+        # Los pares repetidos se descartan; get_user_role_ids_bulk deduplica los usuarios
+        assert list(mock_bulk.call_args.args[0]) == [1, 1, 2, 3]
+        self.db_mock.query.assert_called_once()
+        assert len(result.results) == 4
+        first, second, third, fourth = result.results
+        assert first.found and first.user_role_farm.user_role_farm_id == 100
+        assert not second.found and second.error is None
+        assert third.found and third.user_role_farm.user_role_farm_state == "Inactivo"
+        assert not fourth.found and fourth.error == "No se pudieron obtener los roles del usuario"
+
+    @patch('endpoints.farms_service.get_user_role_ids_bulk')
+    def test_get_user_role_farms_without_roles(self, mock_bulk):
+        """Prueba que no se consulta la base de datos si ningún usuario tiene roles"""
+        mock_bulk.return_value = {1: []}
+
+        result = get_user_role_farms_endpoint(UserRoleFarmsBulkRequest(pairs=[{"user_id": 1, "farm_id": 5}]), self.db_mock)
+
+        assert not result.results[0].found
+        self.db_mock.query.assert_not_called()
+
+
+class TestCreateUserRoleFarmsEndpoint:
+    """Clase de pruebas para la creación masiva de relaciones user_role_farm"""
+
+    def setup_method(self):
+        """Configuración inicial para cada prueba"""
+        self.db_mock = Mock(spec=Session)
+        self.farms_query = Mock()
+        self.states_query = Mock()
+        self.db_mock.query.side_effect = [self.farms_query, self.states_query]
+        self.farms_query.filter.return_value.all.return_value = [(1,)]
+        self.states_query.filter.return_value.all.return_value = [(1,)]
+        self.mock_publish = patch('endpoints.farms_service.publish_invalidation').start()
+
+    def teardown_method(self):
+        patch.stopall()
+
+    def test_create_user_role_farms_outcomes(self):
+        """Prueba los resultados por elemento de una sola sentencia INSERT ... ON CONFLICT"""
+        self.db_mock.execute.return_value = [SimpleNamespace(user_role_farm_id=50, user_role_id=6, farm_id=1)]
+        request = UserRoleFarmsBulkCreateRequest(items=[
+            {"user_role_id": 5, "farm_id": 1, "user_role_farm_state_id": 1},
+            {"user_role_id": 6, "farm_id": 1, "user_role_farm_state_id": 1},
+            {"user_role_id": 6, "farm_id": 1, "user_role_farm_state_id": 1},
+            {"user_role_id": 7, "farm_id": 9, "user_role_farm_state_id": 1},
+            {"user_role_id": 8, "farm_id": 1, "user_role_farm_state_id": 99},
+        ])
+
+        result = create_user_role_farms_endpoint(request, self.db_mock)
+
+        assert [item.status for item in result.results] == ["already_exists", "created", "duplicate", "invalid", "invalid"]
+        assert result.results[1].user_role_farm_id == 50
+        self.db_mock.execute.assert_called_once()
+        statement = str(self.db_mock.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (user_role_id, farm_id) DO NOTHING" in statement
+        assert "RETURNING" in statement
+        self.db_mock.commit.assert_called_once()
+        self.mock_publish.assert_called_once_with(self.db_mock, USER_ROLE_EVENT, new_user_role_ids=[6])
+
+    def test_create_user_role_farms_nothing_valid(self):
+        """Prueba que no se ejecuta el INSERT si ningún elemento es válido"""
+        request = UserRoleFarmsBulkCreateRequest(items=[{"user_role_id": 7, "farm_id": 9, "user_role_farm_state_id": 1}])
+
+        result = create_user_role_farms_endpoint(request, self.db_mock)
+
+        assert result.results[0].message == "Finca no encontrada"
+        self.db_mock.execute.assert_not_called()
+        self.mock_publish.assert_not_called()
+
+    def test_create_user_role_farms_database_error(self):
+        """Prueba que un error de base de datos revierte la transacción"""
+        self.db_mock.execute.side_effect = Exception("Database error")
+        request = UserRoleFarmsBulkCreateRequest(items=[{"user_role_id": 5, "farm_id": 1, "user_role_farm_state_id": 1}])
+
+        with pytest.raises(HTTPException) as exc_info:
+            create_user_role_farms_endpoint(request, self.db_mock)
+
+        assert exc_info.value.status_code == 500
+        self.db_mock.rollback.assert_called_once()
+
+
+class TestCreateUserRoleFarmEndpoint:
+    """Clase de pruebas para la creación de una relación user_role_farm"""
+
+    @patch('endpoints.farms_service.publish_invalidation')
+    def test_create_user_role_farm_invalidates_role_lists(self, mock_publish):
+        """Prueba que se invalidan las listas de roles en caché antes de confirmar"""
+        db_mock = Mock(spec=Session)
+        db_mock.query.return_value.filter.return_value.first.return_value = None
+        calls = Mock()
+        calls.attach_mock(mock_publish, "publish")
+        calls.attach_mock(db_mock.commit, "commit")
+
+        result = create_user_role_farm_endpoint(
+            UserRoleFarmCreateRequest(user_role_id=40, farm_id=1, user_role_farm_state_id=1), db_mock
+        )
+
+        assert result["status"] == "success"
+        assert [name for name, _, _ in calls.mock_calls] == ["publish", "commit"]
+        mock_publish.assert_called_once_with(db_mock, USER_ROLE_EVENT, new_user_role_ids=[40])
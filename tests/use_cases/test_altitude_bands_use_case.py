@@ -0,0 +1,113 @@
+"""
+Pruebas unitarias para altitude_bands_use_case.py
+"""
+import json
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pytest
+from sqlalchemy.orm import Session
+
+from models.models import CoffeeVarieties
+
+from use_cases.altitude_bands_use_case import altitude_band_counts, get_altitude_bands, validate_band_edges
+
+
+class TestAltitudeBandCounts:
+    """Pruebas del histograma vectorizado"""
+
+    def test_matches_row_by_row_counting(self):
+        rng = np.random.default_rng(11)
+        altitudes = rng.uniform(0, 3000, size=20000).round()
+        variety_ids = rng.choice([1, 2, 5], size=20000)
+        edges = [0, 1200, 1500, 1800, 3000]
+
+        varieties, counts, out_of_range = altitude_band_counts(altitudes, variety_ids, edges)
+
+        expected = np.zeros((4, 3), dtype=int)
+        for altitude, variety_id in zip(altitudes, variety_ids):
+            band = next(i for i in range(4) if altitude < edges[i + 1] or i == 3)
+            expected[band, list(varieties).index(variety_id)] += 1
+        assert list(varieties) == [1, 2, 5]
+        np.testing.assert_array_equal(counts, expected)
+        assert out_of_range == 0
+
+    def test_band_limits(self):
+        """Prueba que cada límite pertenece a la franja que empieza en él, salvo el último"""
+        altitudes = np.array([1200.0, 1199.99, 1800.0, 2000.0, 900.0])
+        varieties, counts, out_of_range = altitude_band_counts(altitudes, np.ones(5, dtype=np.int64), [1000, 1200, 1800])
+
+        assert counts[:, 0].tolist() == [1, 2]
+        assert out_of_range == 2
+
+    def test_empty(self):
+        varieties, counts, out_of_range = altitude_band_counts(np.array([]), np.array([], dtype=np.int64), [0, 1000, 2000])
+        assert len(varieties) == 0 and counts.shape == (2, 0) and out_of_range == 0
+
+    @pytest.mark.parametrize("edges", [[1000], [1000, 1000], [1500, 1200], list(range(52))])
+    def test_invalid_edges(self, edges):
+        assert validate_band_edges(edges) is not None
+
+
+class TestAltitudeBandsUseCase:
+    """Clase de pruebas para el caso de uso de franjas de altitud"""
+
+    def setup_method(self):
+        """Configuración inicial para cada prueba"""
+        self.db_mock = Mock(spec=Session)
+        self.user_mock = Mock()
+        self.user_mock.user_id = 1
+        self.state = Mock(farm_state_id=1, user_role_farm_state_id=1, plot_state_id=1)
+
+        self.plots_query = Mock()
+        self.plots_query.filter.return_value.all.return_value = [
+            (1, 1300.0), (2, 1350.0), (2, 1450.0), (1, 1900.0), (2, None), (1, 2500.0)
+        ]
+        self.varieties_query = Mock()
+        self.varieties_query.filter.return_value.all.return_value = [(1, "Castillo"), (2, "Caturra")]
+        self.db_mock.query.side_effect = lambda *columns: (
+            self.varieties_query if columns[0] is CoffeeVarieties.coffee_variety_id else self.plots_query
+        )
+
+        patch('use_cases.altitude_bands_use_case.get_state', return_value=self.state).start()
+        self.mock_access = patch('use_cases.altitude_bands_use_case.verify_read_plots_access', return_value=None).start()
+        self.mock_farms = patch('use_cases.altitude_bands_use_case.get_readable_farm_ids', return_value=[1, 2]).start()
+
+    def teardown_method(self):
+        patch.stopall()
+
+    def test_bands_per_variety(self):
+        response = get_altitude_bands(self.user_mock, self.db_mock, band_edges=[1200, 1500, 2000])
+        data = json.loads(response.body)["data"]
+
+        assert data["plot_count"] == 6
+        assert data["without_altitude_count"] == 1
+        assert data["out_of_range_count"] == 1
+        first, second = data["bands"]
+        assert (first["min_altitude"], first["max_altitude"], first["plot_count"]) == (1200, 1500, 3)
+        assert first["varieties"] == [
+            {"coffee_variety_id": 2, "coffee_variety_name": "Caturra", "plot_count": 2},
+            {"coffee_variety_id": 1, "coffee_variety_name": "Castillo", "plot_count": 1}
+        ]
+        assert second["plot_count"] == 1
+        self.mock_farms.assert_called_once()
+
+    def test_single_farm_checks_access(self):
+        denied = Mock()
+        self.mock_access.return_value = denied
+
+        assert get_altitude_bands(self.user_mock, self.db_mock, farm_id=3) is denied
+        self.plots_query.filter.assert_not_called()
+
+    def test_default_bands(self):
+        data = json.loads(get_altitude_bands(self.user_mock, self.db_mock, farm_id=1).body)["data"]
+
+        assert len(data["bands"]) == 6
+        assert sum(band["plot_count"] for band in data["bands"]) == 5
+        self.mock_farms.assert_not_called()
+
+    def test_invalid_edges(self):
+        response = get_altitude_bands(self.user_mock, self.db_mock, band_edges=[1500, 1200])
+
+        assert response.status_code == 400
+        self.db_mock.query.assert_not_called()
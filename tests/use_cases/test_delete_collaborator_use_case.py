@@ -2,12 +2,13 @@
 Pruebas unitarias para delete_collaborator_use_case.py
 """
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, call, patch
 from sqlalchemy.orm import Session
 
 from use_cases.delete_collaborator_use_case import delete_collaborator
 from domain.schemas import DeleteCollaboratorRequest, DeleteCollaboratorResponse
 from models.models import Farms, UserRoleFarm, UserRoleFarmStates
+from adapters.cache_invalidation import USER_ROLE_EVENT
 from adapters.user_client import (
     UserRoleRetrievalError,
     CollaboratorInfoError,
@@ -51,6 +52,7 @@ class TestDeleteCollaboratorUseCase:
         # Mock delete request
         self.delete_request = DeleteCollaboratorRequest(collaborator_id=2)
 
+    @patch('use_cases.delete_collaborator_use_case.publish_invalidation')
     @patch('use_cases.delete_collaborator_use_case.get_state')
     @patch('use_cases.delete_collaborator_use_case.get_user_role_ids')
     @patch('use_cases.delete_collaborator_use_case.get_user_role_id_for_farm')
@@ -61,7 +63,7 @@ class TestDeleteCollaboratorUseCase:
     def test_delete_collaborator_success(
         self, mock_delete_user_role, mock_get_permissions, mock_get_role_name,
         mock_get_collaborators_info, mock_get_user_role_id_for_farm,
-        mock_get_user_role_ids, mock_get_state
+        mock_get_user_role_ids, mock_get_state, mock_publish
     ):
         """Test successful deletion of a collaborator"""
         # Setup mocks
@@ -87,6 +89,9 @@ class TestDeleteCollaboratorUseCase:
         ]
         mock_get_permissions.return_value = ['delete_operator_farm']
         
+        # La invalidación se encola en la transacción antes de confirmarla
+        mock_publish.side_effect = lambda *args, **kwargs: self.db_mock.commit.assert_not_called()
+        
         # Execute
         result = delete_collaborator(self.delete_request, 1, self.user_mock, self.db_mock)
         
@@ -102,6 +107,7 @@ class TestDeleteCollaboratorUseCase:
         
         # Verify collaborator state was changed to inactive
         assert self.collaborator_role_farm_mock.user_role_farm_state_id == 2
+        mock_publish.assert_called_once_with(self.db_mock, USER_ROLE_EVENT, user_id=2, user_role_id=200)
 
     def test_delete_collaborator_invalid_farm(self):
         """Test deletion with invalid farm ID"""
@@ -141,9 +147,10 @@ class TestDeleteCollaboratorUseCase:
         response_body = result.body.decode('utf-8')
         assert "Colaborador no encontrado en esta finca" in response_body
 
+    @patch('use_cases.delete_collaborator_use_case.publish_invalidation')
     @patch('use_cases.delete_collaborator_use_case.get_state')
     @patch('use_cases.delete_collaborator_use_case.get_user_role_ids')
-    def test_delete_collaborator_no_permission(self, mock_get_user_role_ids, mock_get_state):
+    def test_delete_collaborator_no_permission(self, mock_get_user_role_ids, mock_get_state, mock_publish):
         """Test deletion when user has no permission to access the farm"""
         # Setup mocks
         self.db_mock.query.return_value.filter.return_value.first.side_effect = [
@@ -160,6 +167,7 @@ class TestDeleteCollaboratorUseCase:
         assert result.status_code == 403
         response_body = result.body.decode('utf-8')
         assert "No estás asociado a esta finca" in response_body
+        mock_publish.assert_not_called()
 
     @patch('use_cases.delete_collaborator_use_case.get_state')
     @patch('use_cases.delete_collaborator_use_case.get_user_role_ids')
@@ -210,6 +218,7 @@ class TestDeleteCollaboratorUseCase:
         assert result.status_code == 500
         assert "No se pudieron obtener los roles del usuario" in str(result.body)
 
+    @patch('use_cases.delete_collaborator_use_case.publish_invalidation')
     @patch('use_cases.delete_collaborator_use_case.get_state')
     @patch('use_cases.delete_collaborator_use_case.get_user_role_ids')
     @patch('use_cases.delete_collaborator_use_case.get_user_role_id_for_farm')
@@ -220,7 +229,7 @@ class TestDeleteCollaboratorUseCase:
     def test_delete_collaborator_database_error(
         self, mock_delete_user_role, mock_get_permissions, mock_get_role_name,
         mock_get_collaborators_info, mock_get_user_role_id_for_farm,
-        mock_get_user_role_ids, mock_get_state
+        mock_get_user_role_ids, mock_get_state, mock_publish
     ):
         """Test deletion when database operation fails"""
         # Setup mocks
@@ -256,6 +265,9 @@ class TestDeleteCollaboratorUseCase:
         response_body = result.body.decode('utf-8')
         assert "Error al eliminar el colaborador" in response_body
         self.db_mock.rollback.assert_called_once()
+        # El evento se encoló en la transacción fallida y el rollback lo descarta
+        mock_publish.assert_called_once()
+        assert self.db_mock.method_calls[-2:] == [call.commit(), call.rollback()]
 
     @patch('use_cases.delete_collaborator_use_case.get_state')
     def test_delete_collaborator_missing_active_states(self, mock_get_state):
@@ -410,6 +422,7 @@ class TestDeleteCollaboratorUseCase:
         response_body = result.body.decode('utf-8')
         assert "El colaborador no está asociado activamente a esta finca" in response_body
 
+    @patch('use_cases.delete_collaborator_use_case.publish_invalidation')
     @patch('use_cases.delete_collaborator_use_case.get_state')
     @patch('use_cases.delete_collaborator_use_case.get_user_role_ids')
     @patch('use_cases.delete_collaborator_use_case.get_user_role_id_for_farm')
@@ -420,7 +433,7 @@ class TestDeleteCollaboratorUseCase:
     def test_delete_collaborator_missing_inactive_state(
         self, mock_delete_user_role, mock_get_permissions, mock_get_role_name,
         mock_get_collaborators_info, mock_get_user_role_id_for_farm,
-        mock_get_user_role_ids, mock_get_state
+        mock_get_user_role_ids, mock_get_state, mock_publish
     ):
         """Test deletion when inactive state is not found during deletion"""
         # Setup mocks
@@ -452,6 +465,8 @@ class TestDeleteCollaboratorUseCase:
         assert result.status_code == 500
         response_body = result.body.decode('utf-8')
         assert "Estado 'Inactivo' no encontrado para 'user_role_farm'" in response_body
+        mock_publish.assert_not_called()
+        self.db_mock.commit.assert_not_called()
 
     @patch('use_cases.delete_collaborator_use_case.get_state')
     @patch('use_cases.delete_collaborator_use_case.get_user_role_ids')
@@ -34,6 +34,9 @@ class TestDeletePlotUseCase:
         self.plot_mock.plot_id = 1
         self.plot_mock.farm_id = 1
         self.plot_mock.plot_state_id = 1
+        self.plot_mock.name = "Lote 1"
+        self.plot_mock.latitude = 4.5
+        self.plot_mock.longitude = -75.1
         
         # Mock farm
         self.farm_mock = Mock()
@@ -87,6 +90,27 @@ class TestDeletePlotUseCase:
         mock_get_user_role_ids.assert_called_once_with(self.user_mock.user_id)
         mock_get_permissions.assert_called_once_with(self.user_role_farm_mock.user_role_id)
         
+    @patch('use_cases.delete_plot_use_case.refresh_farm_summary')
+    @patch('use_cases.delete_plot_use_case.get_state')
+    @patch('use_cases.delete_plot_use_case.get_user_role_ids')
+    @patch('use_cases.delete_plot_use_case.get_role_permissions_for_user_role')
+    def test_delete_plot_refreshes_farm_summary(self, mock_get_permissions, mock_get_user_role_ids, mock_get_state, mock_refresh_summary):
+        """Prueba que el resumen de la finca se recalcula en la misma transacción"""
+        mock_get_state.side_effect = [self.active_plot_state, self.inactive_plot_state, self.active_urf_state]
+        mock_get_user_role_ids.return_value = [1]
+        mock_get_permissions.return_value = ["delete_plot"]
+        self.db_mock.query.return_value.filter.return_value.first.side_effect = [
+            self.plot_mock, self.farm_mock, self.user_role_farm_mock
+        ]
+        calls = []
+        mock_refresh_summary.side_effect = lambda *args: calls.append("refresh")
+        self.db_mock.commit.side_effect = lambda: calls.append("commit")
+
+        delete_plot(1, self.user_mock, self.db_mock)
+
+        mock_refresh_summary.assert_called_once_with(self.db_mock, 1, 1)
+        assert calls == ["refresh", "commit"]
+
     @patch('use_cases.delete_plot_use_case.get_state')
     def test_delete_plot_not_found(self, mock_get_state):
         """Prueba cuando el lote no existe o no está activo"""
@@ -2,12 +2,13 @@
 Pruebas unitarias para edit_collaborator_role_use_case.py
 """
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, call, patch
 from sqlalchemy.orm import Session
 
 from use_cases.edit_collaborator_role_use_case import edit_collaborator_role
 from domain.schemas import EditCollaboratorRoleRequest, EditCollaboratorRoleResponse
 from models.models import Farms, UserRoleFarm, UserRoleFarmStates
+from adapters.cache_invalidation import USER_ROLE_EVENT
 from adapters.user_client import (
     UserRoleRetrievalError,
     UserRoleCreationError
@@ -49,6 +50,7 @@ class TestEditCollaboratorRoleUseCase:
             new_role_id=3
         )
 
+    @patch('use_cases.edit_collaborator_role_use_case.publish_invalidation')
     @patch('use_cases.edit_collaborator_role_use_case.get_state')
     @patch('use_cases.edit_collaborator_role_use_case.get_user_role_ids')
     @patch('use_cases.edit_collaborator_role_use_case.get_user_role_id_for_farm')
@@ -60,7 +62,7 @@ class TestEditCollaboratorRoleUseCase:
     def test_edit_collaborator_role_success_propietario_to_administrador(
         self, mock_create_user_role, mock_get_role_name_by_id, mock_get_permissions,
         mock_get_role_name, mock_get_collaborators_info, mock_get_user_role_id_for_farm,
-        mock_get_user_role_ids, mock_get_state
+        mock_get_user_role_ids, mock_get_state, mock_publish
     ):
         """Test successful role change from Propietario to Administrador de finca"""
         # Setup mocks
@@ -85,6 +87,9 @@ class TestEditCollaboratorRoleUseCase:
         mock_get_permissions.return_value = ['edit_administrator_farm']
         mock_create_user_role.return_value = 300  # New user_role_id
         
+        # La invalidación se encola en la transacción antes de confirmarla
+        mock_publish.side_effect = lambda *args, **kwargs: self.db_mock.commit.assert_not_called()
+        
         # Execute
         result = edit_collaborator_role(self.edit_request, 1, self.user_mock, self.db_mock)
         
@@ -100,6 +105,7 @@ class TestEditCollaboratorRoleUseCase:
         
         # Verify collaborator role was updated
         assert self.collaborator_role_farm_mock.user_role_id == 300
+        mock_publish.assert_called_once_with(self.db_mock, USER_ROLE_EVENT, user_id=2, user_role_id=200)
 
     @patch('use_cases.edit_collaborator_role_use_case.get_state')
     @patch('use_cases.edit_collaborator_role_use_case.get_user_role_ids')
@@ -312,6 +318,7 @@ class TestEditCollaboratorRoleUseCase:
         response_body = result.body.decode('utf-8')
         assert "Rol con ID" in response_body and "no encontrado" in response_body
 
+    @patch('use_cases.edit_collaborator_role_use_case.publish_invalidation')
     @patch('use_cases.edit_collaborator_role_use_case.get_state')
     @patch('use_cases.edit_collaborator_role_use_case.get_user_role_ids')
     @patch('use_cases.edit_collaborator_role_use_case.get_user_role_id_for_farm')
@@ -321,7 +328,7 @@ class TestEditCollaboratorRoleUseCase:
     @patch('use_cases.edit_collaborator_role_use_case.get_role_permissions_for_user_role')
     def test_edit_collaborator_role_no_permission(
         self, mock_get_permissions, mock_get_role_name_by_id, mock_get_role_name,
-        mock_get_collaborators_info, mock_get_user_role_id_for_farm, mock_get_user_role_ids, mock_get_state
+        mock_get_collaborators_info, mock_get_user_role_id_for_farm, mock_get_user_role_ids, mock_get_state, mock_publish
     ):
         """Test editing role when user doesn't have permission"""
         # Setup mocks
@@ -351,6 +358,7 @@ class TestEditCollaboratorRoleUseCase:
         assert result.status_code == 403
         response_body = result.body.decode('utf-8')
         assert "No tienes permiso para asignar el rol" in response_body
+        mock_publish.assert_not_called()
 
     @patch('use_cases.edit_collaborator_role_use_case.get_state')
     @patch('use_cases.edit_collaborator_role_use_case.get_user_role_ids')
@@ -437,6 +445,7 @@ class TestEditCollaboratorRoleUseCase:
         response_body = result.body.decode('utf-8')
         assert "Colaborador no encontrado" in response_body
 
+    @patch('use_cases.edit_collaborator_role_use_case.publish_invalidation')
     @patch('use_cases.edit_collaborator_role_use_case.get_state')
     @patch('use_cases.edit_collaborator_role_use_case.get_user_role_ids')
     @patch('use_cases.edit_collaborator_role_use_case.get_user_role_id_for_farm')
@@ -448,7 +457,7 @@ class TestEditCollaboratorRoleUseCase:
     def test_edit_collaborator_role_database_error(
         self, mock_create_user_role, mock_get_permissions, mock_get_role_name_by_id,
         mock_get_role_name, mock_get_collaborators_info, mock_get_user_role_id_for_farm,
-        mock_get_user_role_ids, mock_get_state
+        mock_get_user_role_ids, mock_get_state, mock_publish
     ):
         """Test editing role when database operation fails"""
         # Setup mocks
@@ -483,7 +492,11 @@ class TestEditCollaboratorRoleUseCase:
         response_body = result.body.decode('utf-8')
         assert "Error al actualizar el rol del colaborador" in response_body
         self.db_mock.rollback.assert_called_once()
+        # El evento se encoló en la transacción fallida y el rollback lo descarta
+        mock_publish.assert_called_once()
+        assert self.db_mock.method_calls[-2:] == [call.commit(), call.rollback()]
 
+    @patch('use_cases.edit_collaborator_role_use_case.publish_invalidation')
     @patch('use_cases.edit_collaborator_role_use_case.get_state')
     @patch('use_cases.edit_collaborator_role_use_case.get_user_role_ids')
     @patch('use_cases.edit_collaborator_role_use_case.get_user_role_id_for_farm')
@@ -495,7 +508,7 @@ class TestEditCollaboratorRoleUseCase:
     def test_edit_collaborator_role_user_role_creation_error(
         self, mock_create_user_role, mock_get_permissions, mock_get_role_name_by_id,
         mock_get_role_name, mock_get_collaborators_info, mock_get_user_role_id_for_farm,
-        mock_get_user_role_ids, mock_get_state
+        mock_get_user_role_ids, mock_get_state, mock_publish
     ):
         """Test editing role when user role creation fails"""
         # Setup mocks
@@ -527,6 +540,7 @@ class TestEditCollaboratorRoleUseCase:
         response_body = result.body.decode('utf-8')
         assert "Error al actualizar el rol del colaborador" in response_body
         self.db_mock.rollback.assert_called_once()
+        mock_publish.assert_not_called()
 
     @patch('use_cases.edit_collaborator_role_use_case.get_state')
     def test_edit_collaborator_role_missing_active_state(self, mock_get_state):
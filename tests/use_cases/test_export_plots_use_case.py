@@ -0,0 +1,134 @@
+"""
+Pruebas unitarias para export_plots_use_case.py
+"""
+from decimal import Decimal
+from unittest.mock import Mock, patch
+
+import orjson
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from use_cases.export_plots_use_case import export_plots, _stream_plots
+
+
+def _row(**values):
+    row = Mock()
+    row._mapping = values
+    return row
+
+
+class TestExportPlotsUseCase:
+    """Clase de pruebas para el caso de uso de exportación de lotes"""
+
+    def setup_method(self):
+        """Configuración inicial para cada prueba"""
+        self.db_mock = Mock(spec=Session)
+        self.user_mock = Mock()
+        self.user_mock.user_id = 1
+
+        self.active_farm_state = Mock()
+        self.active_farm_state.farm_state_id = 1
+        self.active_urf_state = Mock()
+        self.active_urf_state.user_role_farm_state_id = 1
+        self.active_plot_state = Mock()
+        self.active_plot_state.plot_state_id = 1
+
+        self.farm_mock = Mock()
+        self.user_role_farm_mock = Mock()
+        self.user_role_farm_mock.user_role_id = 10
+
+        query_mock = Mock()
+        self.filter_mock = Mock()
+        self.db_mock.query.return_value = query_mock
+        query_mock.filter.return_value = self.filter_mock
+
+        self.stream_session = Mock(spec=Session)
+        self.session_factory = Mock(return_value=self.stream_session)
+
+    @patch('use_cases.export_plots_use_case.get_state')
+    @patch('use_cases.list_plots_use_case.get_user_role_ids')
+    @patch('use_cases.list_plots_use_case.get_role_permissions_for_user_role')
+    def test_export_plots_returns_stream(self, mock_get_permissions, mock_get_user_role_ids, mock_get_state):
+        """Prueba que un usuario con 'read_plots' recibe un stream NDJSON"""
+        mock_get_state.side_effect = [self.active_farm_state, self.active_urf_state, self.active_plot_state]
+        mock_get_user_role_ids.return_value = [10]
+        mock_get_permissions.return_value = ["read_plots"]
+        self.filter_mock.first.side_effect = [self.farm_mock, self.user_role_farm_mock]
+
+        result = export_plots(1, self.user_mock, self.db_mock, session_factory=self.session_factory)
+
+        assert isinstance(result, StreamingResponse)
+        assert result.media_type == "application/x-ndjson"
+        # La sesión de streaming solo se abre cuando se empieza a consumir el cuerpo
+        self.session_factory.assert_not_called()
+
+    @patch('use_cases.export_plots_use_case.get_state')
+    @patch('use_cases.list_plots_use_case.get_user_role_ids')
+    @patch('use_cases.list_plots_use_case.get_role_permissions_for_user_role')
+    def test_export_plots_without_permission(self, mock_get_permissions, mock_get_user_role_ids, mock_get_state):
+        """Prueba que sin 'read_plots' se retorna el mismo error que en el listado"""
+        mock_get_state.side_effect = [self.active_farm_state, self.active_urf_state, self.active_plot_state]
+        mock_get_user_role_ids.return_value = [10]
+        mock_get_permissions.return_value = ["add_plot"]
+        self.filter_mock.first.side_effect = [self.farm_mock, self.user_role_farm_mock]
+
+        result = export_plots(1, self.user_mock, self.db_mock, session_factory=self.session_factory)
+
+        assert result.status_code == 200
+        response_data = result.body.decode()
+        assert '"status":"error"' in response_data
+        assert '"message":"No tienes permiso para ver los lotes de esta finca"' in response_data
+
+    @patch('use_cases.export_plots_use_case.get_state')
+    def test_export_plots_farm_not_found(self, mock_get_state):
+        """Prueba cuando la finca no existe o no está activa"""
+        mock_get_state.side_effect = [self.active_farm_state, self.active_urf_state, self.active_plot_state]
+        self.filter_mock.first.return_value = None
+
+        result = export_plots(999, self.user_mock, self.db_mock, session_factory=self.session_factory)
+
+        assert '"message":"La finca no existe o no está activa"' in result.body.decode()
+
+    @patch('use_cases.export_plots_use_case.get_state')
+    def test_export_plots_missing_states(self, mock_get_state):
+        """Prueba cuando no se encuentran los estados 'Activo'"""
+        mock_get_state.return_value = None
+
+        result = export_plots(1, self.user_mock, self.db_mock, session_factory=self.session_factory)
+
+        assert result.status_code == 400
+
+    def test_stream_plots_yields_ndjson_per_partition(self):
+        """Prueba que cada partición del cursor se emite como un bloque de líneas NDJSON"""
+        result_mock = Mock()
+        result_mock.partitions.return_value = iter([
+            [
+                _row(plot_id=1, name="Lote 1", coffee_variety_name="Castillo",
+                     latitude=Decimal("4.5"), longitude=Decimal("-75.1"), altitude=Decimal("1500.00")),
+                _row(plot_id=2, name="Lote 2", coffee_variety_name=None,
+                     latitude=None, longitude=None, altitude=None),
+            ],
+            [
+                _row(plot_id=3, name="Lote 3", coffee_variety_name="Caturra",
+                     latitude=Decimal("4.6"), longitude=Decimal("-75.2"), altitude=Decimal("1600.00")),
+            ],
+        ])
+        self.stream_session.execute.return_value = result_mock
+
+        chunks = list(_stream_plots(1, 1, self.session_factory))
+
+        assert len(chunks) == 2
+        lines = b"".join(chunks).splitlines()
+        assert [orjson.loads(line)["plot_id"] for line in lines] == [1, 2, 3]
+        assert orjson.loads(lines[0])["altitude"] == 1500.0
+        assert orjson.loads(lines[1])["coffee_variety_name"] is None
+        self.stream_session.close.assert_called_once()
+
+    def test_stream_plots_reports_error_line(self):
+        """Prueba que un error a mitad del stream se informa como última línea y se cierra la sesión"""
+        self.stream_session.execute.side_effect = Exception("Database connection error")
+
+        chunks = list(_stream_plots(1, 1, self.session_factory))
+
+        assert orjson.loads(chunks[-1]) == {"status": "error", "message": "Error al exportar los lotes"}
+        self.stream_session.close.assert_called_once()
@@ -0,0 +1,74 @@
+"""
+Pruebas unitarias para farm_area_stats_use_case.py
+"""
+import json
+from unittest.mock import Mock, patch
+
+from sqlalchemy.orm import Session
+
+from use_cases.farm_area_stats_use_case import get_farm_area_stats
+
+
+class TestFarmAreaStatsUseCase:
+    """Clase de pruebas para las estadísticas de área de las fincas"""
+
+    def setup_method(self):
+        """Configuración inicial para cada prueba"""
+        self.db_mock = Mock(spec=Session)
+        self.user_mock = Mock()
+        self.user_mock.user_id = 1
+        self.state = Mock(farm_state_id=1, user_role_farm_state_id=1)
+
+        self.farms_query = Mock()
+        self.db_mock.query.return_value = self.farms_query
+        self.farms_query.join.return_value.filter.return_value.distinct.return_value.all.return_value = [
+            (1, "Finca A", 2.0, 1),
+            (2, "Finca B", 50000.0, 2),
+            (3, "Finca C", 10.0, 9),
+            (4, "Finca D", 5.0, 3)
+        ]
+
+        patch('use_cases.farm_area_stats_use_case.get_state', return_value=self.state).start()
+        self.mock_roles = patch('use_cases.farm_area_stats_use_case.get_user_role_ids', return_value=[10]).start()
+        self.mock_factors = patch(
+            'use_cases.farm_area_stats_use_case.load_hectare_factors',
+            return_value={1: 1.0, 2: 0.0001, 3: 0.64}
+        ).start()
+
+    def teardown_method(self):
+        patch.stopall()
+
+    def _data(self, **kwargs):
+        return json.loads(get_farm_area_stats(self.user_mock, self.db_mock, **kwargs).body)["data"]
+
+    def test_totals_in_hectares(self):
+        """Prueba el total y el promedio en hectáreas, sin contar las fincas de unidad desconocida"""
+        data = self._data()
+
+        assert data["farm_count"] == 4
+        assert data["unconverted_farm_count"] == 1
+        assert data["total_area_hectares"] == 10.2
+        assert data["average_area_hectares"] == 3.4
+
+    def test_sorted_by_hectares(self):
+        """Prueba el orden por área en hectáreas, con las fincas sin conversión al final"""
+        assert [farm["farm_id"] for farm in self._data()["farms"]] == [2, 4, 1, 3]
+        farms = self._data(order="asc")["farms"]
+        assert [farm["farm_id"] for farm in farms] == [1, 4, 2, 3]
+        assert farms[1]["area_hectares"] == 3.2
+        assert farms[3]["area_hectares"] is None
+
+    def test_user_without_roles(self):
+        self.mock_roles.return_value = []
+
+        data = self._data()
+
+        assert data == {
+            "farm_count": 0, "unconverted_farm_count": 0, "total_area_hectares": 0.0,
+            "average_area_hectares": None, "farms": []
+        }
+        self.db_mock.query.assert_not_called()
+
+    def test_roles_error(self):
+        self.mock_roles.side_effect = Exception("timeout")
+        assert get_farm_area_stats(self.user_mock, self.db_mock).status_code == 500
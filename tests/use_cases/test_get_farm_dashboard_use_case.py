@@ -0,0 +1,158 @@
+"""
+Pruebas unitarias para get_farm_dashboard_use_case.py
+"""
+import json
+import threading
+from decimal import Decimal
+from unittest.mock import MagicMock, Mock, patch
+
+from sqlalchemy.orm import Session
+
+from use_cases.get_farm_dashboard_use_case import get_farm_dashboard
+
+
+class TestGetFarmDashboardUseCase:
+    """Clase de pruebas para el caso de uso del tablero de la finca"""
+
+    def setup_method(self):
+        """Configuración inicial para cada prueba"""
+        self.db_mock = Mock(spec=Session)
+        self.user_mock = Mock()
+        self.user_mock.user_id = 1
+
+        self.active_farm_state = Mock(farm_state_id=1)
+        self.active_urf_state = Mock(user_role_farm_state_id=1)
+        self.active_plot_state = Mock(plot_state_id=1)
+
+        farm = Mock(farm_id=1, area=Decimal("10.50"), area_unit_id=1, farm_state_id=1)
+        farm.name = "Finca"
+        area_unit = Mock()
+        area_unit.name = "Hectárea"
+        farm_state = Mock()
+        farm_state.name = "Activo"
+        self.user_role_farm = Mock(user_role_id=7)
+        self.db_mock.query.return_value.select_from.return_value.join.return_value.join.return_value.join.return_value \
+            .filter.return_value.first.return_value = (farm, area_unit, farm_state, self.user_role_farm)
+
+        plot = Mock(plot_id=3, latitude=Decimal("4.5"), longitude=Decimal("-75.1"), altitude=Decimal("1500"))
+        plot.name = "Lote 1"
+        self.section_threads = []
+        self.section_db = MagicMock()
+        self.section_db.query.side_effect = self._section_query
+        self.plot_rows = [(plot, "Castillo")]
+        self.collaborator_rows = [(7,), (8,)]
+        self.session_factory = Mock(side_effect=self._new_session)
+
+        patcher_state = patch('use_cases.get_farm_dashboard_use_case.get_state', side_effect=self._get_state)
+        patcher_role_ids = patch('use_cases.get_farm_dashboard_use_case.get_user_role_ids', return_value=[7])
+        patcher_permissions = patch('use_cases.get_farm_dashboard_use_case.get_role_permissions_for_user_role',
+                                    return_value=["read_plots", "read_collaborators"])
+        patcher_role_name = patch('use_cases.get_farm_dashboard_use_case.get_role_name_for_user_role', return_value="Propietario")
+        patcher_info = patch('use_cases.get_farm_dashboard_use_case.get_collaborators_info', return_value=[{"user_role_id": 7}])
+        patcher_state.start()
+        self.mock_role_ids = patcher_role_ids.start()
+        self.mock_permissions = patcher_permissions.start()
+        self.mock_role_name = patcher_role_name.start()
+        self.mock_info = patcher_info.start()
+
+    def teardown_method(self):
+        patch.stopall()
+
+    def _get_state(self, db, name, entity_type):
+        return {"farms": self.active_farm_state, "user_role_farm": self.active_urf_state, "plots": self.active_plot_state}[entity_type.lower()]
+
+    def _new_session(self):
+        self.section_threads.append(threading.current_thread().name)
+        context = MagicMock()
+        context.__enter__.return_value = self.section_db
+        return context
+
+    def _section_query(self, *entities):
+        query = Mock()
+        rows = self.plot_rows if len(entities) == 2 else self.collaborator_rows
+        query.outerjoin.return_value.filter.return_value.order_by.return_value.all.return_value = rows
+        query.filter.return_value.order_by.return_value.all.return_value = rows
+        return query
+
+    def _dashboard(self, **kwargs):
+        response = get_farm_dashboard(1, self.user_mock, self.db_mock, session_factory=self.session_factory, **kwargs)
+        return response, json.loads(response.body)
+
+    def test_dashboard_success(self):
+        """Prueba el tablero completo con todos los permisos"""
+        response, result = self._dashboard()
+
+        assert response.status_code == 200
+        data = result["data"]
+        assert data["farm"]["role"] == "Propietario"
+        assert data["farm"]["area"] == 10.5
+        assert data["plots"] == {"status": "success", "plots": [{
+            "plot_id": 3, "name": "Lote 1", "coffee_variety_name": "Castillo",
+            "latitude": 4.5, "longitude": -75.1, "altitude": 1500.0
+        }]}
+        assert data["collaborators"] == {"status": "success", "count": 2, "user_role_ids": [7, 8]}
+        # Pertenencia y permisos se resuelven una sola vez
+        self.mock_role_ids.assert_called_once_with(1)
+        self.mock_permissions.assert_called_once_with(7)
+        self.mock_info.assert_not_called()
+        # Cada sección usa su propia sesión, fuera del hilo de la petición
+        assert len(self.section_threads) == 2
+        assert threading.current_thread().name not in self.section_threads
+
+    def test_dashboard_with_collaborators_info(self):
+        """Prueba la consulta opcional de la información de los colaboradores"""
+        _, result = self._dashboard(include_collaborators_info=True)
+
+        assert result["data"]["collaborators"]["collaborators"] == [{"user_role_id": 7}]
+        self.mock_info.assert_called_once_with([7, 8])
+
+    def test_sections_without_permission_are_forbidden(self):
+        """Prueba que las secciones sin permiso no se consultan"""
+        self.mock_permissions.return_value = ["read_plots"]
+
+        _, result = self._dashboard(include_collaborators_info=True)
+
+        assert result["data"]["plots"]["status"] == "success"
+        assert result["data"]["collaborators"]["status"] == "forbidden"
+        assert len(self.section_threads) == 1
+        self.mock_info.assert_not_called()
+
+    def test_failed_section_does_not_fail_dashboard(self):
+        """Prueba que si una sección falla las demás se retornan"""
+        self.mock_info.side_effect = Exception("user service down")
+        self.mock_role_name.side_effect = Exception("user service down")
+
+        response, result = self._dashboard(include_collaborators_info=True)
+
+        assert response.status_code == 200
+        assert result["data"]["collaborators"]["status"] == "error"
+        assert result["data"]["plots"]["status"] == "success"
+        assert result["data"]["farm"]["role"] is None
+
+    def test_farm_not_found(self):
+        """Prueba que una finca ajena o inactiva retorna error"""
+        self.db_mock.query.return_value.select_from.return_value.join.return_value.join.return_value.join.return_value \
+            .filter.return_value.first.return_value = None
+
+        _, result = self._dashboard()
+
+        assert result["status"] == "error"
+        assert result["message"] == "Finca no encontrada o no pertenece al usuario"
+        self.session_factory.assert_not_called()
+
+    def test_user_service_error(self):
+        """Prueba el error al obtener los roles del usuario"""
+        self.mock_role_ids.side_effect = Exception("timeout")
+
+        response, _ = self._dashboard()
+
+        assert response.status_code == 500
+
+    def test_permissions_error(self):
+        """Prueba el error al obtener los permisos del rol"""
+        self.mock_permissions.side_effect = Exception("timeout")
+
+        response, _ = self._dashboard()
+
+        assert response.status_code == 500
+        self.session_factory.assert_not_called()
@@ -0,0 +1,103 @@
+"""
+Pruebas unitarias para get_farm_summary_use_case.py
+"""
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import Mock, patch
+
+from sqlalchemy.orm import Session
+
+from use_cases.get_farm_summary_use_case import get_farm_summary
+
+
+class TestGetFarmSummaryUseCase:
+    """Clase de pruebas para el caso de uso de resumen de finca"""
+
+    def setup_method(self):
+        """Configuración inicial para cada prueba"""
+        self.db_mock = Mock(spec=Session)
+        self.user_mock = Mock()
+        self.user_mock.user_id = 1
+
+        self.active_plot_state = Mock()
+        self.active_plot_state.plot_state_id = 1
+
+        self.summary = Mock()
+        self.summary.active_plot_count = 5
+        self.summary.variety_counts = {"1": 2, "2": 3}
+        self.summary.min_altitude = Decimal("1200.00")
+        self.summary.max_altitude = Decimal("1800.00")
+        self.summary.avg_altitude = Decimal("1500.50")
+        self.summary.updated_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+        self.farm = Mock()
+        self.farm.farm_id = 1
+        self.farm.name = "Finca"
+        self.farm.area = Decimal("10.50")
+        self.area_unit = Mock()
+        self.area_unit.name = "Hectárea"
+
+        patcher_state = patch('use_cases.get_farm_summary_use_case.get_state', return_value=self.active_plot_state)
+        patcher_access = patch('use_cases.get_farm_summary_use_case.verify_read_plots_access', return_value=None)
+        patcher_refresh = patch('use_cases.get_farm_summary_use_case.refresh_farm_summary')
+        self.mock_get_state = patcher_state.start()
+        self.mock_access = patcher_access.start()
+        self.mock_refresh = patcher_refresh.start()
+
+    def teardown_method(self):
+        patch.stopall()
+
+    def _configure_queries(self, summaries):
+        summary_query = Mock()
+        summary_query.filter.return_value.first.side_effect = summaries
+        farm_query = Mock()
+        farm_query.join.return_value.filter.return_value.first.return_value = (self.farm, self.area_unit)
+        varieties_query = Mock()
+        varieties_query.filter.return_value.all.return_value = [(1, "Castillo"), (2, "Caturra")]
+        self.db_mock.query.side_effect = [summary_query] * len(summaries) + [farm_query, varieties_query]
+
+    def test_get_farm_summary_success(self):
+        """Prueba la lectura del resumen existente"""
+        self._configure_queries([self.summary])
+
+        result = json.loads(get_farm_summary(1, self.user_mock, self.db_mock).body)
+
+        assert result["status"] == "success"
+        data = result["data"]
+        assert data["active_plot_count"] == 5
+        assert data["area"] == 10.5
+        assert data["varieties"] == [
+            {"coffee_variety_id": 2, "coffee_variety_name": "Caturra", "plot_count": 3},
+            {"coffee_variety_id": 1, "coffee_variety_name": "Castillo", "plot_count": 2},
+        ]
+        assert data["altitude"] == {"min": 1200.0, "max": 1800.0, "avg": 1500.5}
+        self.mock_refresh.assert_not_called()
+
+    def test_missing_summary_is_built(self):
+        """Prueba que si la finca aún no tiene resumen se calcula y se guarda"""
+        self._configure_queries([None, self.summary])
+
+        result = json.loads(get_farm_summary(1, self.user_mock, self.db_mock).body)
+
+        assert result["status"] == "success"
+        self.mock_refresh.assert_called_once_with(self.db_mock, 1, 1)
+        self.db_mock.commit.assert_called_once()
+
+    def test_summary_build_error(self):
+        """Prueba el error al calcular el resumen"""
+        self._configure_queries([None])
+        self.mock_refresh.side_effect = Exception("DB error")
+
+        response = get_farm_summary(1, self.user_mock, self.db_mock)
+
+        assert response.status_code == 500
+        self.db_mock.rollback.assert_called_once()
+
+    def test_access_denied(self):
+        """Prueba que sin permiso 'read_plots' se retorna el error de acceso"""
+        error = Mock()
+        self.mock_access.return_value = error
+
+        assert get_farm_summary(1, self.user_mock, self.db_mock) is error
+        self.db_mock.query.assert_not_called()
@@ -0,0 +1,229 @@
+"""
+Pruebas unitarias para import_plots_use_case.py
+"""
+import io
+import pytest
+from unittest.mock import Mock, patch
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+
+import orjson
+
+from use_cases.import_plots_use_case import import_plots
+from adapters.cache_invalidation import PLOT_EVENT
+
+
+def _csv(text):
+    return io.BytesIO(text.encode("utf-8"))
+
+
+class TestImportPlotsUseCase:
+    """Clase de pruebas para el caso de uso de importación de lotes"""
+
+    def setup_method(self):
+        """Configuración inicial para cada prueba"""
+        self.db_mock = Mock(spec=Session)
+        self.user_mock = Mock()
+        self.user_mock.user_id = 1
+
+        self.active_plot_state = Mock()
+        self.active_plot_state.plot_state_id = 1
+        self.inactive_plot_state = Mock()
+        self.inactive_plot_state.plot_state_id = 2
+        self.states = {
+            'active_farm': Mock(),
+            'active_urf': Mock(),
+            'active_plot': self.active_plot_state,
+            'inactive_plot': self.inactive_plot_state,
+        }
+
+        # Variedades existentes y lotes actuales de la finca
+        varieties_query = Mock()
+        varieties_query.all.return_value = [(1,), (2,)]
+        plots_query = Mock()
+        plots_query.filter.return_value.all.return_value = [
+            (10, "Lote Activo", 1),
+            (11, "Lote Inactivo", 2),
+        ]
+        self.db_mock.query.side_effect = [varieties_query, plots_query]
+
+        patcher_states = patch('use_cases.import_plots_use_case._get_required_states', return_value=(self.states, None))
+        patcher_access = patch('use_cases.import_plots_use_case._validate_farm_access', return_value=(Mock(), None))
+        patcher_summary = patch('use_cases.import_plots_use_case.refresh_farm_summary')
+        patcher_publish = patch('use_cases.import_plots_use_case.publish_invalidation')
+        self.mock_get_states = patcher_states.start()
+        self.mock_validate_access = patcher_access.start()
+        self.mock_refresh_summary = patcher_summary.start()
+        self.mock_publish = patcher_publish.start()
+
+    def teardown_method(self):
+        patch.stopall()
+
+    def _executed_batches(self):
+        return [call.args for call in self.db_mock.execute.call_args_list]
+
+    def test_import_csv_success(self):
+        """Prueba la importación de un CSV con filas nuevas y una reactivación"""
+        file = _csv(
+            "name,coffee_variety_id,latitude,longitude,altitude\n"
+            "Lote A,1,4.5,-75.1,1500\n"
+            "Lote B,2,4.6,-75.2,1600\n"
+            "Lote Inactivo,1,4.7,-75.3,1700\n"
+        )
+
+        result = import_plots(1, file, "lotes.csv", "text/csv", self.user_mock, self.db_mock)
+
+        assert result.status_code == 200
+        data = orjson.loads(result.body)["data"]
+        assert data == {"created": 2, "reactivated": 1, "errors": []}
+
+        batches = self._executed_batches()
+        assert len(batches) == 2
+        self.mock_refresh_summary.assert_called_once_with(self.db_mock, 1, 1)
+        self.mock_publish.assert_called_once_with(self.db_mock, PLOT_EVENT, farm_id=1)
+        inserted = batches[0][1]
+        assert [row["name"] for row in inserted] == ["Lote A", "Lote B"]
+        assert all(row["farm_id"] == 1 and row["plot_state_id"] == 1 for row in inserted)
+        assert batches[1][1] == [{
+            "plot_id": 11, "name": "Lote Inactivo", "coffee_variety_id": 1,
+            "latitude": 4.7, "longitude": -75.3, "altitude": 1700.0, "plot_state_id": 1,
+        }]
+        self.db_mock.commit.assert_called_once()
+
+    def test_import_csv_reports_row_errors(self):
+        """Prueba que las filas inválidas se reportan sin impedir la importación de las válidas"""
+        file = _csv(
+            "name,coffee_variety_id,latitude,longitude,altitude\n"
+            "Lote A,1,4.5,-75.1,1500\n"
+            "Lote A,1,4.5,-75.1,1500\n"
+            "Lote Activo,1,4.5,-75.1,1500\n"
+            "Lote C,99,4.5,-75.1,1500\n"
+            "Lote D,1,95,-75.1,1500\n"
+            "   ,1,4.5,-75.1,1500\n"
+        )
+
+        result = import_plots(1, file, "lotes.csv", "text/csv", self.user_mock, self.db_mock)
+
+        body = orjson.loads(result.body)
+        assert body["status"] == "success"
+        assert body["message"] == "Lotes importados con errores en algunas filas"
+        assert body["data"]["created"] == 1
+        errors = {error["row"]: error["message"] for error in body["data"]["errors"]}
+        assert errors[2] == "El nombre 'Lote A' está repetido en el archivo"
+        assert errors[3] == "Ya existe un lote activo con el nombre 'Lote Activo' en esta finca"
+        assert errors[4] == "La variedad de café con ID '99' no existe"
+        assert errors[5].startswith("latitude:")
+        assert errors[6] == "El nombre del lote no puede estar vacío"
+
+    def test_import_geojson_success(self):
+        """Prueba la importación de un FeatureCollection con puntos"""
+        document = {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    "type": "Feature",
+                    "geometry": {"type": "Point", "coordinates": [-75.1, 4.5, 1500]},
+                    "properties": {"name": "Lote Geo", "coffee_variety_id": 2},
+                }
+            ],
+        }
+
+        result = import_plots(1, io.BytesIO(orjson.dumps(document)), "lotes.geojson", None, self.user_mock, self.db_mock)
+
+        assert orjson.loads(result.body)["data"]["created"] == 1
+        inserted = self._executed_batches()[0][1][0]
+        assert (inserted["latitude"], inserted["longitude"], inserted["altitude"]) == (4.5, -75.1, 1500.0)
+
+    def test_import_geojson_reports_malformed_features(self):
+        """Prueba que las Features que no son objetos, o con properties/geometry que no son objetos, se reportan por fila"""
+        point = {"type": "Point", "coordinates": [-75.1, 4.5, 1500]}
+        document = {
+            "type": "FeatureCollection",
+            "features": [
+                1,
+                {"type": "Feature", "geometry": point, "properties": ["Lote"]},
+                {"type": "Feature", "geometry": "Point", "properties": {"name": "Lote X", "coffee_variety_id": 1}},
+                {"type": "Feature", "geometry": {"type": "Point", "coordinates": 5}, "properties": {"name": "Lote Y", "coffee_variety_id": 1}},
+                {"type": "Feature", "geometry": point, "properties": {"name": "Lote Geo", "coffee_variety_id": 1}},
+            ],
+        }
+
+        result = import_plots(1, io.BytesIO(orjson.dumps(document)), "lotes.geojson", None, self.user_mock, self.db_mock)
+
+        body = orjson.loads(result.body)
+        assert result.status_code == 200
+        assert body["data"]["created"] == 1
+        assert body["data"]["errors"] == [
+            {"row": 1, "message": "La Feature debe ser un objeto JSON"},
+            {"row": 2, "message": "El campo 'properties' de la Feature debe ser un objeto JSON"},
+            {"row": 3, "message": "El campo 'geometry' de la Feature debe ser un objeto JSON"},
+            {"row": 4, "message": "El campo 'geometry.coordinates' de la Feature debe ser una lista"},
+        ]
+
+    def test_import_geojson_features_not_a_list(self):
+        file = io.BytesIO(b'{"type": "FeatureCollection", "features": 1}')
+
+        result = import_plots(1, file, "lotes.geojson", None, self.user_mock, self.db_mock)
+
+        assert result.status_code == 400
+        assert orjson.loads(result.body)["message"] == "El campo 'features' del archivo GeoJSON debe ser una lista"
+
+    def test_import_geojson_invalid_document(self):
+        """Prueba que un GeoJSON que no es FeatureCollection se rechaza"""
+        file = io.BytesIO(b'{"type": "Feature"}')
+
+        result = import_plots(1, file, "lotes.geojson", None, self.user_mock, self.db_mock)
+
+        assert result.status_code == 400
+        assert orjson.loads(result.body)["message"] == "El archivo GeoJSON debe ser un FeatureCollection"
+        self.db_mock.commit.assert_not_called()
+
+    def test_import_unsupported_format(self):
+        """Prueba que se rechazan formatos distintos de CSV y GeoJSON"""
+        result = import_plots(1, io.BytesIO(b""), "lotes.xlsx", "application/vnd.ms-excel", self.user_mock, self.db_mock)
+
+        assert result.status_code == 400
+        assert orjson.loads(result.body)["message"] == "Formato de archivo no soportado. Use CSV o GeoJSON"
+
+    def test_import_without_valid_rows(self):
+        """Prueba que si ninguna fila es válida se retorna error"""
+        file = _csv("name,coffee_variety_id,latitude,longitude,altitude\nLote Activo,1,4.5,-75.1,1500\n")
+
+        result = import_plots(1, file, "lotes.csv", "text/csv", self.user_mock, self.db_mock)
+
+        assert result.status_code == 400
+        assert orjson.loads(result.body)["message"] == "No se importó ningún lote"
+        self.db_mock.execute.assert_not_called()
+        self.mock_refresh_summary.assert_not_called()
+        self.mock_publish.assert_not_called()
+
+    def test_import_batches_large_files(self):
+        """Prueba que las inserciones se agrupan en lotes de IMPORT_BATCH_SIZE filas"""
+        rows = "".join(f"Lote {i},1,4.5,-75.1,1500\n" for i in range(5))
+        file = _csv("name,coffee_variety_id,latitude,longitude,altitude\n" + rows)
+
+        with patch('use_cases.import_plots_use_case.IMPORT_BATCH_SIZE', 2):
+            import_plots(1, file, "lotes.csv", "text/csv", self.user_mock, self.db_mock)
+
+        assert [len(batch[1]) for batch in self._executed_batches()] == [2, 2, 1]
+
+    def test_import_access_denied(self):
+        """Prueba que se retorna el error de permisos de la creación individual"""
+        denied = Mock()
+        self.mock_validate_access.return_value = (None, denied)
+
+        result = import_plots(1, _csv(""), "lotes.csv", "text/csv", self.user_mock, self.db_mock)
+
+        assert result is denied
+        self.db_mock.query.assert_not_called()
+
+    def test_import_database_error(self):
+        """Prueba que un error de base de datos revierte la transacción"""
+        self.db_mock.execute.side_effect = Exception("Database error")
+        file = _csv("name,coffee_variety_id,latitude,longitude,altitude\nLote A,1,4.5,-75.1,1500\n")
+
+        with pytest.raises(HTTPException) as exc_info:
+            import_plots(1, file, "lotes.csv", "text/csv", self.user_mock, self.db_mock)
+
+        assert exc_info.value.status_code == 500
+        self.db_mock.rollback.assert_called_once()
@@ -0,0 +1,73 @@
+"""
+Pruebas unitarias para nearest_plots_use_case.py
+"""
+import json
+from decimal import Decimal
+from unittest.mock import Mock, patch
+
+from sqlalchemy.orm import Session
+
+from adapters.plot_spatial_index import PlotSpatialIndex
+from use_cases.nearest_plots_use_case import find_nearest_plots
+
+
+class TestNearestPlotsUseCase:
+    """Clase de pruebas para la búsqueda de los lotes más cercanos"""
+
+    def setup_method(self):
+        """Configuración inicial para cada prueba"""
+        self.db_mock = Mock(spec=Session)
+        self.user_mock = Mock()
+        self.user_mock.user_id = 1
+        self.state = Mock(farm_state_id=1, user_role_farm_state_id=1, plot_state_id=1)
+
+        self.plots_query = Mock()
+        self.db_mock.query.return_value = self.plots_query
+        self.plots_query.filter.return_value.all.return_value = [
+            (1, 10, "Lote A", Decimal("4.5"), Decimal("-75.5")),
+            (2, 20, "Lote B", Decimal("4.6"), Decimal("-75.6")),
+            (2, 21, "Lote C", Decimal("6.0"), Decimal("-75.0"))
+        ]
+
+        self.index = PlotSpatialIndex()
+        patch('use_cases.nearest_plots_use_case.get_state', return_value=self.state).start()
+        patch('use_cases.nearest_plots_use_case.plot_spatial_index', self.index).start()
+        self.mock_farms = patch('use_cases.nearest_plots_use_case.get_readable_farm_ids', return_value=[1, 2]).start()
+
+    def teardown_method(self):
+        patch.stopall()
+
+    def test_nearest_plots(self):
+        """Prueba que se retornan los lotes ordenados por distancia y las fincas se cargan una vez"""
+        response = find_nearest_plots(4.6, -75.6, self.user_mock, self.db_mock, k=2)
+        plots = json.loads(response.body)["data"]["plots"]
+
+        assert [plot["plot_id"] for plot in plots] == [20, 10]
+        assert plots[0]["distance_km"] == 0
+        assert plots[1]["farm_id"] == 1
+
+        find_nearest_plots(4.6, -75.6, self.user_mock, self.db_mock, k=2)
+        self.db_mock.query.assert_called_once()
+
+    def test_max_distance(self):
+        """Prueba que `max_distance_km` descarta los lotes lejanos"""
+        response = find_nearest_plots(6.0, -75.0, self.user_mock, self.db_mock, k=10, max_distance_km=50)
+
+        assert [plot["plot_id"] for plot in json.loads(response.body)["data"]["plots"]] == [21]
+
+    def test_user_without_readable_farms(self):
+        """Prueba que sin fincas visibles no se consulta ningún lote"""
+        self.mock_farms.return_value = []
+
+        response = find_nearest_plots(4.6, -75.6, self.user_mock, self.db_mock)
+
+        assert json.loads(response.body)["data"] == {"plots": []}
+        self.db_mock.query.assert_not_called()
+
+    def test_roles_error(self):
+        """Prueba que un error del servicio de usuarios retorna 500"""
+        self.mock_farms.side_effect = Exception("timeout")
+
+        response = find_nearest_plots(4.6, -75.6, self.user_mock, self.db_mock)
+
+        assert response.status_code == 500
@@ -0,0 +1,141 @@
+"""
+Pruebas unitarias para plot_clusters_use_case.py
+"""
+import json
+import os
+import random
+from decimal import Decimal
+from unittest.mock import Mock, patch
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from adapters.plot_clusters import TileClusters, merge_clusters, plot_cluster_cache, tile_bounds
+from models.models import Base, Plots
+from use_cases.plot_clusters_use_case import _tile_cells_loader, get_plot_clusters
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+TEST_SCHEMA = "plot_clusters_test"
+
+
+@pytest.fixture(autouse=True)
+def clear_cluster_cache():
+    plot_cluster_cache.clear()
+    yield
+    plot_cluster_cache.clear()
+
+
+class TestPlotClustersUseCase:
+    """Clase de pruebas para el agrupamiento de lotes del mapa"""
+
+    def setup_method(self):
+        """Configuración inicial para cada prueba"""
+        self.db_mock = Mock(spec=Session)
+        self.user_mock = Mock()
+        self.user_mock.user_id = 1
+        self.state = Mock(farm_state_id=1, user_role_farm_state_id=1, plot_state_id=1)
+
+        # Filas agrupadas por (finca, variedad, celda de latitud, celda de longitud) a precisión 5
+        self.plots_query = Mock()
+        self.plots_query.filter.return_value.group_by.return_value.all.return_value = [
+            (1, 1, 2150, 2377, 1, Decimal("4.50"), Decimal("-75.50")),
+            (1, 2, 2150, 2377, 1, Decimal("4.51"), Decimal("-75.51")),
+            (2, 2, 2150, 2377, 1, Decimal("4.52"), Decimal("-75.52")),
+            (3, 1, 2151, 2377, 1, Decimal("4.53"), Decimal("-75.53"))
+        ]
+        self.varieties_query = Mock()
+        self.varieties_query.filter.return_value.all.return_value = [(2, "Castillo")]
+        self.db_mock.query.side_effect = lambda *columns: (
+            self.varieties_query if len(columns) == 2 else self.plots_query
+        )
+
+        patch('use_cases.plot_clusters_use_case.get_state', return_value=self.state).start()
+        self.mock_farms = patch('use_cases.plot_clusters_use_case.get_readable_farm_ids', return_value=[1, 2]).start()
+
+    def teardown_method(self):
+        patch.stopall()
+
+    def test_clusters_are_filtered_by_farm_and_cached(self):
+        """Prueba que se cuentan solo los lotes de las fincas del usuario y que las celdas quedan en caché"""
+        response = get_plot_clusters(4.4, -75.6, 4.6, -75.4, 8, self.user_mock, self.db_mock)
+        data = json.loads(response.body)["data"]
+
+        assert data["precision"] == 5
+        assert sum(cluster["count"] for cluster in data["clusters"]) == 3
+        dominant = max(data["clusters"], key=lambda cluster: cluster["count"])
+        assert dominant["dominant_coffee_variety_id"] == 2
+        assert dominant["dominant_coffee_variety_name"] == "Castillo"
+        tile_queries = self.plots_query.filter.call_count
+
+        self.mock_farms.return_value = [3]
+        data = json.loads(get_plot_clusters(4.4, -75.6, 4.6, -75.4, 8, self.user_mock, self.db_mock).body)["data"]
+
+        assert sum(cluster["count"] for cluster in data["clusters"]) == 1
+        assert self.plots_query.filter.call_count == tile_queries
+
+    def test_area_too_large_for_zoom(self):
+        response = get_plot_clusters(-10, -80, 10, -60, 16, self.user_mock, self.db_mock)
+
+        assert response.status_code == 400
+        self.db_mock.query.assert_not_called()
+
+    def test_invalid_latitudes(self):
+        response = get_plot_clusters(5, -76, 4, -75, 8, self.user_mock, self.db_mock)
+        assert response.status_code == 400
+
+    def test_user_without_readable_farms(self):
+        """Prueba que sin fincas visibles no se consulta ningún lote"""
+        self.mock_farms.return_value = []
+
+        data = json.loads(get_plot_clusters(4.4, -75.6, 4.6, -75.4, 8, self.user_mock, self.db_mock).body)["data"]
+
+        assert data["clusters"] == []
+        self.db_mock.query.assert_not_called()
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL no está configurada")
+def test_cells_grouped_in_sql_match_plot_rows():
+    """Prueba de integración: la base agrupa los lotes de una celda en las mismas celdas que el cálculo en Python"""
+    admin = create_engine(TEST_DATABASE_URL)
+    with admin.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {TEST_SCHEMA}"))
+    engine = create_engine(TEST_DATABASE_URL, connect_args={"options": f"-csearch_path={TEST_SCHEMA}"})
+    try:
+        Base.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(text("INSERT INTO farm_states VALUES (1, 'Activo')"))
+            connection.execute(text("INSERT INTO plot_states VALUES (1, 'Activo'), (2, 'Inactivo')"))
+            connection.execute(text("INSERT INTO area_units VALUES (1, 'Hectárea', 'ha')"))
+            connection.execute(text("INSERT INTO coffee_varieties VALUES (1, 'Castillo'), (2, 'Caturra')"))
+            connection.execute(text(
+                "INSERT INTO farms (farm_id, name, area, area_unit_id, farm_state_id) "
+                "VALUES (1, 'Finca 1', 10, 1, 1), (2, 'Finca 2', 5, 1, 1)"
+            ))
+
+        rng = random.Random(5)
+        min_lat, min_lon, max_lat, max_lon = tile_bounds("d2g6")
+        rows = [
+            (rng.choice([1, 2]), rng.choice([1, 2]), round(Decimal(rng.uniform(min_lat, max_lat)), 8), round(Decimal(rng.uniform(min_lon, max_lon)), 8))
+            for _ in range(300)
+        ]
+        with sessionmaker(bind=engine)() as db:
+            for index, (farm_id, variety_id, latitude, longitude) in enumerate(rows):
+                db.add(Plots(
+                    name=f"Lote {index}", farm_id=farm_id, coffee_variety_id=variety_id,
+                    latitude=latitude, longitude=longitude, plot_state_id=1
+                ))
+            db.add(Plots(name="Inactivo", farm_id=1, coffee_variety_id=1, latitude=rows[0][2], longitude=rows[0][3], plot_state_id=2))
+            db.commit()
+
+            cell_rows = _tile_cells_loader(db, 1, 5)("d2g6")
+
+        assert len(cell_rows) < len(rows)
+        assert merge_clusters([TileClusters.from_cell_rows(cell_rows, 5, "d2g6")], [1, 2], 5) == \
+            merge_clusters([TileClusters.from_rows(rows, 5, "d2g6")], [1, 2], 5)
+    finally:
+        engine.dispose()
+        with admin.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE"))
+        admin.dispose()
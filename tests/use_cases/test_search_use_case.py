@@ -0,0 +1,126 @@
+"""
+Pruebas unitarias para search_use_case.py
+"""
+import json
+from unittest.mock import Mock, patch
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+import use_cases.search_use_case as search_use_case
+from use_cases.search_use_case import search_farms_and_plots
+
+
+def _sql(clause):
+    return str(clause.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+class TestSearchUseCase:
+    """Clase de pruebas para la búsqueda de fincas y lotes por nombre"""
+
+    def setup_method(self):
+        """Configuración inicial para cada prueba"""
+        self.db_mock = Mock(spec=Session)
+        self.user_mock = Mock()
+        self.user_mock.user_id = 1
+        self.state = Mock(farm_state_id=1, user_role_farm_state_id=1, plot_state_id=1)
+
+        self.farms_query = Mock()
+        self.plots_query = Mock()
+        self.db_mock.query.side_effect = [self.farms_query, self.plots_query]
+        self.farms_query.filter.return_value.all.return_value = [(1, "Finca El Páramo"), (2, "La Esperanza")]
+        self.plots_query.filter.return_value.all.return_value = [
+            (1, 10, "Páramo alto"), (1, 11, "PARAMO"), (2, 20, "Lote nuevo")
+        ]
+
+        patch('use_cases.search_use_case.get_state', return_value=self.state).start()
+        patch('use_cases.search_use_case.NAME_SEARCH_BACKEND', "python").start()
+        self.mock_members = patch('use_cases.search_use_case.get_member_farm_ids', return_value=[1, 2]).start()
+        self.mock_readable = patch('use_cases.search_use_case.get_readable_farm_ids', return_value=[1, 2]).start()
+
+    def teardown_method(self):
+        patch.stopall()
+
+    def _search(self, query, **kwargs):
+        response = search_farms_and_plots(query, self.user_mock, self.db_mock, **kwargs)
+        return response, json.loads(response.body)
+
+    def test_memory_search_ignores_case_and_accents(self):
+        """Prueba que se encuentran fincas y lotes sin distinguir mayúsculas ni tildes, ordenados por similitud"""
+        _, body = self._search("páramo")
+        results = body["data"]["results"]
+
+        assert [(r["type"], r["farm_id"], r["plot_id"]) for r in results] == [
+            ("plot", 1, 11), ("plot", 1, 10), ("farm", 1, None)
+        ]
+        assert results[0]["similarity"] == 1.0
+        assert body["data"]["next_offset"] is None
+
+    def test_pagination(self):
+        """Prueba que `next_offset` apunta a la página siguiente y el offset la recorre"""
+        _, first = self._search("paramo", limit=2)
+        self.db_mock.query.side_effect = [self.farms_query, self.plots_query]
+        _, second = self._search("paramo", limit=2, offset=2)
+
+        assert len(first["data"]["results"]) == 2
+        assert first["data"]["next_offset"] == 2
+        assert [(r["type"], r["farm_id"]) for r in second["data"]["results"]] == [("farm", 1)]
+        assert second["data"]["next_offset"] is None
+
+    def test_plots_only_from_readable_farms(self):
+        """Prueba que los lotes se buscan solo en las fincas con permiso 'read_plots'"""
+        self.mock_readable.return_value = [2]
+
+        self._search("lote")
+
+        condition = _sql(self.plots_query.filter.call_args.args[0])
+        assert "plots.farm_id IN (2)" in condition
+
+    def test_short_query(self):
+        """Prueba que se rechazan búsquedas de menos de tres caracteres"""
+        response, body = self._search(" Pá ")
+
+        assert response.status_code == 400
+        assert "3 caracteres" in body["message"]
+        self.db_mock.query.assert_not_called()
+
+    def test_user_without_farms(self):
+        """Prueba que un usuario sin fincas obtiene una lista vacía sin consultar nombres"""
+        self.mock_members.return_value = []
+
+        _, body = self._search("paramo")
+
+        assert body["data"] == {"results": [], "next_offset": None}
+        self.db_mock.query.assert_not_called()
+        self.mock_readable.assert_not_called()
+
+    @patch('use_cases.search_use_case.NAME_SEARCH_BACKEND', "postgres")
+    def test_trigram_search_query(self):
+        """Prueba que con Postgres se filtra con LIKE sobre la expresión de los índices y se ordena por similitud"""
+        row = Mock(type="plot", farm_id=1, plot_id=11, similarity=1.0)
+        row.name = "PARAMO"
+        self.db_mock.execute.return_value.all.return_value = [row]
+
+        _, body = self._search("100%_páramo", limit=5, offset=10)
+        sql = _sql(self.db_mock.execute.call_args.args[0])
+
+        assert body["data"]["results"] == [
+            {"type": "plot", "farm_id": 1, "plot_id": 11, "name": "PARAMO", "similarity": 1.0}
+        ]
+        assert "lower(immutable_unaccent(farms.name)) LIKE" in sql
+        assert "lower(immutable_unaccent(plots.name)) LIKE" in sql
+        assert r"LIKE (('%%' || lower(immutable_unaccent('100\\%%\\_páramo'))) || '%%') ESCAPE '\\'" in sql
+        assert "UNION ALL" in sql
+        assert "similarity(lower(immutable_unaccent(plots.name))" in sql
+        assert "LIMIT 6 OFFSET 10" in sql
+        self.db_mock.query.assert_not_called()
+
+    @patch('use_cases.search_use_case.NAME_SEARCH_BACKEND', "auto")
+    @patch('use_cases.search_use_case._trigram_search_available', None)
+    def test_backend_detected_once(self):
+        """Prueba que en modo 'auto' la disponibilidad de los índices se consulta una sola vez"""
+        self.db_mock.execute.return_value.scalar.return_value = False
+
+        assert search_use_case._use_trigram_search(self.db_mock) is False
+        assert search_use_case._use_trigram_search(self.db_mock) is False
+        self.db_mock.execute.assert_called_once()
@@ -0,0 +1,122 @@
+"""
+Pruebas unitarias para viewport_plots_use_case.py
+"""
+import json
+from decimal import Decimal
+from unittest.mock import Mock, patch
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from use_cases.viewport_plots_use_case import _longitude_filter, get_readable_farm_ids, list_plots_in_viewport
+
+
+def _row(plot_id, farm_id=1):
+    row = Mock(plot_id=plot_id, farm_id=farm_id, coffee_variety_id=1,
+               latitude=Decimal("4.5"), longitude=Decimal("-75.5"), altitude=Decimal("1500"))
+    row.name = f"Lote {plot_id}"
+    return row
+
+
+def _sql(clause):
+    return str(clause.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+class TestViewportPlotsUseCase:
+    """Clase de pruebas para la búsqueda de lotes por rectángulo del mapa"""
+
+    def setup_method(self):
+        """Configuración inicial para cada prueba"""
+        self.db_mock = Mock(spec=Session)
+        self.user_mock = Mock()
+        self.user_mock.user_id = 1
+        self.state = Mock(farm_state_id=1, user_role_farm_state_id=1, plot_state_id=1)
+
+        self.plots_query = Mock()
+        self.db_mock.query.return_value = self.plots_query
+
+        patcher_state = patch('use_cases.viewport_plots_use_case.get_state', return_value=self.state)
+        patcher_farms = patch('use_cases.viewport_plots_use_case.get_readable_farm_ids', return_value=[1, 2])
+        patcher_state.start()
+        self.mock_farms = patcher_farms.start()
+
+    def teardown_method(self):
+        patch.stopall()
+
+    def _rows(self, rows):
+        self.plots_query.filter.return_value.order_by.return_value.limit.return_value.all.return_value = rows
+
+    def test_first_page_with_next_cursor(self):
+        """Prueba que se retorna como máximo `limit` lotes y el cursor de la página siguiente"""
+        self._rows([_row(1), _row(2), _row(3)])
+
+        response = list_plots_in_viewport(4, -76, 5, -75, self.user_mock, self.db_mock, limit=2)
+        data = json.loads(response.body)["data"]
+
+        assert [plot["plot_id"] for plot in data["plots"]] == [1, 2]
+        assert data["next_cursor"] == 2
+        self.plots_query.filter.return_value.order_by.return_value.limit.assert_called_once_with(3)
+
+    def test_last_page(self):
+        """Prueba que en la última página el cursor es None y se filtra por el cursor recibido"""
+        self._rows([_row(5)])
+
+        response = list_plots_in_viewport(4, -76, 5, -75, self.user_mock, self.db_mock, limit=2, cursor=4)
+        data = json.loads(response.body)["data"]
+
+        assert data["next_cursor"] is None
+        condition = _sql(self.plots_query.filter.call_args.args[0])
+        assert "plots.plot_id > 4" in condition
+        assert "plots.farm_id IN (1, 2)" in condition
+
+    def test_user_without_readable_farms(self):
+        """Prueba que sin fincas visibles no se consulta ningún lote"""
+        self.mock_farms.return_value = []
+
+        data = json.loads(list_plots_in_viewport(4, -76, 5, -75, self.user_mock, self.db_mock).body)["data"]
+
+        assert data == {"plots": [], "next_cursor": None}
+        self.db_mock.query.assert_not_called()
+
+    def test_invalid_latitude_range(self):
+        """Prueba que una latitud mínima mayor que la máxima es un error"""
+        response = list_plots_in_viewport(5, -76, 4, -75, self.user_mock, self.db_mock)
+
+        assert response.status_code == 400
+
+    def test_user_service_error(self):
+        """Prueba el error al resolver las fincas del usuario"""
+        self.mock_farms.side_effect = Exception("timeout")
+
+        response = list_plots_in_viewport(4, -76, 5, -75, self.user_mock, self.db_mock)
+
+        assert response.status_code == 500
+
+    def test_longitude_filter(self):
+        """Prueba el filtro normal y el de un rectángulo que cruza el antimeridiano"""
+        assert _sql(_longitude_filter(-76, -75)) == "plots.longitude BETWEEN -76 AND -75"
+        assert _sql(_longitude_filter(170, -170)) == "plots.longitude >= 170 OR plots.longitude <= -170"
+
+
+class TestGetReadableFarmIds:
+    """Pruebas de la resolución de fincas visibles"""
+
+    @patch('use_cases.viewport_plots_use_case.get_role_permissions_for_user_role')
+    @patch('use_cases.viewport_plots_use_case.get_user_role_ids', return_value=[7, 8])
+    def test_permissions_are_checked_once_per_role(self, mock_role_ids, mock_permissions):
+        db = Mock(spec=Session)
+        db.query.return_value.join.return_value.filter.return_value.all.return_value = [(7, 1), (7, 2), (8, 3)]
+        mock_permissions.side_effect = lambda user_role_id: ["read_plots"] if user_role_id == 7 else []
+        state = Mock(farm_state_id=1, user_role_farm_state_id=1)
+
+        farm_ids = get_readable_farm_ids(Mock(user_id=1), db, state, state)
+
+        assert farm_ids == [1, 2]
+        assert mock_permissions.call_count == 2
+
+    @patch('use_cases.viewport_plots_use_case.get_user_role_ids', return_value=[])
+    def test_user_without_roles(self, mock_role_ids):
+        db = Mock(spec=Session)
+
+        assert get_readable_farm_ids(Mock(user_id=1), db, Mock(), Mock()) == []
+        db.query.assert_not_called()
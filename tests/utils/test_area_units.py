@@ -0,0 +1,67 @@
+"""
+Pruebas unitarias para utils/area_units.py
+"""
+import math
+from decimal import Decimal
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+from utils.area_units import known_hectares_per_unit, load_hectare_factors, to_hectares
+
+
+class TestKnownHectaresPerUnit:
+    """Pruebas de la tabla de equivalencias conocidas"""
+
+    @pytest.mark.parametrize("name, abbreviation, expected", [
+        ("Hectárea", "ha", 1.0),
+        ("Hectáreas", "Ha.", 1.0),
+        ("Metros cuadrados", "m²", 0.0001),
+        ("Kilómetro cuadrado", "km2", 100.0),
+        ("Acre", "ac", 0.40468564224),
+        ("Fanegada", "fan", 0.64),
+        ("Cuadras", "cd", 0.64),
+    ])
+    def test_known_units(self, name, abbreviation, expected):
+        assert known_hectares_per_unit(name, abbreviation) == expected
+
+    def test_unknown_unit(self):
+        assert known_hectares_per_unit("Vara", "v") is None
+
+
+class TestToHectares:
+    """Pruebas de la conversión vectorizada"""
+
+    def test_converts_each_row_with_its_unit(self):
+        result = to_hectares([2, Decimal("15000"), 3, 1], [1, 2, 9, 3], {1: 1.0, 2: 0.0001, 3: 0.64})
+
+        np.testing.assert_allclose(result[[0, 1, 3]], [2.0, 1.5, 0.64])
+        assert math.isnan(result[2])
+
+    def test_matches_row_by_row_conversion(self):
+        rng = np.random.default_rng(5)
+        factors = {1: 1.0, 4: 0.0001, 7: 100.0, 8: 0.64}
+        unit_ids = rng.choice([1, 4, 7, 8], size=1000)
+        areas = rng.uniform(1, 500, size=1000)
+
+        expected = [area * factors[int(unit_id)] for area, unit_id in zip(areas, unit_ids)]
+        np.testing.assert_allclose(to_hectares(areas, unit_ids, factors), expected)
+
+    def test_empty_inputs(self):
+        assert len(to_hectares([], [], {1: 1.0})) == 0
+        assert math.isnan(to_hectares([5], [1], {})[0])
+
+
+class TestLoadHectareFactors:
+    """Pruebas de la lectura de factores desde la tabla de unidades"""
+
+    def test_column_value_or_known_unit(self):
+        db = Mock()
+        db.query.return_value.all.return_value = [
+            (1, "Hectárea", "ha", None),
+            (2, "Tarea", "ta", Decimal("0.0625")),
+            (3, "Vara", "v", None),
+        ]
+
+        assert load_hectare_factors(db) == {1: 1.0, 2: 0.0625}
@@ -0,0 +1,101 @@
+"""
+Pruebas unitarias para utils/compression.py
+"""
+import gzip
+import brotli
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse, Response
+from fastapi.testclient import TestClient
+
+from utils.compression import CompressionMiddleware, select_encoding
+from utils.response import create_response
+
+
+def _build_app(minimum_size=500):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=minimum_size, gzip_level=6, brotli_quality=4)
+
+    @app.get("/large")
+    def large():
+        return create_response("success", "ok", {"plots": [{"plot_id": i, "name": f"Lote {i}"} for i in range(200)]})
+
+    @app.get("/small")
+    def small():
+        return create_response("success", "ok")
+
+    @app.get("/stream")
+    def stream():
+        def lines():
+            for i in range(100):
+                yield f'{{"plot_id": {i}, "name": "Lote {i}"}}\n'.encode()
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    @app.get("/encoded")
+    def encoded():
+        return Response(gzip.compress(b"x" * 2000), headers={"Content-Encoding": "gzip"})
+
+    return app
+
+
+class TestSelectEncoding:
+    """Pruebas para la negociación de Accept-Encoding"""
+
+    def test_prefers_brotli_on_tie(self):
+        assert select_encoding("gzip, deflate, br") == "br"
+
+    def test_respects_quality_values(self):
+        assert select_encoding("br;q=0.5, gzip;q=1.0") == "gzip"
+
+    def test_q_zero_excludes_encoding(self):
+        assert select_encoding("br;q=0, gzip") == "gzip"
+
+    def test_wildcard(self):
+        assert select_encoding("*") == "br"
+
+    def test_identity_only(self):
+        assert select_encoding("identity") is None
+        assert select_encoding("") is None
+
+
+class TestCompressionMiddleware:
+    """Pruebas para el middleware de compresión"""
+
+    def setup_method(self):
+        self.client = TestClient(_build_app())
+
+    def test_large_response_is_gzipped(self):
+        response = self.client.get("/large", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert response.json()["status"] == "success"
+        assert len(response.json()["data"]["plots"]) == 200
+
+    def test_large_response_is_brotli_compressed(self):
+        with self.client.stream("GET", "/large", headers={"Accept-Encoding": "br"}) as response:
+            raw = b"".join(response.iter_raw())
+        assert response.headers["content-encoding"] == "br"
+        assert int(response.headers["content-length"]) == len(raw)
+        assert b'"plot_id":199' in brotli.decompress(raw)
+
+    def test_small_response_is_not_compressed(self):
+        response = self.client.get("/small", headers={"Accept-Encoding": "gzip, br"})
+        assert "content-encoding" not in response.headers
+        assert response.json()["status"] == "success"
+
+    def test_no_accept_encoding_is_not_compressed(self):
+        response = self.client.get("/large", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+
+    def test_streaming_response_is_compressed(self):
+        with self.client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+            raw = b"".join(response.iter_raw())
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        lines = gzip.decompress(raw).decode().splitlines()
+        assert len(lines) == 100
+
+    def test_already_encoded_response_is_untouched(self):
+        with self.client.stream("GET", "/encoded", headers={"Accept-Encoding": "br"}) as response:
+            raw = b"".join(response.iter_raw())
+        assert response.headers["content-encoding"] == "gzip"
+        assert gzip.decompress(raw) == b"x" * 2000
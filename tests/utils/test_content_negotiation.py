@@ -0,0 +1,83 @@
+"""
+Pruebas unitarias para utils/content_negotiation.py y la serialización MessagePack de utils/response.py
+"""
+from decimal import Decimal
+
+import msgpack
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from domain.schemas import FarmDetailResponse
+from utils.content_negotiation import ContentNegotiationMiddleware, select_media_type
+from utils.response import NegotiatedResponse, create_response
+
+
+def _build_app():
+    app = FastAPI(default_response_class=NegotiatedResponse)
+    app.add_middleware(ContentNegotiationMiddleware)
+
+    @app.get("/envelope")
+    def envelope():
+        return create_response("success", "Lista de lotes obtenida exitosamente", {
+            "plots": [{"plot_id": 1, "altitude": Decimal("1500.50")}]
+        })
+
+    @app.get("/model", response_model=FarmDetailResponse)
+    def model():
+        return FarmDetailResponse(
+            farm_id=1, name="Finca", area=10.5, area_unit_id=1,
+            area_unit="Hectárea", farm_state_id=1, farm_state="Activo"
+        )
+
+    return app
+
+
+class TestSelectMediaType:
+    """Pruebas para la negociación del encabezado Accept"""
+
+    def test_msgpack_requested(self):
+        assert select_media_type("application/msgpack") == "application/msgpack"
+
+    def test_legacy_msgpack_media_type(self):
+        assert select_media_type("application/x-msgpack") == "application/msgpack"
+
+    def test_json_preferred_by_quality(self):
+        assert select_media_type("application/msgpack;q=0.5, application/json") == "application/json"
+
+    def test_msgpack_preferred_over_wildcard(self):
+        assert select_media_type("application/msgpack, */*;q=0.8") == "application/msgpack"
+
+    def test_default_is_json(self):
+        assert select_media_type("") == "application/json"
+        assert select_media_type("*/*") == "application/json"
+
+
+class TestNegotiatedResponses:
+    """Pruebas de extremo a extremo de la negociación de contenido"""
+
+    def setup_method(self):
+        self.client = TestClient(_build_app())
+
+    def test_create_response_defaults_to_json(self):
+        response = self.client.get("/envelope")
+        assert response.headers["content-type"] == "application/json"
+        assert response.json()["data"]["plots"][0]["altitude"] == 1500.5
+
+    def test_create_response_serves_msgpack(self):
+        response = self.client.get("/envelope", headers={"Accept": "application/msgpack"})
+        assert response.headers["content-type"] == "application/msgpack"
+        assert "Accept" in response.headers["vary"]
+        payload = msgpack.unpackb(response.content, raw=False)
+        assert payload["status"] == "success"
+        assert payload["message"] == "Lista de lotes obtenida exitosamente"
+        assert payload["data"]["plots"][0] == {"plot_id": 1, "altitude": 1500.5}
+
+    def test_response_model_serves_msgpack(self):
+        response = self.client.get("/model", headers={"Accept": "application/msgpack"})
+        assert response.headers["content-type"] == "application/msgpack"
+        assert msgpack.unpackb(response.content, raw=False)["area_unit"] == "Hectárea"
+
+    def test_create_response_outside_request_is_json(self):
+        response = create_response("error", "Finca no encontrada", status_code=404)
+        assert response.media_type == "application/json"
+        assert response.status_code == 404
@@ -0,0 +1,44 @@
+"""
+Pruebas unitarias para utils/deadline.py
+"""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from utils.deadline import DeadlineMiddleware, get_remaining_time
+
+
+def _build_app():
+    app = FastAPI()
+    app.add_middleware(DeadlineMiddleware, deadline_seconds=5)
+
+    @app.get("/remaining")
+    def remaining():
+        return {"remaining": get_remaining_time()}
+
+    return app
+
+
+class TestDeadlineMiddleware:
+    """Pruebas del plazo por petición"""
+
+    def setup_method(self):
+        self.client = TestClient(_build_app())
+
+    def test_default_deadline_reaches_sync_endpoints(self):
+        remaining = self.client.get("/remaining").json()["remaining"]
+        assert 4 < remaining <= 5
+
+    def test_client_can_request_shorter_deadline(self):
+        remaining = self.client.get("/remaining", headers={"X-Request-Timeout": "1.5"}).json()["remaining"]
+        assert 1 < remaining <= 1.5
+
+    def test_client_cannot_extend_deadline(self):
+        remaining = self.client.get("/remaining", headers={"X-Request-Timeout": "60"}).json()["remaining"]
+        assert remaining <= 5
+
+    def test_invalid_header_is_ignored(self):
+        remaining = self.client.get("/remaining", headers={"X-Request-Timeout": "abc"}).json()["remaining"]
+        assert 4 < remaining <= 5
+
+    def test_no_deadline_outside_requests(self):
+        assert get_remaining_time() is None
@@ -0,0 +1,155 @@
+"""
+Pruebas de integración para utils/farm_summary.py.
+
+Se ejecutan solo si TEST_DATABASE_URL apunta a un Postgres local. Usan un
+esquema propio que se elimina al terminar.
+"""
+import os
+import threading
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from models.models import Base, FarmSummary, Plots
+from utils.farm_summary import delete_farm_summary, rebuild_farm_summaries, refresh_farm_summary
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+TEST_SCHEMA = "farm_summary_test"
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL no está configurada")
+
+
+@pytest.fixture(scope="module")
+def engine():
+    admin = create_engine(TEST_DATABASE_URL)
+    with admin.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {TEST_SCHEMA}"))
+    admin.dispose()
+    engine = create_engine(TEST_DATABASE_URL, connect_args={"options": f"-csearch_path={TEST_SCHEMA}"})
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+    admin = create_engine(TEST_DATABASE_URL)
+    with admin.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE"))
+    admin.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    with engine.begin() as connection:
+        connection.execute(text(
+            "TRUNCATE farm_summary, plots, user_role_farm, farms, coffee_varieties, area_units, "
+            "plot_states, farm_states, user_role_farm_states CASCADE"
+        ))
+        connection.execute(text("INSERT INTO farm_states VALUES (1, 'Activo'), (2, 'Inactivo')"))
+        connection.execute(text("INSERT INTO plot_states VALUES (1, 'Activo'), (2, 'Inactivo')"))
+        connection.execute(text("INSERT INTO area_units VALUES (1, 'Hectárea', 'ha')"))
+        connection.execute(text("INSERT INTO coffee_varieties VALUES (1, 'Castillo'), (2, 'Caturra')"))
+        connection.execute(text(
+            "INSERT INTO farms (farm_id, name, area, area_unit_id, farm_state_id) "
+            "VALUES (1, 'Finca 1', 10, 1, 1), (2, 'Finca 2', 5, 1, 1), (3, 'Finca 3', 5, 1, 2)"
+        ))
+    return sessionmaker(bind=engine)
+
+
+def _add_plot(db, farm_id, name, variety_id, altitude, state_id=1):
+    plot = Plots(name=name, farm_id=farm_id, coffee_variety_id=variety_id, altitude=altitude, plot_state_id=state_id)
+    db.add(plot)
+    return plot
+
+
+def test_refresh_computes_counts_and_altitudes(session_factory):
+    with session_factory() as db:
+        _add_plot(db, 1, "A", 1, 1200)
+        _add_plot(db, 1, "B", 1, 1800)
+        _add_plot(db, 1, "C", 2, None)
+        _add_plot(db, 1, "D", 2, 1500, state_id=2)
+        refresh_farm_summary(db, 1, 1)
+        db.commit()
+
+        summary = db.get(FarmSummary, 1)
+        assert summary.active_plot_count == 3
+        assert summary.variety_counts == {"1": 2, "2": 1}
+        assert (summary.min_altitude, summary.max_altitude, summary.avg_altitude) == (Decimal("1200"), Decimal("1800"), Decimal("1500"))
+
+
+def test_refresh_after_last_plot_is_removed(session_factory):
+    with session_factory() as db:
+        plot = _add_plot(db, 1, "A", 1, 1200)
+        refresh_farm_summary(db, 1, 1)
+        db.commit()
+
+        plot.plot_state_id = 2
+        refresh_farm_summary(db, 1, 1)
+        db.commit()
+
+        summary = db.get(FarmSummary, 1)
+        db.refresh(summary)
+        assert summary.active_plot_count == 0
+        assert summary.variety_counts == {}
+        assert summary.min_altitude is None
+
+
+def test_rollback_discards_summary(session_factory):
+    with session_factory() as db:
+        _add_plot(db, 1, "A", 1, 1200)
+        refresh_farm_summary(db, 1, 1)
+        db.rollback()
+
+        assert db.get(FarmSummary, 1) is None
+
+
+def test_rebuild_and_delete(session_factory):
+    with session_factory() as db:
+        _add_plot(db, 1, "A", 1, 1200)
+        _add_plot(db, 3, "B", 1, 1200)
+        db.commit()
+        db.add(FarmSummary(farm_id=3, active_plot_count=99, variety_counts={}))
+        db.commit()
+
+        assert rebuild_farm_summaries(db) == 2
+
+        db.expire_all()
+        assert db.get(FarmSummary, 1).active_plot_count == 1
+        assert db.get(FarmSummary, 2).active_plot_count == 0
+        # Las fincas inactivas no tienen resumen
+        assert db.get(FarmSummary, 3) is None
+
+        delete_farm_summary(db, 1)
+        db.commit()
+        assert db.get(FarmSummary, 1) is None
+
+
+def test_concurrent_refreshes_do_not_lose_updates(session_factory):
+    """Dos transacciones que agregan lotes a la misma finca a la vez terminan con el resumen correcto"""
+    first_locked = threading.Event()
+    errors = []
+
+    def add_plot(name, wait_for_other):
+        try:
+            with session_factory() as db:
+                _add_plot(db, 1, name, 1, 1000)
+                refresh_farm_summary(db, 1, 1)
+                if wait_for_other:
+                    first_locked.set()
+                    # Mantiene la transacción abierta para que la otra tenga que esperar el bloqueo
+                    threading.Event().wait(0.3)
+                db.commit()
+        except Exception as e:
+            errors.append(e)
+
+    first = threading.Thread(target=add_plot, args=("A", True))
+    first.start()
+    assert first_locked.wait(5)
+    second = threading.Thread(target=add_plot, args=("B", False))
+    second.start()
+    first.join(5)
+    second.join(5)
+
+    assert errors == []
+    with session_factory() as db:
+        assert db.get(FarmSummary, 1).active_plot_count == 2
@@ -0,0 +1,252 @@
+"""
+Pruebas unitarias para utils/idempotency.py
+"""
+import os
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock
+
+import orjson
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session, sessionmaker
+
+import utils.idempotency as idempotency
+from models.models import IdempotencyKeys
+from utils.content_negotiation import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, _response_media_type
+from utils.idempotency import (
+    IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS,
+    IDEMPOTENCY_PURGE_BATCH_SIZE,
+    _sha256,
+    purge_expired_keys,
+    run_idempotent,
+)
+from utils.response import create_response
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+TEST_SCHEMA = "idempotency_test"
+
+
+def _request_hash(fingerprint, media_type=JSON_MEDIA_TYPE):
+    return _sha256(f"{media_type}\n{fingerprint}")
+
+
+@pytest.fixture(autouse=True)
+def no_purge(monkeypatch):
+    """Las pruebas que no tratan de la purga no la ejecutan"""
+    monkeypatch.setattr(idempotency, "_next_purge_at", float("inf"))
+
+
+class TestRunIdempotent:
+    """Pruebas para la ejecución protegida por Idempotency-Key"""
+
+    def setup_method(self):
+        """Configuración inicial para cada prueba"""
+        self.db_mock = Mock(spec=Session)
+        self.claim_result = self.db_mock.execute.return_value.scalar_one_or_none
+        self.claim_result.return_value = 7
+        self.record_lookup = self.db_mock.query.return_value.filter.return_value.first
+        self.operation = Mock(return_value=create_response("success", "Finca creada", {"farm_id": 1}))
+
+    def _run(self, key="clave-1", fingerprint='{"name":"Finca"}'):
+        return run_idempotent(self.db_mock, key, "token", "create-farm", fingerprint, self.operation)
+
+    def _record(self, status_code=200, request_hash=None, expires_in=60, claimed_ago=1):
+        record = Mock()
+        record.idempotency_key_id = 7
+        record.status_code = status_code
+        record.media_type = "application/json"
+        record.response_body = b'{"status":"success","message":"Finca creada","data":{"farm_id":1}}'
+        record.request_hash = request_hash or _request_hash('{"name":"Finca"}')
+        record.expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
+        record.created_at = datetime.now(timezone.utc) - timedelta(seconds=claimed_ago)
+        return record
+
+    def test_without_key_runs_operation(self):
+        result = self._run(key=None)
+
+        assert result is self.operation.return_value
+        self.db_mock.execute.assert_not_called()
+
+    def test_first_request_stores_response(self):
+        result = self._run()
+
+        assert result is self.operation.return_value
+        # INSERT de la reserva + UPDATE con la respuesta
+        assert self.db_mock.execute.call_count == 2
+        stored = self.db_mock.execute.call_args.args[0].compile().params
+        assert stored["status_code"] == 200
+        assert orjson.loads(stored["response_body"])["data"] == {"farm_id": 1}
+
+    def test_retry_replays_stored_response(self):
+        self.claim_result.return_value = None
+        self.record_lookup.return_value = self._record()
+
+        result = self._run()
+
+        self.operation.assert_not_called()
+        assert result.status_code == 200
+        assert result.headers["Idempotent-Replayed"] == "true"
+        assert orjson.loads(result.body)["data"] == {"farm_id": 1}
+
+    def test_retry_while_in_progress(self):
+        self.claim_result.return_value = None
+        self.record_lookup.return_value = self._record(status_code=None)
+
+        result = self._run()
+
+        self.operation.assert_not_called()
+        assert result.status_code == 409
+
+    def test_abandoned_claim_is_reclaimed(self):
+        self.claim_result.side_effect = [None, 8]
+        self.record_lookup.return_value = self._record(status_code=None, claimed_ago=IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS + 1)
+
+        result = self._run()
+
+        self.operation.assert_called_once()
+        assert result is self.operation.return_value
+        deletes = [call for call in self.db_mock.execute.call_args_list if "DELETE" in str(call.args[0])]
+        assert len(deletes) == 1
+
+    def test_in_progress_key_with_different_request(self):
+        self.claim_result.return_value = None
+        self.record_lookup.return_value = self._record(status_code=None, request_hash=_request_hash("otro"))
+
+        result = self._run()
+
+        self.operation.assert_not_called()
+        assert result.status_code == 422
+
+    def test_key_reused_with_different_request(self):
+        self.claim_result.return_value = None
+        self.record_lookup.return_value = self._record(request_hash=_request_hash("otro"))
+
+        result = self._run()
+
+        self.operation.assert_not_called()
+        assert result.status_code == 422
+
+    def test_retry_with_different_accept(self):
+        """Prueba que un reintento que pide otro formato no recibe la respuesta guardada en el formato del primero"""
+        self.claim_result.return_value = None
+        self.record_lookup.return_value = self._record()
+        token = _response_media_type.set(MSGPACK_MEDIA_TYPE)
+        try:
+            result = self._run()
+        finally:
+            _response_media_type.reset(token)
+
+        self.operation.assert_not_called()
+        assert result.status_code == 422
+
+    def test_expired_key_runs_operation_again(self):
+        self.claim_result.side_effect = [None, 8]
+        self.record_lookup.return_value = self._record(expires_in=-1)
+
+        result = self._run()
+
+        self.operation.assert_called_once()
+        assert result is self.operation.return_value
+
+    def test_server_error_is_not_stored(self):
+        self.operation.return_value = create_response("error", "Error al comunicarse con el servicio de usuarios", status_code=500)
+
+        self._run()
+
+        # INSERT de la reserva + DELETE para liberarla
+        assert self.db_mock.execute.call_count == 2
+        assert "DELETE" in str(self.db_mock.execute.call_args.args[0])
+
+    def test_exception_releases_key(self):
+        self.operation.side_effect = RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            self._run()
+
+        assert "DELETE" in str(self.db_mock.execute.call_args.args[0])
+        self.db_mock.rollback.assert_called()
+
+    def test_key_too_long(self):
+        result = self._run(key="x" * 256)
+
+        assert result.status_code == 400
+        self.operation.assert_not_called()
+
+
+class TestPurgeExpiredKeys:
+    """Pruebas de la purga periódica de claves expiradas"""
+
+    def setup_method(self):
+        self.db_mock = Mock(spec=Session)
+        self.db_mock.execute.return_value.scalar_one_or_none.return_value = 7
+        self.db_mock.execute.return_value.rowcount = 3
+        self.operation = Mock(return_value=create_response("success", "Finca creada", {"farm_id": 1}))
+
+    def _run(self, key="clave-1"):
+        return run_idempotent(self.db_mock, key, "token", "create-farm", '{"name":"Finca"}', self.operation)
+
+    def _purges(self):
+        return [
+            call for call in self.db_mock.execute.call_args_list
+            if "DELETE" in str(call.args[0]) and "expires_at" in str(call.args[0])
+        ]
+
+    def test_claim_purges_once_per_interval(self, monkeypatch):
+        monkeypatch.setattr(idempotency, "_next_purge_at", 0.0)
+
+        self._run()
+        self._run(key="clave-2")
+
+        assert len(self._purges()) == 1
+        purge = str(self._purges()[0].args[0].compile(dialect=postgresql.dialect()))
+        assert "LIMIT" in purge and "FOR UPDATE SKIP LOCKED" in purge
+
+    def test_full_batch_purges_again_on_next_claim(self, monkeypatch):
+        monkeypatch.setattr(idempotency, "_next_purge_at", 0.0)
+        self.db_mock.execute.return_value.rowcount = IDEMPOTENCY_PURGE_BATCH_SIZE
+
+        self._run()
+        self._run(key="clave-2")
+
+        assert len(self._purges()) == 2
+
+    def test_purge_error_does_not_fail_the_request(self, monkeypatch):
+        monkeypatch.setattr(idempotency, "_next_purge_at", 0.0)
+        monkeypatch.setattr(idempotency, "purge_expired_keys", Mock(side_effect=RuntimeError("boom")))
+
+        result = self._run()
+
+        assert result is self.operation.return_value
+        self.operation.assert_called_once()
+        self.db_mock.rollback.assert_called()
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL no está configurada")
+def test_purge_deletes_only_expired_keys_in_batches():
+    """Prueba de integración: se eliminan las claves expiradas, de a un lote, y se conservan las vigentes"""
+    admin = create_engine(TEST_DATABASE_URL)
+    with admin.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {TEST_SCHEMA}"))
+    engine = create_engine(TEST_DATABASE_URL, connect_args={"options": f"-csearch_path={TEST_SCHEMA}"})
+    try:
+        IdempotencyKeys.__table__.create(bind=engine)
+        now = datetime.now(timezone.utc)
+        with sessionmaker(bind=engine)() as db:
+            for index in range(5):
+                expires_at = now - timedelta(seconds=1) if index < 3 else now + timedelta(hours=1)
+                db.add(IdempotencyKeys(
+                    key=f"clave-{index}", scope="s", endpoint="create-farm", request_hash="h", expires_at=expires_at
+                ))
+            db.commit()
+
+            assert purge_expired_keys(db, now, batch_size=2) == 2
+            assert purge_expired_keys(db, now, batch_size=2) == 1
+            assert purge_expired_keys(db, now, batch_size=2) == 0
+            assert sorted(key for key, in db.query(IdempotencyKeys.key)) == ["clave-3", "clave-4"]
+    finally:
+        engine.dispose()
+        with admin.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE"))
+        admin.dispose()
@@ -0,0 +1,311 @@
+"""
+Pruebas para utils/migrations.py.
+
+Las pruebas de integración (aplicación de las migraciones y planes EXPLAIN) se
+ejecutan solo si TEST_DATABASE_URL apunta a un Postgres local. Usan un esquema
+propio que se elimina al terminar.
+"""
+import os
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from models.models import Base, Plots, UserRoleFarm
+from utils.migrations import (
+    MIGRATIONS,
+    REDUNDANT_INDEXES,
+    Migration,
+    _drop_invalid_index,
+    _model_index,
+    create_index_concurrently,
+    create_model_index,
+    run_migrations,
+)
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+TEST_SCHEMA = "migrations_test"
+
+NEW_INDEXES = {
+    "ix_plots_farm_id_state_id",
+    "ix_user_role_farm_farm_state",
+    "ix_plots_latitude_longitude",
+    "ix_idempotency_keys_expires_at",
+    "ix_user_role_farm_active_role_farm",
+}
+# Índices de las restricciones únicas, que también cubren búsquedas
+UNIQUE_INDEXES = {"plots_name_farm_id_key", "user_role_farm_user_role_id_farm_id_key"}
+INDEX_SCAN_TYPES = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+
+def _index_scans(plan: dict):
+    """Retorna los pares (tipo de nodo, índice) de todos los nodos del plan que usan un índice."""
+    scans = []
+    if plan.get("Node Type") in INDEX_SCAN_TYPES:
+        scans.append((plan["Node Type"], plan["Index Name"]))
+    for child in plan.get("Plans", []):
+        scans.extend(_index_scans(child))
+    return scans
+
+
+class TestMigrationDefinitions:
+    """Pruebas de la lista de migraciones"""
+
+    def test_versions_are_unique_and_ordered(self):
+        versions = [migration.version for migration in MIGRATIONS]
+        assert versions == sorted(versions)
+        assert len(set(versions)) == len(versions)
+
+    def test_composite_indexes_are_declared_in_models(self):
+        plot_indexes = {index.name: [c.name for c in index.columns] for index in Plots.__table__.indexes}
+        urf_indexes = {index.name: [c.name for c in index.columns] for index in UserRoleFarm.__table__.indexes}
+
+        assert plot_indexes["ix_plots_farm_id_state_id"] == ["farm_id", "plot_state_id"]
+        assert urf_indexes == {
+            "ix_user_role_farm_farm_state": ["farm_id", "user_role_farm_state_id"],
+            "ix_user_role_farm_active_role_farm": ["user_role_id", "farm_id"],
+        }
+
+    def test_partial_model_index_keeps_its_predicate(self):
+        connection = MagicMock()
+        connection.execute.return_value.first.return_value = None
+
+        create_model_index(connection, _model_index(UserRoleFarm, "ix_user_role_farm_active_role_farm"))
+
+        assert str(connection.execute.call_args_list[-1].args[0]) == (
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_user_role_farm_active_role_farm" ON "user_role_farm" '
+            '("user_role_id", "farm_id") WHERE user_role_farm_state_id = 1'
+        )
+
+    def test_partial_model_index_with_resolved_predicate(self):
+        connection = MagicMock()
+        connection.execute.return_value.first.return_value = None
+
+        create_model_index(
+            connection, _model_index(UserRoleFarm, "ix_user_role_farm_active_role_farm"), where="user_role_farm_state_id = 3"
+        )
+
+        assert str(connection.execute.call_args_list[-1].args[0]).endswith("WHERE user_role_farm_state_id = 3")
+
+    def test_invalid_index_is_dropped_before_retry(self):
+        connection = MagicMock()
+        connection.execute.return_value.first.return_value = (1,)
+
+        _drop_invalid_index(connection, "ix_prueba")
+
+        assert "DROP INDEX CONCURRENTLY" in str(connection.execute.call_args_list[-1].args[0])
+
+    def test_valid_index_is_kept(self):
+        connection = MagicMock()
+        connection.execute.return_value.first.return_value = None
+
+        _drop_invalid_index(connection, "ix_prueba")
+
+        assert connection.execute.call_count == 1
+
+    def test_expression_index_with_method(self):
+        connection = MagicMock()
+        connection.execute.return_value.first.return_value = None
+
+        create_index_concurrently(
+            connection, "ix_plots_name_trgm", "plots", ["(lower(immutable_unaccent(name))) public.gin_trgm_ops"], using="gin"
+        )
+
+        assert str(connection.execute.call_args_list[-1].args[0]) == (
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_plots_name_trgm" ON "plots" USING gin '
+            "((lower(immutable_unaccent(name))) public.gin_trgm_ops)"
+        )
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL no está configurada")
+class TestMigrationsIntegration:
+    """Pruebas contra un Postgres local"""
+
+    @classmethod
+    def setup_class(cls):
+        admin = create_engine(TEST_DATABASE_URL)
+        with admin.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE"))
+            connection.execute(text(f"CREATE SCHEMA {TEST_SCHEMA}"))
+        admin.dispose()
+        cls.engine = create_engine(TEST_DATABASE_URL, connect_args={"options": f"-csearch_path={TEST_SCHEMA}"})
+
+        # Simula una base existente: tablas sin los índices nuevos
+        Base.metadata.create_all(cls.engine)
+        with cls.engine.begin() as connection:
+            for name in (
+                "ix_plots_farm_id_state_id", "ix_user_role_farm_farm_state", "ix_plots_latitude_longitude",
+                "ix_user_role_farm_active_role_farm"
+            ):
+                connection.execute(text(f"DROP INDEX {name}"))
+            # Índices redundantes que crearon versiones anteriores de las migraciones
+            connection.execute(text("CREATE INDEX ix_plots_farm_id_state_id_name ON plots (farm_id, plot_state_id, name)"))
+            connection.execute(text("CREATE INDEX ix_user_role_farm_active_farm_role ON user_role_farm (farm_id, user_role_id) WHERE user_role_farm_state_id = 1"))
+            connection.execute(text("DROP TABLE idempotency_keys"))
+            connection.execute(text("ALTER TABLE area_units DROP COLUMN hectares_per_unit"))
+            connection.execute(text("INSERT INTO farm_states VALUES (1, 'Activo'), (2, 'Inactivo')"))
+            connection.execute(text("INSERT INTO plot_states VALUES (1, 'Activo'), (2, 'Inactivo')"))
+            connection.execute(text("INSERT INTO user_role_farm_states VALUES (1, 'Activo'), (2, 'Inactivo')"))
+            connection.execute(text("INSERT INTO area_units VALUES (1, 'Hectárea', 'ha'), (2, 'Metros cuadrados', 'm²'), (3, 'Vara', 'v')"))
+            connection.execute(text("INSERT INTO coffee_varieties VALUES (1, 'Castillo')"))
+            connection.execute(text(
+                "INSERT INTO farms (farm_id, name, area, area_unit_id, farm_state_id) "
+                "SELECT g, 'Finca ' || g, 10, 1, 1 FROM generate_series(1, 500) g"
+            ))
+            connection.execute(text(
+                "INSERT INTO plots (name, farm_id, coffee_variety_id, plot_state_id, latitude, longitude) "
+                "SELECT 'Lote ' || p, f, 1, CASE WHEN p % 5 = 0 THEN 2 ELSE 1 END, "
+                "-89 + ((f * 60 + p) * 0.0059) % 178, -179 + ((f * 60 + p) * 7.3) % 358 "
+                "FROM generate_series(1, 500) f, generate_series(1, 60) p"
+            ))
+            connection.execute(text(
+                "INSERT INTO user_role_farm (user_role_id, farm_id, user_role_farm_state_id) "
+                "SELECT f * 100 + r, f, CASE WHEN r = 10 THEN 2 ELSE 1 END "
+                "FROM generate_series(1, 500) f, generate_series(1, 10) r"
+            ))
+        cls.applied = run_migrations(cls.engine)
+        with cls.engine.connect() as connection:
+            cls.name_search_indexes = connection.execute(
+                text("SELECT count(*) FROM pg_available_extensions WHERE name IN ('pg_trgm', 'unaccent')")
+            ).scalar() == 2
+        with cls.engine.connect() as connection:
+            connection.execute(text("ANALYZE"))
+            connection.commit()
+
+    @classmethod
+    def teardown_class(cls):
+        with cls.engine.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE"))
+        cls.engine.dispose()
+
+    def _explain(self, sql: str, **params):
+        with self.engine.connect() as connection:
+            plan = connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()
+        return _index_scans(plan[0]["Plan"])
+
+    def test_all_migrations_applied(self):
+        assert self.applied == [migration.version for migration in MIGRATIONS]
+        with self.engine.connect() as connection:
+            versions = connection.execute(text("SELECT version FROM schema_migrations ORDER BY version")).scalars().all()
+            indexes = connection.execute(text(
+                "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "JOIN pg_namespace n ON n.oid = c.relnamespace WHERE n.nspname = :schema AND i.indisvalid"
+            ), {"schema": TEST_SCHEMA}).scalars().all()
+            idempotency_table = connection.execute(text("SELECT to_regclass('idempotency_keys')")).scalar()
+
+        assert versions == [migration.version for migration in MIGRATIONS]
+        assert NEW_INDEXES <= set(indexes)
+        assert not set(REDUNDANT_INDEXES) & set(indexes)
+        assert idempotency_table is not None
+
+    def test_partial_index_is_built_for_active_rows(self):
+        with self.engine.connect() as connection:
+            definition = connection.execute(
+                text("SELECT indexdef FROM pg_indexes WHERE schemaname = :schema AND indexname = 'ix_user_role_farm_active_role_farm'"),
+                {"schema": TEST_SCHEMA}
+            ).scalar()
+
+        assert definition.endswith("(user_role_id, farm_id) WHERE (user_role_farm_state_id = 1)")
+
+    def test_area_units_get_hectare_factors(self):
+        """Prueba que las unidades conocidas reciben su equivalencia y las desconocidas quedan vacías"""
+        with self.engine.connect() as connection:
+            factors = dict(connection.execute(text("SELECT area_unit_id, hectares_per_unit FROM area_units")).all())
+
+        assert factors[1] == 1
+        assert float(factors[2]) == 0.0001
+        assert factors[3] is None
+
+    def test_rerun_applies_nothing(self):
+        assert run_migrations(self.engine) == []
+
+    def test_failed_migration_stops_and_is_retried(self):
+        calls = []
+
+        def failing(connection):
+            calls.append("9998")
+            raise RuntimeError("fallo")
+
+        migrations = MIGRATIONS + [Migration("9998", "Falla", failing), Migration("9999", "Siguiente", lambda c: calls.append("9999"))]
+
+        assert run_migrations(self.engine, migrations) == []
+        assert calls == ["9998"]
+
+    def test_active_plots_of_farm_use_index(self):
+        scans = self._explain("SELECT plot_id, name FROM plots WHERE farm_id = :farm_id AND plot_state_id = 1", farm_id=250)
+
+        assert scans and {name for _, name in scans} <= NEW_INDEXES
+
+    def test_plot_name_lookup_uses_index(self):
+        scans = self._explain(
+            "SELECT plot_id FROM plots WHERE farm_id = :farm_id AND name = :name AND plot_state_id = 1",
+            farm_id=250, name="Lote 7"
+        )
+
+        assert scans and {name for _, name in scans} <= NEW_INDEXES | UNIQUE_INDEXES
+
+    def test_user_role_farm_access_check_uses_index(self):
+        scans = self._explain(
+            "SELECT user_role_farm_id FROM user_role_farm "
+            "WHERE user_role_id IN (25001, 25002, 25003) AND farm_id = :farm_id AND user_role_farm_state_id = 1",
+            farm_id=250
+        )
+
+        assert scans and {name for _, name in scans} == {"ix_user_role_farm_active_role_farm"}
+
+    def test_farms_of_user_roles_use_partial_index(self):
+        scans = self._explain(
+            "SELECT farm_id FROM user_role_farm WHERE user_role_id IN (25001, 25002, 25003) AND user_role_farm_state_id = 1"
+        )
+
+        assert scans and {name for _, name in scans} == {"ix_user_role_farm_active_role_farm"}
+
+    def test_collaborators_of_farm_use_new_index(self):
+        scans = self._explain(
+            "SELECT user_role_id FROM user_role_farm WHERE farm_id = :farm_id AND user_role_farm_state_id = 1",
+            farm_id=250
+        )
+
+        assert scans and {name for _, name in scans} <= NEW_INDEXES
+
+    def test_viewport_search_uses_coordinates_index(self):
+        farm_ids = ", ".join(str(farm_id) for farm_id in range(1, 501))
+        scans = self._explain(
+            f"SELECT plot_id FROM plots WHERE farm_id IN ({farm_ids}) AND plot_state_id = 1 "
+            "AND latitude BETWEEN 4 AND 5 AND longitude BETWEEN -80 AND 80 ORDER BY plot_id LIMIT 201"
+        )
+
+        assert ("Bitmap Index Scan", "ix_plots_latitude_longitude") in scans or ("Index Scan", "ix_plots_latitude_longitude") in scans
+
+    def test_name_search_uses_trigram_index(self):
+        if not self.name_search_indexes:
+            pytest.skip("El servidor no tiene las extensiones pg_trgm y unaccent")
+        scans = self._explain(
+            "SELECT plot_id FROM plots WHERE lower(immutable_unaccent(name)) "
+            "LIKE '%' || lower(immutable_unaccent('LOTE 123')) || '%'"
+        )
+
+        assert ("Bitmap Index Scan", "ix_plots_name_trgm") in scans
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL no está configurada")
+def test_unseeded_database_applies_every_migration():
+    """Prueba que sin los estados 'Activo' se crea farm_summary sin calcularla y se aplican las migraciones siguientes"""
+    schema = f"{TEST_SCHEMA}_unseeded"
+    admin = create_engine(TEST_DATABASE_URL)
+    with admin.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {schema}"))
+    engine = create_engine(TEST_DATABASE_URL, connect_args={"options": f"-csearch_path={schema}"})
+    try:
+        tables = [table for name, table in Base.metadata.tables.items() if name != "farm_summary"]
+        Base.metadata.create_all(engine, tables=tables)
+
+        assert run_migrations(engine) == [migration.version for migration in MIGRATIONS]
+        with engine.connect() as connection:
+            assert connection.execute(text("SELECT count(*) FROM farm_summary")).scalar() == 0
+    finally:
+        engine.dispose()
+        with admin.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        admin.dispose()
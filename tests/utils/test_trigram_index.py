@@ -0,0 +1,69 @@
+"""
+Pruebas unitarias para utils/trigram_index.py
+"""
+import random
+
+import pytest
+
+from utils.trigram_index import TrigramIndex, name_trigrams, normalize_name, trigram_similarity
+
+
+class TestTrigramFunctions:
+    """Pruebas de la normalización y de la similitud de trigramas"""
+
+    def test_normalize_name(self):
+        assert normalize_name("Finca El PÁRAMO Ñuñoa") == "finca el paramo nunoa"
+
+    def test_trigrams_follow_pg_trgm(self):
+        # SELECT show_trgm('word') en Postgres
+        assert name_trigrams("word") == {"  w", " wo", "wor", "ord", "rd "}
+
+    def test_similarity_matches_pg_trgm(self):
+        # SELECT similarity('word', 'two words') = 0.363636 en Postgres
+        assert trigram_similarity("word", "two words") == pytest.approx(4 / 11)
+        assert trigram_similarity("Páramo", "PARAMO") == 1.0
+        assert trigram_similarity("", "lote") == 0.0
+
+
+class TestTrigramIndex:
+    """Pruebas del índice de búsqueda en memoria"""
+
+    def setup_method(self):
+        self.index = TrigramIndex()
+        self.index.add(1, "Lote El Páramo")
+        self.index.add(2, "Páramo")
+        self.index.add(3, "Finca La Esperanza")
+        self.index.add(4, "Lote 100%")
+
+    def test_substring_ignores_case_and_accents(self):
+        assert {key for key, _ in self.index.search("PARAM")} == {1, 2}
+        assert {key for key, _ in self.index.search("esperanza")} == {3}
+
+    def test_results_ranked_by_similarity(self):
+        assert [key for key, _ in self.index.search("páramo")] == [2, 1]
+
+    def test_short_queries_scan_all_names(self):
+        assert {key for key, _ in self.index.search("la")} == {3}
+
+    def test_special_characters_are_literal(self):
+        assert [key for key, _ in self.index.search("100%")] == [4]
+        assert self.index.search("0%l") == []
+
+    def test_add_replaces_and_remove(self):
+        self.index.add(2, "Otro nombre")
+        self.index.remove(1)
+
+        assert self.index.search("paramo") == []
+        assert len(self.index) == 3
+
+    def test_matches_brute_force(self):
+        rng = random.Random(9)
+        words = ["lote", "páramo", "alto", "bajo", "el", "la", "cañada", "río", "sol", "café"]
+        names = {key: " ".join(rng.choice(words) for _ in range(3)) for key in range(500)}
+        index = TrigramIndex()
+        for key, name in names.items():
+            index.add(key, name)
+
+        for query in ["cana", "o ba", "RIO SOL", "afé", "alto el"]:
+            expected = {key for key, name in names.items() if normalize_name(query) in normalize_name(name)}
+            assert {key for key, _ in index.search(query)} == expected
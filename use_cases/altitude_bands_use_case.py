@@ -0,0 +1,128 @@
+from typing import List, Optional, Sequence
+import logging
+
+import numpy as np
+from sqlalchemy import Float, cast
+from sqlalchemy.orm import Session
+
+from models.models import CoffeeVarieties, Plots
+from utils.response import create_response
+from utils.state import get_state
+from use_cases.list_plots_use_case import verify_read_plots_access
+from use_cases.viewport_plots_use_case import get_readable_farm_ids
+
+logger = logging.getLogger(__name__)
+
+# Límites por defecto de las franjas de altitud (msnm), dentro del rango permitido para los lotes (0 a 3000)
+DEFAULT_ALTITUDE_BAND_EDGES = [0, 1200, 1400, 1600, 1800, 2000, 3000]
+MAX_ALTITUDE_BANDS = 50
+
+def validate_band_edges(band_edges: Sequence[float]) -> Optional[str]:
+    """Retorna el mensaje de error si los límites no definen franjas válidas, o None."""
+    if len(band_edges) < 2:
+        return "Se requieren al menos dos límites de altitud"
+    if len(band_edges) - 1 > MAX_ALTITUDE_BANDS:
+        return f"No se pueden pedir más de {MAX_ALTITUDE_BANDS} franjas de altitud"
+    if any(lower >= upper for lower, upper in zip(band_edges, band_edges[1:])):
+        return "Los límites de altitud deben ser estrictamente crecientes"
+    return None
+
+def altitude_band_counts(altitudes: np.ndarray, variety_ids: np.ndarray, band_edges: Sequence[float]):
+    """
+    Cuenta los lotes de cada variedad en cada franja de altitud con
+    operaciones vectorizadas: `np.digitize` asigna la franja de cada lote y
+    un único `np.bincount` sobre (franja, variedad) arma la tabla.
+
+    Las franjas son [e0, e1), [e1, e2), ..., [en-1, en]; la última incluye su
+    límite superior. Los lotes fuera de [e0, en] no se cuentan.
+
+    Returns:
+        (ids de variedad ordenados, matriz de conteos franjas x variedades, cantidad fuera de rango)
+    """
+    edges = np.asarray(band_edges, dtype=np.float64)
+    band_count = len(edges) - 1
+    in_range = (altitudes >= edges[0]) & (altitudes <= edges[-1])
+    # El límite superior de la última franja se incluye en ella
+    bands = np.minimum(np.digitize(altitudes[in_range], edges) - 1, band_count - 1)
+    varieties, variety_index = np.unique(variety_ids[in_range], return_inverse=True)
+    counts = np.bincount(
+        bands * len(varieties) + variety_index.ravel(), minlength=band_count * len(varieties)
+    ).reshape(band_count, len(varieties))
+    return varieties, counts, int((~in_range).sum())
+
+def get_altitude_bands(user, db: Session, farm_id: Optional[int] = None, band_edges: Optional[List[float]] = None):
+    """
+    Lógica de negocio para agrupar los lotes activos en franjas de altitud y
+    contar cuántos hay de cada variedad de café en cada franja.
+
+    Con `farm_id` se analizan los lotes de esa finca (requiere el permiso
+    'read_plots'); sin él, los de todas las fincas en las que el usuario
+    puede ver lotes. Los lotes se leen en una sola consulta de dos columnas
+    y el histograma se calcula de forma vectorizada.
+    """
+    band_edges = list(band_edges) if band_edges else DEFAULT_ALTITUDE_BAND_EDGES
+    error = validate_band_edges(band_edges)
+    if error:
+        return create_response("error", error, status_code=400)
+
+    active_farm_state = get_state(db, "Activo", "Farms")
+    active_urf_state = get_state(db, "Activo", "user_role_farm")
+    active_plot_state = get_state(db, "Activo", "Plots")
+    if not active_farm_state or not active_urf_state or not active_plot_state:
+        logger.error("No se encontraron los estados 'Activo' para Farms, user_role_farm o Plots")
+        return create_response("error", "No se encontraron los estados 'Activo' requeridos", status_code=400)
+
+    if farm_id is not None:
+        error_response = verify_read_plots_access(farm_id, user, db, active_farm_state, active_urf_state)
+        if error_response:
+            return error_response
+        farm_ids = [farm_id]
+    else:
+        try:
+            farm_ids = get_readable_farm_ids(user, db, active_farm_state, active_urf_state)
+        except Exception as e:
+            logger.error("No se pudieron obtener los roles o permisos del usuario: %s", str(e))
+            return create_response("error", "No se pudieron obtener los roles del usuario", status_code=500)
+
+    rows = db.query(Plots.coffee_variety_id, cast(Plots.altitude, Float)).filter(
+        Plots.farm_id.in_(farm_ids),
+        Plots.plot_state_id == active_plot_state.plot_state_id
+    ).all() if farm_ids else []
+
+    # Las altitudes nulas quedan como NaN
+    data = np.array(rows, dtype=np.float64).reshape(-1, 2)
+    variety_ids = data[:, 0].astype(np.int64)
+    altitudes = data[:, 1]
+    with_altitude = ~np.isnan(altitudes)
+    varieties, counts, out_of_range = altitude_band_counts(altitudes[with_altitude], variety_ids[with_altitude], band_edges)
+
+    variety_names = dict(
+        db.query(CoffeeVarieties.coffee_variety_id, CoffeeVarieties.name).filter(
+            CoffeeVarieties.coffee_variety_id.in_([int(variety_id) for variety_id in varieties])
+        ).all()
+    ) if len(varieties) else {}
+
+    bands = []
+    for band, (lower, upper) in enumerate(zip(band_edges, band_edges[1:])):
+        present = np.flatnonzero(counts[band])
+        present = present[np.lexsort((varieties[present], -counts[band][present]))]
+        bands.append({
+            "min_altitude": lower,
+            "max_altitude": upper,
+            "plot_count": int(counts[band].sum()),
+            "varieties": [
+                {
+                    "coffee_variety_id": int(varieties[i]),
+                    "coffee_variety_name": variety_names.get(int(varieties[i])),
+                    "plot_count": int(counts[band][i])
+                }
+                for i in present
+            ]
+        })
+
+    return create_response("success", "Franjas de altitud obtenidas exitosamente", {
+        "plot_count": len(rows),
+        "without_altitude_count": int((~with_altitude).sum()),
+        "out_of_range_count": out_of_range,
+        "bands": bands
+    })
@@ -6,6 +6,7 @@ from utils.response import create_response
 from utils.state import get_state
 import logging
 from adapters.user_client import get_user_role_ids, create_user_role
+from adapters.cache_invalidation import USER_ROLE_EVENT, publish_invalidation
 
 logger = logging.getLogger(__name__)
 
@@ -115,6 +116,8 @@ def create_farm(request, user, db: Session):
             user_role_farm_state_id=active_urf_state.user_role_farm_state_id
         )
         db.add(user_role_farm)
+        # Los demás workers pueden tener en caché los user_role_ids del usuario sin el rol nuevo
+        publish_invalidation(db, USER_ROLE_EVENT, user_id=user.user_id)
         db.commit()
         logger.info("Usuario asignado como 'Propietario' de la finca con ID: %s", new_farm.farm_id)
 
@@ -5,6 +5,8 @@ from sqlalchemy.orm import Session
 from models.models import Farms, UserRoleFarm, Plots, CoffeeVarieties
 import logging
 from adapters.user_client import get_user_role_ids, get_role_permissions_for_user_role
+from utils.farm_summary import refresh_farm_summary
+from adapters.plot_spatial_index import publish_plot_change
 
 logger = logging.getLogger(__name__)
 
@@ -33,10 +35,10 @@ def _get_required_states(db: Session):
         'inactive_plot': inactive_plot_state
     }, None
 
-def _validate_farm_access(db: Session, request, user, states):
+def _validate_farm_access(db: Session, farm_id: int, user, states):
     """Validate farm exists and user has access."""
     farm = db.query(Farms).filter(
-        Farms.farm_id == request.farm_id, 
+        Farms.farm_id == farm_id, 
         Farms.farm_state_id == states['active_farm'].farm_state_id
     ).first()
     if not farm:
@@ -50,7 +52,7 @@ def _validate_farm_access(db: Session, request, user, states):
 
     user_role_farm = db.query(UserRoleFarm).filter(
         UserRoleFarm.user_role_id.in_(user_role_ids),
-        UserRoleFarm.farm_id == request.farm_id,
+        UserRoleFarm.farm_id == farm_id,
         UserRoleFarm.user_role_farm_state_id == states['active_urf'].user_role_farm_state_id
     ).first()
     
@@ -68,12 +70,19 @@ def _validate_farm_access(db: Session, request, user, states):
 
     return user_role_farm, None
 
+def _validate_plot_name(name):
+    """Return the validation error message for a plot name, or None if it is valid."""
+    if not name or not name.strip():
+        return "El nombre del lote no puede estar vacío"
+    if len(name) > 100:
+        return "El nombre del lote no puede tener más de 100 caracteres"
+    return None
+
 def _validate_plot_data(db: Session, request, states):
     """Validate plot name and check for duplicates."""
-    if not request.name or not request.name.strip():
-        return None, create_response("error", "El nombre del lote no puede estar vacío")
-    if len(request.name) > 100:
-        return None, create_response("error", "El nombre del lote no puede tener más de 100 caracteres")
+    name_error = _validate_plot_name(request.name)
+    if name_error:
+        return None, create_response("error", name_error)
 
     existing_active_plot = db.query(Plots).filter(
         Plots.name == request.name,
@@ -110,6 +119,8 @@ def _reactivate_inactive_plot(db: Session, request, states, coffee_variety):
     existing_inactive_plot.altitude = request.altitude
     
     try:
+        refresh_farm_summary(db, request.farm_id, states['active_plot'].plot_state_id)
+        publish_plot_change(db, existing_inactive_plot)
         db.commit()
         db.refresh(existing_inactive_plot)
         logger.info("Lote reactivado y actualizado exitosamente con ID: %s", existing_inactive_plot.plot_id)
@@ -141,6 +152,8 @@ def _create_new_plot(db: Session, request, states, coffee_variety):
             plot_state_id=states['active_plot'].plot_state_id
         )
         db.add(new_plot)
+        refresh_farm_summary(db, request.farm_id, states['active_plot'].plot_state_id)
+        publish_plot_change(db, new_plot)
         db.commit()
         db.refresh(new_plot)
         logger.info("Lote creado exitosamente con ID: %s", new_plot.plot_id)
@@ -168,7 +181,7 @@ def create_plot(request, user, db: Session):
         return error_response
 
     # Validate farm access and permissions
-    _, error_response = _validate_farm_access(db, request, user, states)
+    _, error_response = _validate_farm_access(db, request.farm_id, user, states)
     if error_response:
         return error_response
 
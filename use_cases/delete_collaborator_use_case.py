@@ -11,6 +11,7 @@ from adapters.user_client import (
     delete_user_role,
     get_user_role_id_for_farm
 )
+from adapters.cache_invalidation import USER_ROLE_EVENT, publish_invalidation
 from domain.schemas import DeleteCollaboratorResponse
 
 logger = logging.getLogger(__name__)
@@ -146,6 +147,11 @@ def delete_collaborator(delete_request, farm_id: int, user, db: Session) -> Dele
             return create_response("error", "Estado 'Inactivo' no encontrado para 'user_role_farm'", status_code=500)
         
         collaborator_role_farm.user_role_farm_state_id = urf_inactive_state.user_role_farm_state_id
+        # Se entrega a todos los workers solo si la transacción se confirma
+        publish_invalidation(
+            db, USER_ROLE_EVENT,
+            user_id=delete_request.collaborator_id, user_role_id=collaborator_role_farm.user_role_id
+        )
         db.commit()
         delete_user_role(collaborator_role_farm.user_role_id)
         logger.info("Colaborador eliminado de la finca y del microservicio de usuarios exitosamente")
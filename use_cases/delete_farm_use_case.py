@@ -5,6 +5,8 @@ from utils.response import create_response
 from utils.state import get_state
 import logging
 from adapters.user_client import get_user_role_ids, get_role_permissions_for_user_role
+from adapters.cache_invalidation import FARM_EVENT, publish_invalidation
+from utils.farm_summary import delete_farm_summary
 
 logger = logging.getLogger(__name__)
 
@@ -78,6 +80,11 @@ def delete_farm(farm_id: int, user, db: Session):
         for urf in user_role_farms:
             urf.user_role_farm_state_id = inactive_urf_state.user_role_farm_state_id
 
+        # Las fincas inactivas no tienen resumen
+        delete_farm_summary(db, farm_id)
+
+        # Se entrega a todos los workers solo si la transacción se confirma
+        publish_invalidation(db, FARM_EVENT, farm_id=farm_id, user_role_ids=[urf.user_role_id for urf in user_role_farms])
         db.commit()
         logger.info("Finca y relaciones en user_role_farm puestas en estado 'Inactivo' para la finca con ID %s", farm_id)
         return create_response("success", "Finca puesta en estado 'Inactivo' correctamente")
@@ -4,6 +4,8 @@ from utils.response import create_response
 from utils.state import get_state
 import logging
 from adapters.user_client import get_user_role_ids, get_role_permissions_for_user_role
+from utils.farm_summary import refresh_farm_summary
+from adapters.plot_spatial_index import publish_plot_change
 
 logger = logging.getLogger(__name__)
 
@@ -58,6 +60,8 @@ def delete_plot(plot_id: int, user, db):
     # Cambiar el estado del lote a 'Inactivo'
     try:
         plot.plot_state_id = inactive_plot_state.plot_state_id
+        refresh_farm_summary(db, plot.farm_id, active_plot_state.plot_state_id)
+        publish_plot_change(db, plot, active=False)
         db.commit()
         logger.info("Lote con ID %s puesto en estado 'Inactivo'", plot.plot_id)
         return create_response("success", "Lote eliminado correctamente")
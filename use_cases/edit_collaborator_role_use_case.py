@@ -13,6 +13,7 @@ from adapters.user_client import (
     get_role_name_by_id,
     create_user_role_for_farm  # Import the new function
 )
+from adapters.cache_invalidation import USER_ROLE_EVENT, publish_invalidation
 
 logger = logging.getLogger(__name__)
 
@@ -174,6 +175,8 @@ def edit_collaborator_role(edit_request: EditCollaboratorRoleRequest, farm_id: i
         collaborator_user_id = collaborator_info['user_id']
         new_user_role_id = create_user_role_for_farm(collaborator_user_id, edit_request.new_role_id)
         collaborator_role_farm.user_role_id = new_user_role_id
+        # Se entrega a todos los workers solo si la transacción se confirma
+        publish_invalidation(db, USER_ROLE_EVENT, user_id=collaborator_user_id, user_role_id=collaborator_user_role_id)
         db.commit()
         
         logger.info(f"Rol del colaborador actualizado a '{new_role_name}' solo para la finca {farm_id}")
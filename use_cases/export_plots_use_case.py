@@ -0,0 +1,75 @@
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from models.models import Plots, CoffeeVarieties
+from utils.response import create_response, process_data_for_json
+from utils.state import get_state
+from dataBase import SessionLocal
+from use_cases.list_plots_use_case import verify_read_plots_access
+import logging
+import orjson
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Filas que se traen del cursor del servidor en cada viaje a la base de datos
+EXPORT_BATCH_SIZE = 1000
+
+def _stream_plots(farm_id: int, plot_state_id: int, session_factory):
+    """
+    Genera los lotes activos de la finca como líneas NDJSON.
+
+    Usa un cursor del lado del servidor (`yield_per`), por lo que la memoria se
+    mantiene constante sin importar cuántos lotes tenga la finca. Abre su propia
+    sesión porque la sesión de la petición se cierra antes de que termine el streaming.
+    """
+    db = session_factory()
+    try:
+        statement = select(
+            Plots.plot_id,
+            Plots.name,
+            CoffeeVarieties.name.label("coffee_variety_name"),
+            Plots.latitude,
+            Plots.longitude,
+            Plots.altitude
+        ).outerjoin(
+            CoffeeVarieties, Plots.coffee_variety_id == CoffeeVarieties.coffee_variety_id
+        ).where(
+            Plots.farm_id == farm_id,
+            Plots.plot_state_id == plot_state_id
+        ).order_by(Plots.plot_id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+        result = db.execute(statement)
+        for partition in result.partitions():
+            yield b"".join(
+                orjson.dumps(process_data_for_json(dict(row._mapping))) + b"\n" for row in partition
+            )
+    except Exception as e:
+        logger.error("Error al exportar los lotes de la finca %s: %s", farm_id, str(e))
+        # Los encabezados ya se enviaron: se informa el error como última línea del stream
+        yield orjson.dumps({"status": "error", "message": "Error al exportar los lotes"}) + b"\n"
+    finally:
+        db.close()
+
+def export_plots(farm_id: int, user, db, session_factory=SessionLocal):
+    """
+    Lógica de negocio para exportar en streaming (NDJSON) todos los lotes activos de una finca.
+    Aplica la misma verificación de permisos que el listado de lotes ('read_plots').
+    """
+    active_farm_state = get_state(db, "Activo", "Farms")
+    active_urf_state = get_state(db, "Activo", "user_role_farm")
+    active_plot_state = get_state(db, "Activo", "Plots")
+    if not active_farm_state or not active_urf_state or not active_plot_state:
+        logger.error("No se encontraron los estados 'Activo' necesarios para exportar lotes")
+        return create_response("error", "No se encontraron los estados 'Activo' necesarios", status_code=400)
+
+    error_response = verify_read_plots_access(farm_id, user, db, active_farm_state, active_urf_state)
+    if error_response:
+        return error_response
+
+    logger.info("Exportando lotes de la finca %s", farm_id)
+    return StreamingResponse(
+        _stream_plots(farm_id, active_plot_state.plot_state_id, session_factory),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="farm_{farm_id}_plots.ndjson"'}
+    )
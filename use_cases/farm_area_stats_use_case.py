@@ -0,0 +1,77 @@
+import logging
+
+import numpy as np
+from sqlalchemy import Float, cast
+from sqlalchemy.orm import Session
+
+from models.models import Farms, UserRoleFarm
+from utils.area_units import load_hectare_factors, to_hectares
+from utils.response import create_response
+from utils.state import get_state
+from adapters.user_client import get_user_role_ids
+
+logger = logging.getLogger(__name__)
+
+def get_farm_area_stats(user, db: Session, order: str = "desc"):
+    """
+    Lógica de negocio para obtener el área total y promedio, en hectáreas, de
+    las fincas activas del usuario, junto con las fincas ordenadas por su área
+    en hectáreas (`order` 'desc' o 'asc').
+
+    Las áreas se convierten con el factor de cada unidad en una sola operación
+    vectorizada sobre todas las fincas. Las fincas cuya unidad no tiene
+    equivalencia en hectáreas se listan al final con `area_hectares` None y no
+    se cuentan en el total ni en el promedio.
+    """
+    active_farm_state = get_state(db, "Activo", "Farms")
+    active_urf_state = get_state(db, "Activo", "user_role_farm")
+    if not active_farm_state or not active_urf_state:
+        logger.error("No se encontraron los estados 'Activo' para Farms o user_role_farm")
+        return create_response("error", "No se encontraron los estados 'Activo' requeridos", status_code=400)
+
+    try:
+        user_role_ids = get_user_role_ids(user.user_id)
+    except Exception as e:
+        logger.error("No se pudieron obtener los user_role_ids: %s", str(e))
+        return create_response("error", "No se pudieron obtener los roles del usuario", status_code=500)
+
+    rows = []
+    if user_role_ids:
+        rows = db.query(
+            Farms.farm_id, Farms.name, cast(Farms.area, Float), Farms.area_unit_id
+        ).join(
+            UserRoleFarm, UserRoleFarm.farm_id == Farms.farm_id
+        ).filter(
+            UserRoleFarm.user_role_id.in_(user_role_ids),
+            UserRoleFarm.user_role_farm_state_id == active_urf_state.user_role_farm_state_id,
+            Farms.farm_state_id == active_farm_state.farm_state_id
+        ).distinct().all()
+
+    hectares = to_hectares((row[2] for row in rows), (row[3] for row in rows), load_hectare_factors(db) if rows else {})
+    converted = ~np.isnan(hectares)
+
+    # Orden por área en hectáreas (empates por farm_id); las fincas sin conversión van al final
+    farm_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    sort_key = -hectares if order == "desc" else hectares
+    ordering = np.lexsort((farm_ids, np.where(converted, sort_key, 0), ~converted))
+
+    farms = [
+        {
+            "farm_id": rows[i][0],
+            "name": rows[i][1],
+            "area": rows[i][2],
+            "area_unit_id": rows[i][3],
+            "area_hectares": round(float(hectares[i]), 4) if converted[i] else None
+        }
+        for i in ordering
+    ]
+    converted_count = int(converted.sum())
+    total = float(hectares[converted].sum()) if converted_count else 0.0
+
+    return create_response("success", "Estadísticas de área de las fincas obtenidas exitosamente", {
+        "farm_count": len(rows),
+        "unconverted_farm_count": len(rows) - converted_count,
+        "total_area_hectares": round(total, 4),
+        "average_area_hectares": round(total / converted_count, 4) if converted_count else None,
+        "farms": farms
+    })
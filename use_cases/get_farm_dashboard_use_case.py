@@ -0,0 +1,171 @@
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import logging
+
+from sqlalchemy.orm import Session
+
+from dataBase import SessionLocal
+from models.models import Farms, AreaUnits, FarmStates, UserRoleFarm, Plots, CoffeeVarieties
+from utils.response import create_response
+from utils.state import get_state
+from adapters.user_client import (
+    get_user_role_ids,
+    get_role_permissions_for_user_role,
+    get_role_name_for_user_role,
+    get_collaborators_info
+)
+
+logger = logging.getLogger(__name__)
+
+FARM_NOT_FOUND_OR_NOT_BELONGS_TO_USER_ERROR = "Finca no encontrada o no pertenece al usuario"
+# Secciones del tablero que se consultan en paralelo (lotes, colaboradores y nombre del rol)
+DASHBOARD_MAX_WORKERS = 3
+
+def _forbidden_section(message: str) -> dict:
+    return {"status": "forbidden", "message": message}
+
+def _error_section(message: str) -> dict:
+    return {"status": "error", "message": message}
+
+def _load_plots(session_factory, farm_id: int, active_plot_state_id: int) -> dict:
+    """Lotes activos de la finca con el nombre de su variedad, en una sola consulta."""
+    with session_factory() as db:
+        rows = db.query(Plots, CoffeeVarieties.name).outerjoin(
+            CoffeeVarieties, Plots.coffee_variety_id == CoffeeVarieties.coffee_variety_id
+        ).filter(
+            Plots.farm_id == farm_id,
+            Plots.plot_state_id == active_plot_state_id
+        ).order_by(Plots.plot_id).all()
+    return {
+        "status": "success",
+        "plots": [
+            {
+                "plot_id": plot.plot_id,
+                "name": plot.name,
+                "coffee_variety_name": coffee_variety_name,
+                "latitude": plot.latitude,
+                "longitude": plot.longitude,
+                "altitude": plot.altitude
+            }
+            for plot, coffee_variety_name in rows
+        ]
+    }
+
+def _load_collaborators(session_factory, farm_id: int, active_urf_state_id: int, include_info: bool) -> dict:
+    """Colaboradores activos de la finca; su información se pide al servicio de usuarios solo si se solicita."""
+    with session_factory() as db:
+        user_role_ids = [
+            user_role_id for (user_role_id,) in db.query(UserRoleFarm.user_role_id).filter(
+                UserRoleFarm.farm_id == farm_id,
+                UserRoleFarm.user_role_farm_state_id == active_urf_state_id
+            ).order_by(UserRoleFarm.user_role_id).all()
+        ]
+    section = {"status": "success", "count": len(user_role_ids), "user_role_ids": user_role_ids}
+    if include_info:
+        section["collaborators"] = get_collaborators_info(user_role_ids)
+    return section
+
+def _run_section(future, error_message: str):
+    """Retorna el resultado de una sección, o una sección de error si falló (sin afectar a las demás)."""
+    try:
+        return future.result()
+    except Exception as e:
+        logger.error("%s: %s", error_message, str(e))
+        return _error_section(error_message)
+
+def get_farm_dashboard(farm_id: int, user, db: Session, include_collaborators_info: bool = False, session_factory=SessionLocal):
+    """
+    Lógica de negocio para obtener en una sola llamada la finca, sus lotes y sus
+    colaboradores.
+
+    La pertenencia del usuario a la finca y los permisos de su rol se resuelven
+    una sola vez. Luego las consultas de lotes y colaboradores (y la del nombre
+    del rol) se ejecutan en paralelo, cada una con su propia sesión de base de
+    datos. Cada sección respeta su permiso: sin 'read_plots' o
+    'read_collaborators' la sección se retorna como `forbidden`, y si una
+    sección falla las demás se retornan igual.
+    """
+    active_farm_state = get_state(db, "Activo", "Farms")
+    active_urf_state = get_state(db, "Activo", "user_role_farm")
+    active_plot_state = get_state(db, "Activo", "Plots")
+    if not active_farm_state or not active_urf_state or not active_plot_state:
+        logger.error("No se encontraron los estados 'Activo' para Farms, user_role_farm o Plots")
+        return create_response("error", "No se encontraron los estados 'Activo' requeridos", status_code=400)
+
+    try:
+        user_role_ids = get_user_role_ids(user.user_id)
+    except Exception as e:
+        logger.error("No se pudieron obtener los user_role_ids: %s", str(e))
+        return create_response("error", "No se pudieron obtener los roles del usuario", status_code=500)
+
+    if not user_role_ids:
+        return create_response("error", FARM_NOT_FOUND_OR_NOT_BELONGS_TO_USER_ERROR)
+
+    # Finca activa y relación activa del usuario con ella, en una sola consulta
+    farm_data = db.query(Farms, AreaUnits, FarmStates, UserRoleFarm).select_from(UserRoleFarm).join(
+        Farms, UserRoleFarm.farm_id == Farms.farm_id
+    ).join(
+        AreaUnits, Farms.area_unit_id == AreaUnits.area_unit_id
+    ).join(
+        FarmStates, Farms.farm_state_id == FarmStates.farm_state_id
+    ).filter(
+        UserRoleFarm.user_role_id.in_(user_role_ids),
+        UserRoleFarm.user_role_farm_state_id == active_urf_state.user_role_farm_state_id,
+        Farms.farm_state_id == active_farm_state.farm_state_id,
+        Farms.farm_id == farm_id
+    ).first()
+    if not farm_data:
+        logger.warning("Finca %s no encontrada o no pertenece al usuario", farm_id)
+        return create_response("error", FARM_NOT_FOUND_OR_NOT_BELONGS_TO_USER_ERROR)
+
+    farm, area_unit, farm_state, user_role_farm = farm_data
+
+    try:
+        permissions = get_role_permissions_for_user_role(user_role_farm.user_role_id)
+    except Exception as e:
+        logger.error("No se pudieron obtener los permisos del rol: %s", str(e))
+        return create_response("error", "No se pudieron obtener los permisos del rol", status_code=500)
+
+    can_read_plots = "read_plots" in permissions
+    can_read_collaborators = "read_collaborators" in permissions
+
+    # Cada tarea corre en una copia del contexto para conservar el plazo de la petición
+    with ThreadPoolExecutor(max_workers=DASHBOARD_MAX_WORKERS) as executor:
+        def submit(fn, *args):
+            return executor.submit(contextvars.copy_context().run, fn, *args)
+
+        role_future = submit(get_role_name_for_user_role, user_role_farm.user_role_id)
+        plots_future = submit(
+            _load_plots, session_factory, farm_id, active_plot_state.plot_state_id
+        ) if can_read_plots else None
+        collaborators_future = submit(
+            _load_collaborators, session_factory, farm_id, active_urf_state.user_role_farm_state_id, include_collaborators_info
+        ) if can_read_collaborators else None
+
+        try:
+            role_name = role_future.result()
+        except Exception as e:
+            logger.error("No se pudo obtener el nombre del rol: %s", str(e))
+            role_name = None
+
+        plots_section = _run_section(plots_future, "No se pudieron obtener los lotes de la finca") if plots_future \
+            else _forbidden_section("No tienes permiso para ver los lotes de esta finca")
+        collaborators_section = _run_section(collaborators_future, "No se pudieron obtener los colaboradores de la finca") if collaborators_future \
+            else _forbidden_section("No tienes permiso para ver los colaboradores de esta finca")
+
+    return create_response("success", "Tablero de la finca obtenido exitosamente", {
+        "farm": {
+            "farm_id": farm.farm_id,
+            "name": farm.name,
+            "area": farm.area,
+            "area_unit_id": farm.area_unit_id,
+            "area_unit": area_unit.name,
+            "farm_state_id": farm.farm_state_id,
+            "farm_state": farm_state.name,
+            "role": role_name,
+            "user_role_id": user_role_farm.user_role_id
+        },
+        "permissions": sorted(permissions),
+        "plots": plots_section,
+        "collaborators": collaborators_section
+    })
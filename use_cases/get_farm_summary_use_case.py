@@ -0,0 +1,77 @@
+from models.models import AreaUnits, CoffeeVarieties, Farms, FarmSummary
+from utils.response import create_response
+from utils.state import get_state
+from utils.farm_summary import refresh_farm_summary
+from use_cases.list_plots_use_case import verify_read_plots_access
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _get_or_build_summary(farm_id: int, db, active_plot_state_id: int):
+    """Lee el resumen de la finca; si aún no existe (finca sin migrar), lo calcula y guarda."""
+    summary = db.query(FarmSummary).filter(FarmSummary.farm_id == farm_id).first()
+    if summary:
+        return summary
+    try:
+        refresh_farm_summary(db, farm_id, active_plot_state_id)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error("Error al calcular el resumen de la finca %s: %s", farm_id, str(e))
+        return None
+    return db.query(FarmSummary).filter(FarmSummary.farm_id == farm_id).first()
+
+def get_farm_summary(farm_id: int, user, db):
+    """
+    Lógica de negocio para obtener el resumen de una finca: cantidad de lotes
+    activos, cantidad por variedad de café, altitudes mínima, máxima y
+    promedio, y el área de la finca.
+
+    Lee la tabla `farm_summary`, que se mantiene al crear, editar o eliminar
+    lotes, en lugar de recorrer todos los lotes de la finca.
+    """
+    active_farm_state = get_state(db, "Activo", "Farms")
+    active_urf_state = get_state(db, "Activo", "user_role_farm")
+    active_plot_state = get_state(db, "Activo", "Plots")
+
+    # Verificar que la finca esté activa y que el usuario tenga permiso 'read_plots'
+    error_response = verify_read_plots_access(farm_id, user, db, active_farm_state, active_urf_state)
+    if error_response:
+        return error_response
+
+    summary = _get_or_build_summary(farm_id, db, active_plot_state.plot_state_id)
+    if not summary:
+        return create_response("error", "No se pudo obtener el resumen de la finca", status_code=500)
+
+    farm, area_unit = db.query(Farms, AreaUnits).join(
+        AreaUnits, Farms.area_unit_id == AreaUnits.area_unit_id
+    ).filter(Farms.farm_id == farm_id).first()
+
+    variety_counts = {int(variety_id): count for variety_id, count in (summary.variety_counts or {}).items()}
+    variety_names = dict(
+        db.query(CoffeeVarieties.coffee_variety_id, CoffeeVarieties.name).filter(
+            CoffeeVarieties.coffee_variety_id.in_(list(variety_counts))
+        ).all()
+    ) if variety_counts else {}
+    varieties = sorted(
+        (
+            {"coffee_variety_id": variety_id, "coffee_variety_name": variety_names.get(variety_id), "plot_count": count}
+            for variety_id, count in variety_counts.items()
+        ),
+        key=lambda variety: (-variety["plot_count"], variety["coffee_variety_id"])
+    )
+
+    return create_response("success", "Resumen de la finca obtenido correctamente", {
+        "farm_id": farm.farm_id,
+        "name": farm.name,
+        "area": farm.area,
+        "area_unit": area_unit.name,
+        "active_plot_count": summary.active_plot_count,
+        "varieties": varieties,
+        "altitude": {
+            "min": summary.min_altitude,
+            "max": summary.max_altitude,
+            "avg": summary.avg_altitude
+        },
+        "updated_at": summary.updated_at
+    })
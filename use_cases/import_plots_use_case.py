@@ -0,0 +1,216 @@
+import csv
+import io
+import logging
+
+import orjson
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from domain.schemas import CreatePlotRequest
+from models.models import Plots, CoffeeVarieties
+from utils.response import create_response
+from use_cases.create_plot_use_case import _get_required_states, _validate_farm_access, _validate_plot_name
+from utils.farm_summary import refresh_farm_summary
+from adapters.cache_invalidation import PLOT_EVENT, publish_invalidation
+
+logger = logging.getLogger(__name__)
+
+# Cantidad de filas por sentencia INSERT/UPDATE multi-fila
+IMPORT_BATCH_SIZE = 500
+MAX_IMPORT_ROWS = 10000
+
+CSV_EXTENSIONS = (".csv",)
+GEOJSON_EXTENSIONS = (".geojson", ".json")
+GEOJSON_CONTENT_TYPES = ("application/geo+json", "application/json")
+
+class PlotImportFormatError(Exception):
+    """Custom exception for uploaded files that cannot be parsed as CSV or GeoJSON."""
+    pass
+
+class PlotImportRowError(Exception):
+    """A row of the uploaded file that cannot be read; it is reported in `errors` like any other invalid row."""
+    pass
+
+def _detect_format(filename: str, content_type: str) -> str:
+    """Detecta el formato del archivo a partir de su extensión o tipo de contenido."""
+    filename = (filename or "").lower()
+    content_type = (content_type or "").lower()
+    if filename.endswith(CSV_EXTENSIONS) or content_type.startswith("text/csv"):
+        return "csv"
+    if filename.endswith(GEOJSON_EXTENSIONS) or content_type.startswith(GEOJSON_CONTENT_TYPES):
+        return "geojson"
+    raise PlotImportFormatError("Formato de archivo no soportado. Use CSV o GeoJSON")
+
+def _iter_csv_rows(file):
+    """
+    Lee el CSV fila por fila sin cargarlo completo en memoria.
+    Columnas esperadas: name, coffee_variety_id, latitude, longitude, altitude.
+    """
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+    for row in reader:
+        yield {key.strip(): value.strip() if isinstance(value, str) else value for key, value in row.items() if key}
+
+def _iter_geojson_rows(file):
+    """
+    Convierte las Features de tipo Point de un FeatureCollection en filas.
+    La altitud se toma de `properties.altitude` o, si no existe, de la tercera coordenada.
+    Una Feature mal formada se entrega como `PlotImportRowError` para reportarla en su fila.
+    """
+    try:
+        document = orjson.loads(file.read())
+    except orjson.JSONDecodeError as e:
+        raise PlotImportFormatError(f"El archivo GeoJSON no es válido: {str(e)}")
+    if not isinstance(document, dict) or document.get("type") != "FeatureCollection":
+        raise PlotImportFormatError("El archivo GeoJSON debe ser un FeatureCollection")
+
+    features = document.get("features") or []
+    if not isinstance(features, list):
+        raise PlotImportFormatError("El campo 'features' del archivo GeoJSON debe ser una lista")
+
+    for feature in features:
+        if not isinstance(feature, dict):
+            yield PlotImportRowError("La Feature debe ser un objeto JSON")
+            continue
+        properties = feature.get("properties") or {}
+        geometry = feature.get("geometry") or {}
+        if not isinstance(properties, dict):
+            yield PlotImportRowError("El campo 'properties' de la Feature debe ser un objeto JSON")
+            continue
+        if not isinstance(geometry, dict):
+            yield PlotImportRowError("El campo 'geometry' de la Feature debe ser un objeto JSON")
+            continue
+        properties = dict(properties)
+        coordinates = geometry.get("coordinates") or []
+        if not isinstance(coordinates, list):
+            yield PlotImportRowError("El campo 'geometry.coordinates' de la Feature debe ser una lista")
+            continue
+        if geometry.get("type") == "Point" and len(coordinates) >= 2:
+            properties.setdefault("longitude", coordinates[0])
+            properties.setdefault("latitude", coordinates[1])
+            if len(coordinates) >= 3:
+                properties.setdefault("altitude", coordinates[2])
+        yield properties
+
+def _format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors()
+    )
+
+def import_plots(farm_id: int, file, filename: str, content_type: str, user, db: Session):
+    """
+    Lógica de negocio para importar lotes en bloque desde un archivo CSV o GeoJSON.
+
+    Cada fila se valida con las mismas reglas que la creación individual
+    (`CreatePlotRequest` y las reglas de nombre de `_validate_plot_data`). Los lotes
+    inactivos con el mismo nombre se reactivan y el resto se inserta en lotes
+    multi-fila, todo dentro de una sola verificación de permisos y una sola transacción.
+    """
+    states, error_response = _get_required_states(db)
+    if error_response:
+        return error_response
+
+    _, error_response = _validate_farm_access(db, farm_id, user, states)
+    if error_response:
+        return error_response
+
+    try:
+        file_format = _detect_format(filename, content_type)
+    except PlotImportFormatError as e:
+        return create_response("error", str(e), status_code=400)
+
+    # Precargar en memoria los datos necesarios para validar todas las filas sin consultas por fila
+    variety_ids = {variety_id for (variety_id,) in db.query(CoffeeVarieties.coffee_variety_id).all()}
+    existing_plots = db.query(Plots.plot_id, Plots.name, Plots.plot_state_id).filter(Plots.farm_id == farm_id).all()
+    active_plot_state_id = states['active_plot'].plot_state_id
+    inactive_plot_state_id = states['inactive_plot'].plot_state_id
+    active_names = {name for _, name, state_id in existing_plots if state_id == active_plot_state_id}
+    inactive_plot_ids = {name: plot_id for plot_id, name, state_id in existing_plots if state_id == inactive_plot_state_id}
+
+    rows = _iter_csv_rows(file) if file_format == "csv" else _iter_geojson_rows(file)
+    errors = []
+    seen_names = set()
+    to_insert, to_reactivate = [], []
+    created = reactivated = 0
+
+    try:
+        for row_number, row in enumerate(rows, start=1):
+            if row_number > MAX_IMPORT_ROWS:
+                errors.append({"row": row_number, "message": f"Se superó el máximo de {MAX_IMPORT_ROWS} filas por importación"})
+                break
+            if isinstance(row, PlotImportRowError):
+                errors.append({"row": row_number, "message": str(row)})
+                continue
+
+            try:
+                plot = CreatePlotRequest(**{**row, "farm_id": farm_id})
+            except (ValidationError, TypeError) as e:
+                message = _format_validation_error(e) if isinstance(e, ValidationError) else str(e)
+                errors.append({"row": row_number, "message": message})
+                continue
+
+            name_error = _validate_plot_name(plot.name)
+            if name_error:
+                errors.append({"row": row_number, "message": name_error})
+                continue
+            if plot.name in seen_names:
+                errors.append({"row": row_number, "message": f"El nombre '{plot.name}' está repetido en el archivo"})
+                continue
+            if plot.name in active_names:
+                errors.append({"row": row_number, "message": f"Ya existe un lote activo con el nombre '{plot.name}' en esta finca"})
+                continue
+            if plot.coffee_variety_id not in variety_ids:
+                errors.append({"row": row_number, "message": f"La variedad de café con ID '{plot.coffee_variety_id}' no existe"})
+                continue
+            seen_names.add(plot.name)
+
+            values = {
+                "name": plot.name,
+                "coffee_variety_id": plot.coffee_variety_id,
+                "latitude": plot.latitude,
+                "longitude": plot.longitude,
+                "altitude": plot.altitude,
+                "plot_state_id": active_plot_state_id,
+            }
+            if plot.name in inactive_plot_ids:
+                to_reactivate.append({"plot_id": inactive_plot_ids[plot.name], **values})
+                reactivated += 1
+            else:
+                to_insert.append({"farm_id": farm_id, **values})
+                created += 1
+
+            # INSERT multi-fila y UPDATE por clave primaria ejecutados por lotes
+            if len(to_insert) >= IMPORT_BATCH_SIZE:
+                db.execute(insert(Plots), to_insert)
+                to_insert = []
+            if len(to_reactivate) >= IMPORT_BATCH_SIZE:
+                db.execute(update(Plots), to_reactivate)
+                to_reactivate = []
+
+        if to_insert:
+            db.execute(insert(Plots), to_insert)
+        if to_reactivate:
+            db.execute(update(Plots), to_reactivate)
+        if created or reactivated:
+            refresh_farm_summary(db, farm_id, states['active_plot'].plot_state_id)
+            # Evento de toda la finca: los workers descartan su índice espacial y lo recargan
+            publish_invalidation(db, PLOT_EVENT, farm_id=farm_id)
+        db.commit()
+    except PlotImportFormatError as e:
+        db.rollback()
+        return create_response("error", str(e), status_code=400)
+    except UnicodeDecodeError:
+        db.rollback()
+        return create_response("error", "El archivo debe estar codificado en UTF-8", status_code=400)
+    except Exception as e:
+        db.rollback()
+        logger.error("Error al importar los lotes: %s", str(e))
+        raise HTTPException(status_code=500, detail=f"Error al importar los lotes: {str(e)}")
+
+    logger.info("Importación de lotes en la finca %s: %s creados, %s reactivados, %s errores", farm_id, created, reactivated, len(errors))
+    data = {"created": created, "reactivated": reactivated, "errors": errors}
+    if not created and not reactivated and errors:
+        return create_response("error", "No se importó ningún lote", data, status_code=400)
+    message = "Lotes importados correctamente" if not errors else "Lotes importados con errores en algunas filas"
+    return create_response("success", message, data)
@@ -7,15 +7,14 @@ from adapters.user_client import get_user_role_ids, get_role_permissions_for_use
 
 logger = logging.getLogger(__name__)
 
-def list_plots(farm_id: int, user, db):
-    """
-    Lógica de negocio para obtener la lista de lotes activos de una finca específica.
+def verify_read_plots_access(farm_id: int, user, db, active_farm_state, active_urf_state):
     """
-    # Obtener los estados "Activo"
-    active_farm_state = get_state(db, "Activo", "Farms")
-    active_urf_state = get_state(db, "Activo", "user_role_farm")
-    active_plot_state = get_state(db, "Activo", "Plots")
+    Verifica que la finca exista y esté activa, y que el usuario tenga el permiso
+    'read_plots' en ella.
 
+    Returns:
+        None si el acceso es válido, o la respuesta de error a retornar.
+    """
     # Verificar que la finca existe y está activa
     farm = db.query(Farms).filter(Farms.farm_id == farm_id, Farms.farm_state_id == active_farm_state.farm_state_id).first()
     if not farm:
@@ -50,6 +49,22 @@ def list_plots(farm_id: int, user, db):
         logger.warning("El rol del usuario no tiene permiso para ver los lotes en la finca")
         return create_response("error", "No tienes permiso para ver los lotes de esta finca")
 
+    return None
+
+def list_plots(farm_id: int, user, db):
+    """
+    Lógica de negocio para obtener la lista de lotes activos de una finca específica.
+    """
+    # Obtener los estados "Activo"
+    active_farm_state = get_state(db, "Activo", "Farms")
+    active_urf_state = get_state(db, "Activo", "user_role_farm")
+    active_plot_state = get_state(db, "Activo", "Plots")
+
+    # Verificar que la finca esté activa y que el usuario tenga permiso 'read_plots'
+    error_response = verify_read_plots_access(farm_id, user, db, active_farm_state, active_urf_state)
+    if error_response:
+        return error_response
+
     # Obtener todos los lotes activos de la finca
     try:
         plots = db.query(Plots).filter(
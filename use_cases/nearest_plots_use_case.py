@@ -0,0 +1,64 @@
+from typing import List, Optional
+import logging
+
+from sqlalchemy.orm import Session
+
+from models.models import Plots
+from utils.response import create_response
+from utils.state import get_state
+from adapters.plot_spatial_index import plot_spatial_index
+from use_cases.viewport_plots_use_case import get_readable_farm_ids
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NEAREST_PLOTS = 10
+MAX_NEAREST_PLOTS = 100
+
+def _plot_points_loader(db: Session, active_plot_state_id: int):
+    """Carga los lotes activos con coordenadas de las fincas que aún no están en el índice."""
+    def load(farm_ids: List[int]):
+        return db.query(
+            Plots.farm_id, Plots.plot_id, Plots.name, Plots.latitude, Plots.longitude
+        ).filter(
+            Plots.farm_id.in_(farm_ids),
+            Plots.plot_state_id == active_plot_state_id,
+            Plots.latitude.isnot(None),
+            Plots.longitude.isnot(None)
+        ).all()
+    return load
+
+def find_nearest_plots(
+    latitude: float,
+    longitude: float,
+    user,
+    db: Session,
+    k: int = DEFAULT_NEAREST_PLOTS,
+    max_distance_km: Optional[float] = None
+):
+    """
+    Lógica de negocio para obtener los `k` lotes activos más cercanos a una
+    posición, entre todas las fincas en las que el usuario puede ver lotes.
+
+    La búsqueda se resuelve en el índice espacial en memoria: solo se consulta
+    la tabla de lotes la primera vez que se busca en una finca. Las distancias
+    se calculan con la fórmula del haversine y se retornan en kilómetros.
+    """
+    active_farm_state = get_state(db, "Activo", "Farms")
+    active_urf_state = get_state(db, "Activo", "user_role_farm")
+    active_plot_state = get_state(db, "Activo", "Plots")
+    if not active_farm_state or not active_urf_state or not active_plot_state:
+        logger.error("No se encontraron los estados 'Activo' para Farms, user_role_farm o Plots")
+        return create_response("error", "No se encontraron los estados 'Activo' requeridos", status_code=400)
+
+    try:
+        farm_ids = get_readable_farm_ids(user, db, active_farm_state, active_urf_state)
+    except Exception as e:
+        logger.error("No se pudieron obtener los roles o permisos del usuario: %s", str(e))
+        return create_response("error", "No se pudieron obtener los roles del usuario", status_code=500)
+
+    plots = plot_spatial_index.nearest(
+        farm_ids, latitude, longitude, k,
+        _plot_points_loader(db, active_plot_state.plot_state_id),
+        max_distance_km=max_distance_km
+    )
+    return create_response("success", "Lotes más cercanos obtenidos exitosamente", {"plots": plots})
@@ -0,0 +1,125 @@
+import logging
+
+from sqlalchemy import Float, cast, func, literal_column
+from sqlalchemy.orm import Session
+
+from models.models import CoffeeVarieties, Plots
+from utils.response import create_response
+from utils.state import get_state
+from adapters.plot_clusters import (
+    count_covering_tiles,
+    covering_tiles,
+    get_tile_clusters,
+    grid_size,
+    merge_clusters,
+    precision_for_zoom,
+    tile_bounds,
+    tile_precision,
+)
+from use_cases.viewport_plots_use_case import get_readable_farm_ids
+
+logger = logging.getLogger(__name__)
+
+# Celdas de caché que puede abarcar una consulta; evita pedir un área enorme con mucho zoom
+MAX_CLUSTER_TILES = 64
+
+def _grid_index(column, offset: float, span: float, cells: int):
+    """
+    Índice de la celda de geohash de una coordenada, con las mismas operaciones
+    en double precision que adapters/plot_clusters.py. Los valores van como
+    literales para que la expresión del SELECT y la del GROUP BY sean idénticas.
+    """
+    return func.floor(
+        (cast(column, Float) + literal_column(repr(offset))) / literal_column(repr(span)) * literal_column(str(cells))
+    )
+
+def _tile_cells_loader(db: Session, active_plot_state_id: int, precision: int):
+    """
+    Agrupa en la base los lotes activos de todas las fincas dentro de una celda
+    por (finca, variedad, celda de los grupos), con la cantidad y la suma de las
+    coordenadas. Así una celda trae a lo sumo una fila por finca, variedad y
+    grupo, aunque abarque muchísimos lotes con poco zoom (usa el índice de coordenadas).
+    """
+    lat_cells, lon_cells = grid_size(precision)
+    lat_index = _grid_index(Plots.latitude, 90.0, 180.0, lat_cells)
+    lon_index = _grid_index(Plots.longitude, 180.0, 360.0, lon_cells)
+
+    def load(tile: str):
+        min_latitude, min_longitude, max_latitude, max_longitude = tile_bounds(tile)
+        return db.query(
+            Plots.farm_id, Plots.coffee_variety_id, lat_index, lon_index,
+            func.count(), func.sum(Plots.latitude), func.sum(Plots.longitude)
+        ).filter(
+            Plots.plot_state_id == active_plot_state_id,
+            Plots.latitude.between(min_latitude, max_latitude),
+            Plots.longitude.between(min_longitude, max_longitude)
+        ).group_by(
+            Plots.farm_id, Plots.coffee_variety_id, lat_index, lon_index
+        ).all()
+    return load
+
+def get_plot_clusters(
+    min_latitude: float,
+    min_longitude: float,
+    max_latitude: float,
+    max_longitude: float,
+    zoom: int,
+    user,
+    db: Session
+):
+    """
+    Lógica de negocio para obtener los lotes activos de un área del mapa
+    agrupados por geohash, con una precisión que depende del nivel de zoom.
+    Cada grupo trae la cantidad de lotes, su centroide y la variedad de café
+    predominante, y solo cuenta los lotes de las fincas en las que el usuario
+    puede ver lotes.
+
+    El área se divide en celdas de geohash un carácter más cortas que las de
+    los grupos; los grupos de cada celda se calculan una vez para todas las
+    fincas y se guardan en caché por (precisión, celda), de modo que el mismo
+    resultado sirve a todos los usuarios y a los niveles de zoom que comparten
+    precisión. Se retornan los grupos de las celdas completas que cubren el área.
+    """
+    if min_latitude > max_latitude:
+        return create_response("error", "La latitud mínima no puede ser mayor que la latitud máxima", status_code=400)
+
+    precision = precision_for_zoom(zoom)
+    tile_length = tile_precision(precision)
+    if count_covering_tiles(min_latitude, min_longitude, max_latitude, max_longitude, tile_length) > MAX_CLUSTER_TILES:
+        return create_response("error", "El área es demasiado grande para el nivel de zoom", status_code=400)
+
+    active_farm_state = get_state(db, "Activo", "Farms")
+    active_urf_state = get_state(db, "Activo", "user_role_farm")
+    active_plot_state = get_state(db, "Activo", "Plots")
+    if not active_farm_state or not active_urf_state or not active_plot_state:
+        logger.error("No se encontraron los estados 'Activo' para Farms, user_role_farm o Plots")
+        return create_response("error", "No se encontraron los estados 'Activo' requeridos", status_code=400)
+
+    try:
+        farm_ids = get_readable_farm_ids(user, db, active_farm_state, active_urf_state)
+    except Exception as e:
+        logger.error("No se pudieron obtener los roles o permisos del usuario: %s", str(e))
+        return create_response("error", "No se pudieron obtener los roles del usuario", status_code=500)
+
+    clusters = []
+    if farm_ids:
+        loader = _tile_cells_loader(db, active_plot_state.plot_state_id, precision)
+        tiles = [
+            get_tile_clusters(precision, tile, loader)
+            for tile in covering_tiles(min_latitude, min_longitude, max_latitude, max_longitude, tile_length)
+        ]
+        clusters = merge_clusters(tiles, farm_ids, precision)
+
+    variety_ids = {cluster["dominant_coffee_variety_id"] for cluster in clusters}
+    variety_names = dict(
+        db.query(CoffeeVarieties.coffee_variety_id, CoffeeVarieties.name).filter(
+            CoffeeVarieties.coffee_variety_id.in_(list(variety_ids))
+        ).all()
+    ) if variety_ids else {}
+    for cluster in clusters:
+        cluster["dominant_coffee_variety_name"] = variety_names.get(cluster["dominant_coffee_variety_id"])
+
+    return create_response("success", "Grupos de lotes obtenidos exitosamente", {
+        "precision": precision,
+        "clusters": clusters
+    })
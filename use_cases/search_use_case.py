@@ -0,0 +1,169 @@
+from typing import List, Optional
+import logging
+import os
+
+from sqlalchemy import Integer, cast, func, literal, null, select, text, union_all
+from sqlalchemy.orm import Session
+
+from models.models import Farms, Plots, UserRoleFarm
+from utils.response import create_response
+from utils.state import get_state
+from utils.trigram_index import TrigramIndex, normalize_name
+from adapters.user_client import get_user_role_ids
+from use_cases.viewport_plots_use_case import get_readable_farm_ids
+
+logger = logging.getLogger(__name__)
+
+# 'auto' usa los índices de pg_trgm si la migración pudo crearlos; 'postgres' o 'python' fuerzan uno de los dos
+NAME_SEARCH_BACKEND = os.getenv("NAME_SEARCH_BACKEND", "auto").lower()
+
+MIN_SEARCH_QUERY_LENGTH = 3
+DEFAULT_SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+
+_trigram_search_available: Optional[bool] = None
+
+def _use_trigram_search(db: Session) -> bool:
+    """Indica si la base tiene la función `immutable_unaccent` de la migración 0007 (se consulta una vez)."""
+    global _trigram_search_available
+    if NAME_SEARCH_BACKEND != "auto":
+        return NAME_SEARCH_BACKEND == "postgres"
+    if _trigram_search_available is None:
+        _trigram_search_available = bool(
+            db.execute(text("SELECT to_regprocedure('immutable_unaccent(text)') IS NOT NULL")).scalar()
+        )
+        if not _trigram_search_available:
+            logger.warning("No están los índices de trigramas; la búsqueda por nombre usa el índice en memoria")
+    return _trigram_search_available
+
+def get_member_farm_ids(user, db: Session, active_farm_state, active_urf_state) -> List[int]:
+    """Retorna los IDs de las fincas activas en las que el usuario tiene algún rol activo."""
+    user_role_ids = get_user_role_ids(user.user_id)
+    if not user_role_ids:
+        return []
+    rows = db.query(UserRoleFarm.farm_id).join(
+        Farms, UserRoleFarm.farm_id == Farms.farm_id
+    ).filter(
+        UserRoleFarm.user_role_id.in_(user_role_ids),
+        UserRoleFarm.user_role_farm_state_id == active_urf_state.user_role_farm_state_id,
+        Farms.farm_state_id == active_farm_state.farm_state_id
+    ).distinct().all()
+    return sorted(farm_id for (farm_id,) in rows)
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _search_with_trigram_indexes(query: str, farm_ids, plot_farm_ids, active_farm_state_id, active_plot_state_id, db: Session, limit: int, offset: int):
+    """
+    Búsqueda en Postgres: `lower(immutable_unaccent(name)) LIKE '%consulta%'`
+    sobre las mismas expresiones de los índices GIN de trigramas, ordenada por
+    `similarity()` de pg_trgm.
+    """
+    def normalize(expression):
+        return func.lower(func.immutable_unaccent(expression))
+
+    normalized_query = normalize(literal(query))
+    # `||` (y no concat(), que es STABLE) para que el patrón se calcule al planificar y se use el índice
+    pattern = literal("%").op("||")(normalize(literal(_escape_like(query)))).op("||")(literal("%"))
+
+    def name_match(column):
+        normalized = normalize(column)
+        return normalized.like(pattern, escape="\\"), func.similarity(normalized, normalized_query)
+
+    farm_match, farm_similarity = name_match(Farms.name)
+    plot_match, plot_similarity = name_match(Plots.name)
+    selects = []
+    if farm_ids:
+        selects.append(select(
+            literal("farm").label("type"), Farms.farm_id.label("farm_id"), cast(null(), Integer).label("plot_id"),
+            Farms.name.label("name"), farm_similarity.label("similarity")
+        ).where(Farms.farm_id.in_(farm_ids), Farms.farm_state_id == active_farm_state_id, farm_match))
+    if plot_farm_ids:
+        selects.append(select(
+            literal("plot").label("type"), Plots.farm_id.label("farm_id"), Plots.plot_id.label("plot_id"),
+            Plots.name.label("name"), plot_similarity.label("similarity")
+        ).where(Plots.farm_id.in_(plot_farm_ids), Plots.plot_state_id == active_plot_state_id, plot_match))
+    if not selects:
+        return []
+
+    results = union_all(*selects).subquery()
+    rows = db.execute(
+        select(results).order_by(
+            results.c.similarity.desc(), results.c.type, results.c.farm_id, results.c.plot_id
+        ).limit(limit).offset(offset)
+    ).all()
+    return [(row.type, row.farm_id, row.plot_id, row.name, float(row.similarity)) for row in rows]
+
+def _search_with_memory_index(query: str, farm_ids, plot_farm_ids, active_farm_state_id, active_plot_state_id, db: Session, limit: int, offset: int):
+    """Búsqueda de respaldo: carga los nombres candidatos y los busca con un TrigramIndex en memoria."""
+    index = TrigramIndex()
+    names = {}
+    if farm_ids:
+        for farm_id, name in db.query(Farms.farm_id, Farms.name).filter(
+            Farms.farm_id.in_(farm_ids), Farms.farm_state_id == active_farm_state_id
+        ).all():
+            names[("farm", farm_id, None)] = name
+    if plot_farm_ids:
+        for farm_id, plot_id, name in db.query(Plots.farm_id, Plots.plot_id, Plots.name).filter(
+            Plots.farm_id.in_(plot_farm_ids), Plots.plot_state_id == active_plot_state_id
+        ).all():
+            names[("plot", farm_id, plot_id)] = name
+    for key, name in names.items():
+        index.add(key, name)
+
+    # Mismo orden que la consulta en Postgres: similitud, tipo, finca y lote
+    matches = sorted(index.search(query), key=lambda match: (-match[1], match[0][0], match[0][1], match[0][2] or 0))
+    return [(kind, farm_id, plot_id, names[(kind, farm_id, plot_id)], similarity)
+            for (kind, farm_id, plot_id), similarity in matches[offset:offset + limit]]
+
+def search_farms_and_plots(query: str, user, db: Session, limit: int = DEFAULT_SEARCH_PAGE_SIZE, offset: int = 0):
+    """
+    Lógica de negocio para buscar fincas y lotes cuyo nombre contiene el
+    texto buscado, sin distinguir mayúsculas ni tildes.
+
+    Se buscan las fincas activas a las que pertenece el usuario y los lotes
+    activos de las fincas en las que puede ver lotes ('read_plots'). Los
+    resultados se ordenan por similitud de trigramas con la consulta y se
+    paginan con `limit` y `offset`; `next_offset` es None en la última página.
+    """
+    query = (query or "").strip()
+    if len(normalize_name(query)) < MIN_SEARCH_QUERY_LENGTH:
+        return create_response(
+            "error", f"La búsqueda debe tener al menos {MIN_SEARCH_QUERY_LENGTH} caracteres", status_code=400
+        )
+
+    active_farm_state = get_state(db, "Activo", "Farms")
+    active_urf_state = get_state(db, "Activo", "user_role_farm")
+    active_plot_state = get_state(db, "Activo", "Plots")
+    if not active_farm_state or not active_urf_state or not active_plot_state:
+        logger.error("No se encontraron los estados 'Activo' para Farms, user_role_farm o Plots")
+        return create_response("error", "No se encontraron los estados 'Activo' requeridos", status_code=400)
+
+    try:
+        farm_ids = get_member_farm_ids(user, db, active_farm_state, active_urf_state)
+        plot_farm_ids = get_readable_farm_ids(user, db, active_farm_state, active_urf_state) if farm_ids else []
+    except Exception as e:
+        logger.error("No se pudieron obtener los roles o permisos del usuario: %s", str(e))
+        return create_response("error", "No se pudieron obtener los roles del usuario", status_code=500)
+
+    search = _search_with_trigram_indexes if _use_trigram_search(db) else _search_with_memory_index
+    # Se pide un resultado extra para saber si hay una página siguiente
+    rows = search(
+        query, farm_ids, plot_farm_ids, active_farm_state.farm_state_id, active_plot_state.plot_state_id,
+        db, limit + 1, offset
+    )
+    has_more = len(rows) > limit
+    results = [
+        {
+            "type": kind,
+            "farm_id": farm_id,
+            "plot_id": plot_id,
+            "name": name,
+            "similarity": round(similarity, 4)
+        }
+        for kind, farm_id, plot_id, name, similarity in rows[:limit]
+    ]
+    return create_response("success", "Búsqueda realizada exitosamente", {
+        "results": results,
+        "next_offset": offset + limit if has_more else None
+    })
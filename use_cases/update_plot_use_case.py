@@ -5,6 +5,8 @@ from models.models import Plots, Farms, UserRoleFarm, CoffeeVarieties
 import logging
 from adapters.user_client import get_user_role_ids, get_role_permissions_for_user_role
 from sqlalchemy.orm import Session
+from utils.farm_summary import refresh_farm_summary
+from adapters.plot_spatial_index import publish_plot_change
 
 logger = logging.getLogger(__name__)
 
@@ -96,6 +98,8 @@ def update_plot_general_info(request, user, db: Session):
     try:
         plot.name = request.name
         plot.coffee_variety_id = coffee_variety.coffee_variety_id
+        refresh_farm_summary(db, plot.farm_id, active_plot_state.plot_state_id)
+        publish_plot_change(db, plot)
 
         db.commit()
         db.refresh(plot)
@@ -171,6 +175,8 @@ def update_plot_location(request, user, db):
         plot.latitude = request.latitude
         plot.longitude = request.longitude
         plot.altitude = request.altitude
+        refresh_farm_summary(db, plot.farm_id, active_plot_state.plot_state_id)
+        publish_plot_change(db, plot)
         db.commit()
         db.refresh(plot)
         logger.info("Ubicación del lote actualizada exitosamente con ID: %s", plot.plot_id)
@@ -0,0 +1,121 @@
+from typing import List, Optional
+import logging
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from models.models import Farms, Plots, UserRoleFarm
+from utils.response import create_response
+from utils.state import get_state
+from adapters.user_client import get_user_role_ids, get_role_permissions_for_user_role
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VIEWPORT_PAGE_SIZE = 200
+MAX_VIEWPORT_PAGE_SIZE = 1000
+
+def get_readable_farm_ids(user, db: Session, active_farm_state, active_urf_state) -> List[int]:
+    """
+    Retorna los IDs de las fincas activas en las que algún rol activo del
+    usuario tiene el permiso 'read_plots'. Los permisos se consultan una vez
+    por rol (no por finca).
+    """
+    user_role_ids = get_user_role_ids(user.user_id)
+    if not user_role_ids:
+        return []
+
+    memberships = db.query(UserRoleFarm.user_role_id, UserRoleFarm.farm_id).join(
+        Farms, UserRoleFarm.farm_id == Farms.farm_id
+    ).filter(
+        UserRoleFarm.user_role_id.in_(user_role_ids),
+        UserRoleFarm.user_role_farm_state_id == active_urf_state.user_role_farm_state_id,
+        Farms.farm_state_id == active_farm_state.farm_state_id
+    ).all()
+
+    readable_roles = {}
+    farm_ids = set()
+    for user_role_id, farm_id in memberships:
+        if user_role_id not in readable_roles:
+            readable_roles[user_role_id] = "read_plots" in get_role_permissions_for_user_role(user_role_id)
+        if readable_roles[user_role_id]:
+            farm_ids.add(farm_id)
+    return sorted(farm_ids)
+
+def _longitude_filter(min_longitude: float, max_longitude: float):
+    """
+    Filtro de longitud del rectángulo. Si `min_longitude` es mayor que
+    `max_longitude` el rectángulo cruza el antimeridiano (±180°) y se
+    compone de dos rangos.
+    """
+    if min_longitude <= max_longitude:
+        return Plots.longitude.between(min_longitude, max_longitude)
+    return or_(Plots.longitude >= min_longitude, Plots.longitude <= max_longitude)
+
+def list_plots_in_viewport(
+    min_latitude: float,
+    min_longitude: float,
+    max_latitude: float,
+    max_longitude: float,
+    user,
+    db: Session,
+    limit: int = DEFAULT_VIEWPORT_PAGE_SIZE,
+    cursor: Optional[int] = None
+):
+    """
+    Lógica de negocio para obtener los lotes activos cuyas coordenadas caen en
+    un rectángulo del mapa, solo de las fincas en las que el usuario puede ver lotes.
+
+    Los resultados se paginan por `plot_id` (paginación por clave): cada página
+    retorna `next_cursor`, que se envía como `cursor` para pedir la siguiente,
+    o None si no hay más lotes.
+    """
+    if min_latitude > max_latitude:
+        return create_response("error", "La latitud mínima no puede ser mayor que la latitud máxima", status_code=400)
+
+    active_farm_state = get_state(db, "Activo", "Farms")
+    active_urf_state = get_state(db, "Activo", "user_role_farm")
+    active_plot_state = get_state(db, "Activo", "Plots")
+    if not active_farm_state or not active_urf_state or not active_plot_state:
+        logger.error("No se encontraron los estados 'Activo' para Farms, user_role_farm o Plots")
+        return create_response("error", "No se encontraron los estados 'Activo' requeridos", status_code=400)
+
+    try:
+        farm_ids = get_readable_farm_ids(user, db, active_farm_state, active_urf_state)
+    except Exception as e:
+        logger.error("No se pudieron obtener los roles o permisos del usuario: %s", str(e))
+        return create_response("error", "No se pudieron obtener los roles del usuario", status_code=500)
+
+    if not farm_ids:
+        return create_response("success", "Lotes del área obtenidos exitosamente", {"plots": [], "next_cursor": None})
+
+    filters = [
+        Plots.farm_id.in_(farm_ids),
+        Plots.plot_state_id == active_plot_state.plot_state_id,
+        Plots.latitude.between(min_latitude, max_latitude),
+        _longitude_filter(min_longitude, max_longitude)
+    ]
+    if cursor is not None:
+        filters.append(Plots.plot_id > cursor)
+
+    # Se pide una fila extra para saber si hay una página siguiente
+    rows = db.query(
+        Plots.plot_id, Plots.farm_id, Plots.name, Plots.coffee_variety_id,
+        Plots.latitude, Plots.longitude, Plots.altitude
+    ).filter(and_(*filters)).order_by(Plots.plot_id).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    plots = [
+        {
+            "plot_id": row.plot_id,
+            "farm_id": row.farm_id,
+            "name": row.name,
+            "coffee_variety_id": row.coffee_variety_id,
+            "latitude": row.latitude,
+            "longitude": row.longitude,
+            "altitude": row.altitude
+        }
+        for row in rows
+    ]
+    next_cursor = rows[-1].plot_id if has_more else None
+    return create_response("success", "Lotes del área obtenidos exitosamente", {"plots": plots, "next_cursor": next_cursor})
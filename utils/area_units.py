@@ -0,0 +1,73 @@
+from typing import Dict, Iterable, Optional
+import logging
+import unicodedata
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from models.models import AreaUnits
+
+logger = logging.getLogger(__name__)
+
+# Hectáreas por unidad, según el nombre o la abreviatura normalizados (ver `_normalize`).
+# Cuadra, fanegada y plaza se toman con su valor usual en Colombia (6.400 m²).
+KNOWN_HECTARES_PER_UNIT = {
+    "ha": 1.0, "hectarea": 1.0, "hectareas": 1.0,
+    "m2": 0.0001, "metrocuadrado": 0.0001, "metroscuadrados": 0.0001,
+    "km2": 100.0, "kilometrocuadrado": 100.0, "kilometroscuadrados": 100.0,
+    "ac": 0.40468564224, "acre": 0.40468564224, "acres": 0.40468564224,
+    "cuadra": 0.64, "cuadras": 0.64,
+    "fanegada": 0.64, "fanegadas": 0.64, "fan": 0.64,
+    "plaza": 0.64, "plazas": 0.64,
+}
+
+
+def _normalize(value: Optional[str]) -> str:
+    """Minúsculas, sin tildes, espacios ni puntos, y '²' como '2' (por ejemplo 'Metros cuadrados' -> 'metroscuadrados')."""
+    value = unicodedata.normalize("NFKD", (value or "").replace("²", "2"))
+    return "".join(char for char in value.lower() if char.isalnum() and not unicodedata.combining(char))
+
+
+def known_hectares_per_unit(name: Optional[str], abbreviation: Optional[str]) -> Optional[float]:
+    """Factor de conversión a hectáreas de una unidad conocida, o None si no se reconoce."""
+    for value in (abbreviation, name):
+        factor = KNOWN_HECTARES_PER_UNIT.get(_normalize(value))
+        if factor is not None:
+            return factor
+    return None
+
+
+def load_hectare_factors(db: Session) -> Dict[int, float]:
+    """
+    Factor a hectáreas de cada unidad de área: el de la columna
+    `hectares_per_unit` o, si está vacía, el de una unidad conocida. Las
+    unidades sin factor no se incluyen.
+    """
+    factors = {}
+    for area_unit_id, name, abbreviation, hectares_per_unit in db.query(
+        AreaUnits.area_unit_id, AreaUnits.name, AreaUnits.abbreviation, AreaUnits.hectares_per_unit
+    ).all():
+        factor = float(hectares_per_unit) if hectares_per_unit is not None else known_hectares_per_unit(name, abbreviation)
+        if factor is None:
+            logger.warning("La unidad de área %s (%s) no tiene factor de conversión a hectáreas", area_unit_id, name)
+            continue
+        factors[area_unit_id] = factor
+    return factors
+
+
+def to_hectares(areas: Iterable, area_unit_ids: Iterable[int], factors: Dict[int, float]) -> np.ndarray:
+    """
+    Convierte a hectáreas un arreglo de áreas con sus unidades en una sola
+    pasada vectorizada: el factor de cada fila se busca con `np.searchsorted`
+    sobre los ids de unidad ordenados. Las áreas con una unidad sin factor
+    quedan como NaN.
+    """
+    areas = np.asarray(list(areas), dtype=np.float64)
+    area_unit_ids = np.asarray(list(area_unit_ids), dtype=np.int64)
+    if not factors or not len(areas):
+        return np.full(len(areas), np.nan)
+    unit_ids = np.fromiter(sorted(factors), dtype=np.int64, count=len(factors))
+    unit_factors = np.array([factors[unit_id] for unit_id in unit_ids], dtype=np.float64)
+    positions = np.minimum(np.searchsorted(unit_ids, area_unit_ids), len(unit_ids) - 1)
+    known = unit_ids[positions] == area_unit_ids
+    return np.where(known, areas * unit_factors[positions], np.nan)
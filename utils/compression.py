@@ -0,0 +1,218 @@
+import gzip
+import os
+import zlib
+from typing import Optional
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Tamaño mínimo (en bytes) a partir del cual vale la pena comprimir una respuesta.
+# Por debajo de ~1 KB la respuesta cabe en un solo paquete TCP y comprimirla no
+# reduce la latencia (ver benchmarks/compression_benchmark.py).
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+EXCLUDED_CONTENT_TYPES = ("text/event-stream", "image/", "video/", "audio/", "application/zip", "application/gzip")
+
+# Orden de preferencia del servidor cuando el cliente acepta varias codificaciones con el mismo peso
+SUPPORTED_ENCODINGS = ("br", "gzip")
+
+
+def select_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Elige la codificación de compresión a partir del encabezado `Accept-Encoding`.
+
+    Respeta los valores de calidad (`q`) enviados por el cliente; ante un empate
+    se prefiere `br` sobre `gzip`. Un `q=0` excluye explícitamente la codificación.
+
+    Args:
+        accept_encoding (str): Valor del encabezado `Accept-Encoding`.
+
+    Returns:
+        Optional[str]: "br", "gzip" o None si no se debe comprimir.
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[token] = quality
+
+    wildcard = weights.get("*")
+    best, best_quality = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        quality = weights.get(encoding, wildcard if wildcard is not None else 0.0)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class _Compressor:
+    """Envuelve los compresores de gzip y brotli con una interfaz común para streaming."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits=31 produce el contenedor gzip (cabecera + CRC) en lugar de zlib crudo
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        """Comprime un fragmento y lo vacía para que el cliente lo reciba sin esperar al final."""
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH)
+
+
+def compress_body(body: bytes, encoding: str, gzip_level: int, brotli_quality: int) -> bytes:
+    """
+    Comprime un cuerpo de respuesta completo con la codificación indicada.
+
+    Args:
+        body (bytes): Cuerpo sin comprimir.
+        encoding (str): "br" o "gzip".
+        gzip_level (int): Nivel de compresión gzip (1-9).
+        brotli_quality (int): Calidad de compresión brotli (0-11).
+
+    Returns:
+        bytes: Cuerpo comprimido.
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI que comprime las respuestas según el encabezado `Accept-Encoding`.
+
+    - Negocia `br` o `gzip` (respetando los valores `q` del cliente).
+    - No comprime respuestas menores a `minimum_size` bytes.
+    - No toca respuestas que ya traen `Content-Encoding` ni tipos de contenido
+      que ya vienen comprimidos o que son eventos en tiempo real.
+    - Soporta respuestas en streaming (p. ej. NDJSON), vaciando el compresor
+      en cada fragmento para no retrasar la entrega.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MINIMUM_SIZE,
+        gzip_level: int = COMPRESSION_GZIP_LEVEL,
+        brotli_quality: int = COMPRESSION_BROTLI_QUALITY,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = select_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoding)
+        await self.app(scope, receive, responder.wrap(send))
+
+
+class _CompressionResponder:
+    """Estado de compresión de una única respuesta."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+        self.compressor: Optional[_Compressor] = None
+
+    def wrap(self, send: Send) -> Send:
+        async def send_wrapper(message: Message) -> None:
+            await self._send(message, send)
+        return send_wrapper
+
+    async def _send(self, message: Message, send: Send) -> None:
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            # Se retiene el inicio hasta conocer el primer fragmento del cuerpo
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = (
+                "content-encoding" in headers
+                or headers.get("content-type", "").startswith(EXCLUDED_CONTENT_TYPES)
+                or message["status"] in (204, 304)
+            )
+            return
+
+        if message_type != "http.response.body":
+            await send(message)
+            return
+
+        if self.passthrough:
+            if not self.started:
+                self.started = True
+                await send(self.initial_message)
+            await send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            self.started = True
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+
+            if not more_body and len(body) < self.middleware.minimum_size:
+                # Respuesta pequeña: comprimirla cuesta más de lo que ahorra
+                await send(self.initial_message)
+                await send(message)
+                return
+
+            headers.add_vary_header("Accept-Encoding")
+            headers["Content-Encoding"] = self.encoding
+
+            if not more_body:
+                body = compress_body(body, self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+                headers["Content-Length"] = str(len(body))
+                message["body"] = body
+            else:
+                # Streaming: el tamaño final no se conoce de antemano
+                del headers["Content-Length"]
+                self.compressor = _Compressor(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+                message["body"] = self.compressor.compress(body)
+
+            await send(self.initial_message)
+            await send(message)
+            return
+
+        if self.compressor is None:
+            await send(message)
+            return
+
+        if more_body:
+            message["body"] = self.compressor.compress(body)
+        else:
+            message["body"] = self.compressor.finish(body)
+        await send(message)
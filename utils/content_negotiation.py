@@ -0,0 +1,77 @@
+from contextvars import ContextVar
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+# Formato de respuesta negociado para la petición en curso
+_response_media_type: ContextVar[str] = ContextVar("response_media_type", default=JSON_MEDIA_TYPE)
+
+
+def _parse_accept(accept: str) -> dict:
+    """Convierte un encabezado `Accept` en un diccionario {media_type: calidad}."""
+    weights = {}
+    for part in accept.split(","):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        if not media_type:
+            continue
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        weights[media_type.lower()] = quality
+    return weights
+
+
+def select_media_type(accept: str) -> str:
+    """
+    Elige entre JSON y MessagePack a partir del encabezado `Accept`.
+
+    MessagePack solo se usa cuando el cliente lo pide explícitamente y con un peso
+    mayor o igual al de JSON; en cualquier otro caso se mantiene JSON, de modo que
+    los clientes actuales no cambian de comportamiento.
+
+    Args:
+        accept (str): Valor del encabezado `Accept`.
+
+    Returns:
+        str: `application/msgpack` o `application/json`.
+    """
+    weights = _parse_accept(accept)
+    msgpack_quality = max((weights.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES), default=0.0)
+    if msgpack_quality <= 0:
+        return JSON_MEDIA_TYPE
+    json_quality = weights.get(JSON_MEDIA_TYPE, weights.get("application/*", weights.get("*/*", 0.0)))
+    return MSGPACK_MEDIA_TYPE if msgpack_quality >= json_quality else JSON_MEDIA_TYPE
+
+
+def get_response_media_type() -> str:
+    """Retorna el formato de respuesta negociado para la petición en curso."""
+    return _response_media_type.get()
+
+
+class ContentNegotiationMiddleware:
+    """
+    Middleware ASGI que lee el encabezado `Accept` y deja el formato negociado
+    disponible para `create_response` y la clase de respuesta por defecto.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = _response_media_type.set(select_media_type(Headers(scope=scope).get("accept", "")))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _response_media_type.reset(token)
@@ -0,0 +1,60 @@
+from contextvars import ContextVar
+from typing import Optional
+import os
+import time
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Tiempo máximo que una petición puede dedicar a llamadas a otros servicios
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "15"))
+# Encabezado opcional con el que el cliente puede pedir un plazo menor (en segundos)
+REQUEST_TIMEOUT_HEADER = "x-request-timeout"
+
+_request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+def _parse_timeout(value: str) -> Optional[float]:
+    try:
+        timeout = float(value)
+    except (TypeError, ValueError):
+        return None
+    return timeout if timeout > 0 else None
+
+
+def get_remaining_time() -> Optional[float]:
+    """
+    Retorna los segundos que le quedan a la petición en curso antes de su plazo,
+    o None si no hay un plazo definido (por ejemplo, fuera de una petición HTTP).
+    """
+    deadline = _request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+class DeadlineMiddleware:
+    """
+    Middleware ASGI que fija el plazo de la petición en curso. Las llamadas al
+    servicio de usuarios lo usan para limitar sus timeouts y reintentos.
+    """
+
+    def __init__(self, app: ASGIApp, deadline_seconds: float = REQUEST_DEADLINE_SECONDS) -> None:
+        self.app = app
+        self.deadline_seconds = deadline_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        seconds = self.deadline_seconds
+        requested = _parse_timeout(Headers(scope=scope).get(REQUEST_TIMEOUT_HEADER))
+        if requested is not None:
+            seconds = min(seconds, requested)
+
+        token = _request_deadline.set(time.monotonic() + seconds)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_deadline.reset(token)
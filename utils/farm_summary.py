@@ -0,0 +1,115 @@
+from typing import Iterable, Optional
+import logging
+
+from sqlalchemy import String, cast, delete, func, literal_column, select
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
+from sqlalchemy.orm import Session
+
+from models.models import Farms, FarmSummary, Plots
+from utils.state import get_state
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_COLUMNS = ["farm_id", "active_plot_count", "variety_counts", "min_altitude", "max_altitude", "avg_altitude", "updated_at"]
+
+
+def _summary_select(active_plot_state_id: int, farm_ids: Optional[Iterable[int]] = None, active_farm_state_id: Optional[int] = None):
+    """
+    Consulta que calcula desde cero el resumen de las fincas indicadas (o de
+    todas) a partir de sus lotes activos. Retorna las columnas de SUMMARY_COLUMNS.
+    """
+    plot_filters = [Plots.plot_state_id == active_plot_state_id]
+    farm_filters = []
+    if farm_ids is not None:
+        farm_ids = list(farm_ids)
+        plot_filters.append(Plots.farm_id.in_(farm_ids))
+        farm_filters.append(Farms.farm_id.in_(farm_ids))
+    if active_farm_state_id is not None:
+        farm_filters.append(Farms.farm_state_id == active_farm_state_id)
+
+    stats = select(
+        Plots.farm_id,
+        func.count().label("active_plot_count"),
+        func.min(Plots.altitude).label("min_altitude"),
+        func.max(Plots.altitude).label("max_altitude"),
+        func.round(func.avg(Plots.altitude), 2).label("avg_altitude")
+    ).where(*plot_filters).group_by(Plots.farm_id).subquery()
+
+    per_variety = select(
+        Plots.farm_id,
+        Plots.coffee_variety_id,
+        func.count().label("plot_count")
+    ).where(*plot_filters).group_by(Plots.farm_id, Plots.coffee_variety_id).subquery()
+
+    varieties = select(
+        per_variety.c.farm_id,
+        func.jsonb_object_agg(cast(per_variety.c.coffee_variety_id, String), per_variety.c.plot_count).label("variety_counts")
+    ).group_by(per_variety.c.farm_id).subquery()
+
+    return select(
+        Farms.farm_id,
+        func.coalesce(stats.c.active_plot_count, 0),
+        func.coalesce(varieties.c.variety_counts, cast(literal_column("'{}'"), JSONB)),
+        stats.c.min_altitude,
+        stats.c.max_altitude,
+        stats.c.avg_altitude,
+        func.now()
+    ).outerjoin(stats, stats.c.farm_id == Farms.farm_id).outerjoin(
+        varieties, varieties.c.farm_id == Farms.farm_id
+    ).where(*farm_filters)
+
+
+def _upsert_summaries(db: Session, summary_select):
+    statement = pg_insert(FarmSummary).from_select(SUMMARY_COLUMNS, summary_select)
+    statement = statement.on_conflict_do_update(
+        index_elements=[FarmSummary.farm_id],
+        set_={column: statement.excluded[column] for column in SUMMARY_COLUMNS if column != "farm_id"}
+    )
+    db.execute(statement)
+
+
+def refresh_farm_summary(db: Session, farm_id: int, active_plot_state_id: Optional[int] = None):
+    """
+    Recalcula el resumen de una finca dentro de la transacción en curso.
+
+    Debe llamarse después de modificar sus lotes y antes de `db.commit()`, de
+    modo que el resumen se confirma (o se descarta) junto con el cambio. La
+    fila de la finca se bloquea primero para que dos transacciones que
+    modifican lotes de la misma finca no se pisen el resumen: la segunda
+    espera a que la primera confirme y recalcula viendo sus cambios.
+    """
+    if active_plot_state_id is None:
+        active_plot_state_id = get_state(db, "Activo", "Plots").plot_state_id
+    db.flush()
+    db.execute(select(Farms.farm_id).where(Farms.farm_id == farm_id).with_for_update(key_share=True))
+    _upsert_summaries(db, _summary_select(active_plot_state_id, farm_ids=[farm_id]))
+
+
+def delete_farm_summary(db: Session, farm_id: int):
+    """Elimina el resumen de una finca (por ejemplo, al inactivarla)."""
+    db.execute(delete(FarmSummary).where(FarmSummary.farm_id == farm_id))
+
+
+def rebuild_farm_summaries(db: Session) -> int:
+    """
+    Reconstruye desde cero el resumen de todas las fincas activas en una sola
+    transacción, descartando las filas existentes. Sirve para poblar la tabla
+    por primera vez o para corregir cualquier desviación.
+
+    Returns:
+        int: Cantidad de fincas resumidas.
+    """
+    active_plot_state = get_state(db, "Activo", "Plots")
+    active_farm_state = get_state(db, "Activo", "Farms")
+    if not active_plot_state or not active_farm_state:
+        raise RuntimeError("No se encontraron los estados 'Activo' para Plots y Farms")
+    try:
+        db.execute(delete(FarmSummary))
+        _upsert_summaries(db, _summary_select(active_plot_state.plot_state_id, active_farm_state_id=active_farm_state.farm_state_id))
+        count = db.query(func.count(FarmSummary.farm_id)).scalar()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    logger.info("Resumen de fincas reconstruido para %s fincas", count)
+    return count
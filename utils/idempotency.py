@@ -0,0 +1,221 @@
+"""
+Soporte para el encabezado `Idempotency-Key` en los endpoints de creación.
+
+La primera petición con una clave reserva un registro en `idempotency_keys` y,
+al terminar, guarda la respuesta. Los reintentos con la misma clave (para el
+mismo token de sesión y endpoint) dentro de la ventana configurada reciben la
+respuesta guardada con una sola consulta, sin repetir la validación ni las
+llamadas al servicio de usuarios.
+
+Mientras la primera petición se ejecuta, el registro queda reservado durante
+`IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS`. Si el proceso muere antes de guardar
+la respuesta, pasado ese plazo un reintento recupera la clave y vuelve a
+ejecutar la operación.
+
+El formato de respuesta negociado (`Accept`) forma parte de la huella de la
+petición: un reintento que pide otro formato recibe un 422 en lugar de la
+respuesta guardada en el formato del primer intento.
+
+Las claves expiradas se purgan por lotes, como mucho una vez cada
+`IDEMPOTENCY_PURGE_INTERVAL_SECONDS` por proceso, al reservar una clave nueva.
+"""
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from fastapi.responses import Response
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from models.models import IdempotencyKeys
+from utils.content_negotiation import get_response_media_type
+from utils.response import create_response
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_REPLAYED_HEADER = "Idempotent-Replayed"
+IDEMPOTENCY_KEY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS = int(os.getenv("IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS", "60"))
+IDEMPOTENCY_PURGE_INTERVAL_SECONDS = int(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "300"))
+IDEMPOTENCY_PURGE_BATCH_SIZE = int(os.getenv("IDEMPOTENCY_PURGE_BATCH_SIZE", "1000"))
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+# Instante (reloj monotónico) a partir del cual este proceso vuelve a purgar claves expiradas
+_next_purge_at = 0.0
+
+def _sha256(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+def _is_storable(response) -> bool:
+    """
+    Solo se guardan respuestas definitivas. Los errores 5xx y el 401 (que también
+    se produce cuando el servicio de usuarios no responde) se pueden reintentar.
+    """
+    return (
+        isinstance(response, Response)
+        and hasattr(response, "body")
+        and response.status_code < 500
+        and response.status_code != 401
+    )
+
+def _replay(record: IdempotencyKeys) -> Response:
+    return Response(
+        content=record.response_body,
+        status_code=record.status_code,
+        media_type=record.media_type,
+        headers={IDEMPOTENCY_REPLAYED_HEADER: "true", "Vary": "Accept"}
+    )
+
+def _is_reclaimable(record: IdempotencyKeys, now: datetime) -> bool:
+    """
+    Una clave se puede volver a reservar si su ventana expiró o si sigue en curso
+    (sin respuesta) más allá del plazo de reserva, porque el proceso que la
+    reservó terminó sin guardar la respuesta ni liberarla.
+    """
+    if record.expires_at <= now:
+        return True
+    return record.status_code is None and record.created_at <= now - timedelta(seconds=IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS)
+
+def purge_expired_keys(db: Session, now: datetime, batch_size: int = IDEMPOTENCY_PURGE_BATCH_SIZE) -> int:
+    """
+    Elimina un lote de claves cuya ventana expiró (usa el índice de `expires_at`).
+    Las filas bloqueadas por otro proceso que purga a la vez se omiten.
+
+    Returns:
+        int: Cantidad de claves eliminadas.
+    """
+    expired = select(IdempotencyKeys.idempotency_key_id).where(
+        IdempotencyKeys.expires_at < now
+    ).limit(batch_size).with_for_update(skip_locked=True).scalar_subquery()
+    result = db.execute(
+        delete(IdempotencyKeys).where(IdempotencyKeys.idempotency_key_id.in_(expired)),
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
+    return result.rowcount
+
+def _purge_if_due(db: Session, now: datetime):
+    """Purga un lote de claves expiradas si ya pasó el intervalo; si el lote salió lleno, purga otro en la próxima reserva."""
+    global _next_purge_at
+    if time.monotonic() < _next_purge_at:
+        return
+    _next_purge_at = time.monotonic() + IDEMPOTENCY_PURGE_INTERVAL_SECONDS
+    try:
+        deleted = purge_expired_keys(db, now)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"No se pudieron purgar las claves de idempotencia expiradas: {str(e)}")
+        return
+    if deleted:
+        logger.info(f"Se purgaron {deleted} claves de idempotencia expiradas")
+    if deleted >= IDEMPOTENCY_PURGE_BATCH_SIZE:
+        _next_purge_at = 0.0
+
+def _claim(db: Session, key: str, scope: str, endpoint: str, request_hash: str, now: datetime) -> Optional[int]:
+    """Reserva la clave; retorna el ID del registro o None si la clave ya existe."""
+    statement = pg_insert(IdempotencyKeys).values(
+        key=key,
+        scope=scope,
+        endpoint=endpoint,
+        request_hash=request_hash,
+        # La hora de la reserva se toma del mismo reloj que el plazo de reserva
+        created_at=now,
+        expires_at=now + timedelta(seconds=IDEMPOTENCY_KEY_TTL_SECONDS)
+    ).on_conflict_do_nothing(
+        index_elements=[IdempotencyKeys.key, IdempotencyKeys.scope, IdempotencyKeys.endpoint]
+    ).returning(IdempotencyKeys.idempotency_key_id)
+    key_id = db.execute(statement).scalar_one_or_none()
+    db.commit()
+    _purge_if_due(db, now)
+    return key_id
+
+def _release(db: Session, key_id: int):
+    """Libera la clave para que un reintento vuelva a ejecutar la operación."""
+    try:
+        db.rollback()
+        db.execute(delete(IdempotencyKeys).where(IdempotencyKeys.idempotency_key_id == key_id))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"No se pudo liberar la clave de idempotencia {key_id}: {str(e)}")
+
+def run_idempotent(
+    db: Session,
+    idempotency_key: Optional[str],
+    session_token: str,
+    endpoint: str,
+    request_fingerprint: str,
+    operation: Callable[[], Response]
+):
+    """
+    Ejecuta `operation` una sola vez por `Idempotency-Key`.
+
+    Args:
+        db (Session): Sesión de base de datos.
+        idempotency_key (str, optional): Valor del encabezado; si no se envía, la operación se ejecuta normalmente.
+        session_token (str): Token de sesión; su hash delimita el alcance de la clave.
+        endpoint (str): Nombre del endpoint protegido.
+        request_fingerprint (str): Representación del cuerpo de la petición, para detectar claves reutilizadas con otros datos.
+        operation (Callable): Función que ejecuta la creación y retorna la respuesta.
+
+    Returns:
+        Response: La respuesta de la operación o la respuesta guardada del primer intento.
+    """
+    if not idempotency_key:
+        return operation()
+    if len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+        return create_response("error", f"El encabezado {IDEMPOTENCY_KEY_HEADER} no puede tener más de {MAX_IDEMPOTENCY_KEY_LENGTH} caracteres", status_code=400)
+
+    scope = _sha256(session_token)
+    # La respuesta guardada se reenvía tal cual, así que el formato negociado es parte de la petición
+    request_hash = _sha256(f"{get_response_media_type()}\n{request_fingerprint}")
+    now = datetime.now(timezone.utc)
+
+    key_id = _claim(db, idempotency_key, scope, endpoint, request_hash, now)
+    if key_id is None:
+        record = db.query(IdempotencyKeys).filter(
+            IdempotencyKeys.key == idempotency_key,
+            IdempotencyKeys.scope == scope,
+            IdempotencyKeys.endpoint == endpoint
+        ).first()
+        if record and _is_reclaimable(record, now):
+            # Ventana expirada o reserva abandonada: se descarta el registro y la petición se trata como nueva
+            db.execute(delete(IdempotencyKeys).where(IdempotencyKeys.idempotency_key_id == record.idempotency_key_id))
+            db.commit()
+            key_id = _claim(db, idempotency_key, scope, endpoint, request_hash, now)
+            record = None
+        if key_id is None:
+            if record is not None and record.request_hash != request_hash:
+                return create_response("error", f"El encabezado {IDEMPOTENCY_KEY_HEADER} ya se usó con una petición o un formato de respuesta diferente", status_code=422)
+            if record is None or record.status_code is None:
+                logger.info(f"Petición con {IDEMPOTENCY_KEY_HEADER} en curso para {endpoint}")
+                return create_response("error", "Ya hay una petición en curso con esta clave de idempotencia", status_code=409)
+            logger.info(f"Reenviando respuesta guardada de {endpoint} para una clave de idempotencia")
+            return _replay(record)
+
+    try:
+        response = operation()
+    except Exception:
+        _release(db, key_id)
+        raise
+
+    if not _is_storable(response):
+        _release(db, key_id)
+        return response
+
+    try:
+        db.execute(update(IdempotencyKeys).where(IdempotencyKeys.idempotency_key_id == key_id).values(
+            status_code=response.status_code,
+            media_type=response.media_type,
+            response_body=response.body
+        ))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"No se pudo guardar la respuesta para la clave de idempotencia: {str(e)}")
+    return response
@@ -0,0 +1,261 @@
+from typing import Callable, Iterable, List, Optional
+import logging
+
+from sqlalchemy import Index, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from models.models import FarmSummary, IdempotencyKeys, Plots, UserRoleFarm, UserRoleFarmStates
+from utils.area_units import known_hectares_per_unit
+from utils.farm_summary import rebuild_farm_summaries
+from utils.state import get_state
+
+logger = logging.getLogger(__name__)
+
+# Clave del advisory lock que evita que varios workers migren a la vez
+MIGRATIONS_LOCK_KEY = 7_361_024_042
+
+CREATE_MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version VARCHAR(64) PRIMARY KEY,
+    description VARCHAR(255) NOT NULL,
+    applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+)
+"""
+
+
+class Migration:
+    """
+    Cambio de esquema versionado. `apply` recibe una conexión en modo
+    AUTOCOMMIT, de modo que puede ejecutar sentencias que no admiten
+    transacciones, como CREATE INDEX CONCURRENTLY. Por eso cada migración
+    debe poder repetirse sin error si se interrumpe a mitad de camino.
+    """
+
+    def __init__(self, version: str, description: str, apply: Callable[[Connection], None]):
+        self.version = version
+        self.description = description
+        self.apply = apply
+
+
+def _drop_invalid_index(connection: Connection, name: str):
+    """
+    Un CREATE INDEX CONCURRENTLY que falla deja un índice marcado como inválido
+    que IF NOT EXISTS no volvería a construir; se elimina antes de reintentar.
+    """
+    invalid = connection.execute(
+        text(
+            "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": name}
+    ).first()
+    if invalid:
+        logger.warning(f"Eliminando el índice inválido '{name}' de un intento anterior")
+        connection.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+
+
+def create_index_concurrently(
+    connection: Connection,
+    name: str,
+    table: str,
+    columns: Iterable[str],
+    where: Optional[str] = None,
+    using: Optional[str] = None
+):
+    """
+    Crea un índice sin bloquear las escrituras sobre la tabla. Cada elemento
+    de `columns` es un nombre de columna o, entre paréntesis, una expresión
+    (que se usa tal cual, por ejemplo con su clase de operadores).
+    """
+    _drop_invalid_index(connection, name)
+    column_list = ", ".join(column if column.startswith("(") else f'"{column}"' for column in columns)
+    method = f" USING {using}" if using else ""
+    statement = f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON "{table}"{method} ({column_list})'
+    if where:
+        statement += f" WHERE {where}"
+    logger.info(f"Creando el índice '{name}' sobre '{table}'")
+    connection.execute(text(statement))
+
+
+def create_model_index(connection: Connection, index: Index, where: Optional[str] = None):
+    """
+    Crea de forma concurrente un índice declarado en los modelos, con el
+    predicado de `postgresql_where` si es parcial. `where` reemplaza ese
+    predicado (por ejemplo, con el id de un estado resuelto al migrar).
+    """
+    if where is None:
+        predicate = index.dialect_options["postgresql"]["where"]
+        if predicate is not None:
+            where = str(predicate.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    create_index_concurrently(connection, index.name, index.table.name, [column.name for column in index.columns], where=where)
+
+
+def _model_index(model, name: str) -> Index:
+    return next(index for index in model.__table__.indexes if index.name == name)
+
+
+def _create_idempotency_table(connection: Connection):
+    IdempotencyKeys.__table__.create(bind=connection, checkfirst=True)
+
+
+def _create_composite_indexes(connection: Connection):
+    create_model_index(connection, _model_index(Plots, "ix_plots_farm_id_state_id"))
+    create_model_index(connection, _model_index(UserRoleFarm, "ix_user_role_farm_farm_state"))
+
+
+def _create_farm_summary_table(connection: Connection):
+    FarmSummary.__table__.create(bind=connection, checkfirst=True)
+    with Session(bind=connection) as db:
+        if not get_state(db, "Activo", "Plots") or not get_state(db, "Activo", "Farms"):
+            # Sin los estados no se puede calcular el resumen, pero la tabla sí queda creada para las
+            # migraciones siguientes; cada finca se resume al consultarla o con rebuild-farm-summaries
+            logger.warning("No se encontraron los estados 'Activo' para Plots y Farms; se omite el cálculo inicial de farm_summary")
+            return
+        rebuild_farm_summaries(db)
+
+
+def _create_coordinates_index(connection: Connection):
+    create_model_index(connection, _model_index(Plots, "ix_plots_latitude_longitude"))
+
+
+def _add_area_unit_hectares(connection: Connection):
+    connection.execute(text("ALTER TABLE area_units ADD COLUMN IF NOT EXISTS hectares_per_unit NUMERIC(20, 10)"))
+    units = connection.execute(
+        text("SELECT area_unit_id, name, abbreviation FROM area_units WHERE hectares_per_unit IS NULL")
+    ).all()
+    for area_unit_id, name, abbreviation in units:
+        factor = known_hectares_per_unit(name, abbreviation)
+        if factor is None:
+            # Queda sin factor hasta que se cargue a mano; sus fincas no se suman en las estadísticas de área
+            logger.warning(f"No se conoce la equivalencia en hectáreas de la unidad de área '{name}'")
+            continue
+        connection.execute(
+            text("UPDATE area_units SET hectares_per_unit = :factor WHERE area_unit_id = :area_unit_id"),
+            {"factor": factor, "area_unit_id": area_unit_id}
+        )
+
+
+# Índices de versiones anteriores de 0002 y 0003 que repetían otros índices de la misma tabla
+REDUNDANT_INDEXES = (
+    "ix_plots_farm_id_state_id_name",
+    "ix_plots_active_farm_id_name",
+    "ix_user_role_farm_role_farm_state",
+    "ix_user_role_farm_active_farm_role",
+)
+
+
+def _drop_redundant_indexes(connection: Connection):
+    # Las bases que aplicaron la versión anterior de 0002 no tienen todavía el índice que los reemplaza
+    _create_composite_indexes(connection)
+    for name in REDUNDANT_INDEXES:
+        logger.info(f"Eliminando el índice redundante '{name}'")
+        connection.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+
+
+def _create_idempotency_expiration_index(connection: Connection):
+    create_model_index(connection, _model_index(IdempotencyKeys, "ix_idempotency_keys_expires_at"))
+
+
+def _create_active_role_farm_index(connection: Connection):
+    # Los ids de los estados se buscan por nombre en todo el servicio, así que el
+    # predicado se construye con el id real de 'Activo' si difiere del declarado
+    active_state_id = connection.execute(
+        text("SELECT user_role_farm_state_id FROM user_role_farm_states WHERE name = 'Activo'")
+    ).scalar()
+    index = _model_index(UserRoleFarm, "ix_user_role_farm_active_role_farm")
+    if active_state_id is None:
+        logger.warning(f"No se encontró el estado 'Activo' en {UserRoleFarmStates.__tablename__}; el índice parcial usa el id declarado en el modelo")
+        create_model_index(connection, index)
+        return
+    create_model_index(connection, index, where=f"user_role_farm_state_id = {int(active_state_id)}")
+
+
+def _extension_schema(connection: Connection, extension: str) -> Optional[str]:
+    return connection.execute(
+        text("SELECT extnamespace::regnamespace::text FROM pg_extension WHERE extname = :name"),
+        {"name": extension}
+    ).scalar()
+
+
+def _create_name_search_indexes(connection: Connection):
+    available = set(connection.execute(
+        text("SELECT name FROM pg_available_extensions WHERE name IN ('pg_trgm', 'unaccent')")
+    ).scalars())
+    if available != {"pg_trgm", "unaccent"}:
+        # La búsqueda por nombre usa entonces el índice en memoria (utils/trigram_index.py)
+        logger.warning("El servidor no tiene las extensiones pg_trgm y unaccent; se omiten los índices de búsqueda por nombre")
+        return
+    connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    connection.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+    unaccent_schema = _extension_schema(connection, "unaccent")
+    trgm_schema = _extension_schema(connection, "pg_trgm")
+    # unaccent() es STABLE (depende del diccionario configurado) y no puede usarse en un índice;
+    # este envoltorio fija el diccionario y se declara IMMUTABLE
+    connection.execute(text(
+        "CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT "
+        f"AS $$ SELECT {unaccent_schema}.unaccent('{unaccent_schema}.unaccent'::regdictionary, $1) $$"
+    ))
+    for name, table in (("ix_farms_name_trgm", "farms"), ("ix_plots_name_trgm", "plots")):
+        create_index_concurrently(
+            connection, name, table, [f"(lower(immutable_unaccent(name))) {trgm_schema}.gin_trgm_ops"], using="gin"
+        )
+
+
+MIGRATIONS: List[Migration] = [
+    Migration("0001", "Tabla de claves de idempotencia", _create_idempotency_table),
+    Migration("0002", "Índices compuestos de plots y user_role_farm", _create_composite_indexes),
+    Migration("0004", "Tabla farm_summary con el resumen de lotes por finca", _create_farm_summary_table),
+    Migration("0005", "Índice de coordenadas de plots", _create_coordinates_index),
+    Migration("0006", "Equivalencia en hectáreas de las unidades de área", _add_area_unit_hectares),
+    Migration("0007", "Índices de trigramas para buscar fincas y lotes por nombre", _create_name_search_indexes),
+    Migration("0008", "Elimina índices redundantes de plots y user_role_farm", _drop_redundant_indexes),
+    Migration("0009", "Índice de expiración de idempotency_keys", _create_idempotency_expiration_index),
+    Migration("0010", "Índice parcial de los roles activos en user_role_farm", _create_active_role_farm_index),
+]
+
+
+def get_applied_versions(connection: Connection) -> set:
+    return set(connection.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+
+def run_migrations(engine, migrations: Optional[List[Migration]] = None) -> List[str]:
+    """
+    Aplica, en orden, las migraciones que aún no figuran en `schema_migrations`.
+
+    Solo un worker migra a la vez: si otro ya tiene el advisory lock, este
+    arranca sin esperar. Si una migración falla se registra el error y se
+    detiene el proceso, para no aplicar las siguientes fuera de orden; se
+    reintentará en el próximo arranque.
+
+    Returns:
+        List[str]: Versiones aplicadas en esta ejecución.
+    """
+    migrations = MIGRATIONS if migrations is None else migrations
+    applied_now = []
+    try:
+        with engine.connect() as connection:
+            connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+            if not connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": MIGRATIONS_LOCK_KEY}).scalar():
+                logger.info("Otro proceso está aplicando las migraciones; se omiten")
+                return applied_now
+            try:
+                connection.execute(text(CREATE_MIGRATIONS_TABLE))
+                applied = get_applied_versions(connection)
+                for migration in migrations:
+                    if migration.version in applied:
+                        continue
+                    logger.info(f"Aplicando la migración {migration.version}: {migration.description}")
+                    migration.apply(connection)
+                    connection.execute(
+                        text("INSERT INTO schema_migrations (version, description) VALUES (:version, :description)"),
+                        {"version": migration.version, "description": migration.description}
+                    )
+                    applied_now.append(migration.version)
+            finally:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATIONS_LOCK_KEY})
+    except Exception as e:
+        logger.error(f"Error al aplicar las migraciones: {str(e)}")
+    return applied_now
@@ -1,9 +1,12 @@
 from fastapi.responses import ORJSONResponse
 from datetime import datetime, date, time
 from uuid import UUID
-from typing import Any, Optional
+from typing import Any, Mapping, Optional
 from pydantic import BaseModel
 from decimal import Decimal
+from starlette.background import BackgroundTask
+import msgpack
+from utils.content_negotiation import MSGPACK_MEDIA_TYPE, get_response_media_type
 
 def process_data_for_json(value: Any) -> Any:
     """
@@ -40,6 +43,33 @@ def process_data_for_json(value: Any) -> Any:
     # Leave other types as-is
     return value
 
+class NegotiatedResponse(ORJSONResponse):
+    """
+    Respuesta que se serializa como JSON (ORJSON) o como MessagePack según
+    lo que haya pedido el cliente en el encabezado `Accept`.
+
+    Se usa como clase de respuesta por defecto de la aplicación, de modo que
+    los endpoints que retornan modelos o diccionarios también la respetan.
+    """
+
+    def __init__(
+        self,
+        content: Any = None,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+        background: Optional[BackgroundTask] = None,
+    ) -> None:
+        if media_type is None:
+            media_type = get_response_media_type()
+        super().__init__(content, status_code, headers, media_type, background)
+        self.headers.add_vary_header("Accept")
+
+    def render(self, content: Any) -> bytes:
+        if self.media_type == MSGPACK_MEDIA_TYPE:
+            return msgpack.packb(content, use_bin_type=True)
+        return super().render(content)
+
 def create_response(
     status: str,
     message: str,
@@ -47,8 +77,9 @@ def create_response(
     status_code: int = 200
 ) -> ORJSONResponse:
     """
-    Crea una respuesta JSON rápida y robusta con ORJSON,
-    procesando tipos especiales y permitiendo serializar:
+    Crea una respuesta JSON rápida y robusta con ORJSON (o MessagePack si el
+    cliente envió `Accept: application/msgpack`), procesando tipos especiales
+    y permitiendo serializar:
       - BaseModel (Pydantic)
       - Decimal
       - datetime, date, time
@@ -62,12 +93,12 @@ def create_response(
         status_code (int): Código HTTP (por defecto 200).
 
     Returns:
-        ORJSONResponse: Respuesta con JSON ultra-rápido.
+        ORJSONResponse: Respuesta con JSON ultra-rápido (o MessagePack).
     """
     
     processed = process_data_for_json(data) if data is not None else {}
 
-    return ORJSONResponse(
+    return NegotiatedResponse(
         status_code=status_code,
         content={
             "status": status,
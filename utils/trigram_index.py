@@ -0,0 +1,103 @@
+from typing import Dict, Hashable, List, Set, Tuple
+import re
+import unicodedata
+
+_NON_ALPHANUMERIC = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_name(value: str) -> str:
+    """
+    Sin tildes y en minúsculas, igual que `lower(immutable_unaccent(...))` en
+    Postgres, para comparar nombres sin distinguir mayúsculas ni acentos.
+    """
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def name_trigrams(normalized: str) -> Set[str]:
+    """
+    Trigramas de un texto ya normalizado con las reglas de pg_trgm: cada
+    palabra (secuencia alfanumérica) se rellena con dos espacios al inicio y
+    uno al final.
+    """
+    trigrams = set()
+    for word in _NON_ALPHANUMERIC.split(normalized):
+        if word:
+            padded = f"  {word} "
+            trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+def trigram_similarity(first: str, second: str) -> float:
+    """Equivalente a `similarity()` de pg_trgm: trigramas compartidos sobre trigramas distintos de ambos textos."""
+    first_trigrams = name_trigrams(normalize_name(first))
+    second_trigrams = name_trigrams(normalize_name(second))
+    if not first_trigrams or not second_trigrams:
+        return 0.0
+    shared = len(first_trigrams & second_trigrams)
+    return shared / (len(first_trigrams) + len(second_trigrams) - shared)
+
+
+def _substring_trigrams(normalized: str) -> Set[str]:
+    """Trigramas crudos (sin relleno): los de una subcadena siempre están entre los del texto completo."""
+    return {normalized[i:i + 3] for i in range(len(normalized) - 2)}
+
+
+class TrigramIndex:
+    """
+    Índice en memoria de nombres para búsqueda por subcadena sin distinguir
+    mayúsculas ni acentos, con resultados ordenados por similitud de
+    trigramas. Reproduce la búsqueda con índices GIN de pg_trgm cuando la
+    base no tiene esas extensiones (por ejemplo, en pruebas).
+
+    Un índice invertido trigrama -> claves reduce los candidatos a los
+    nombres que contienen todos los trigramas de la consulta; luego se
+    confirma la subcadena y se calcula la similitud.
+    """
+
+    def __init__(self):
+        self._names: Dict[Hashable, Tuple[str, str]] = {}
+        self._postings: Dict[str, Set[Hashable]] = {}
+
+    def add(self, key: Hashable, name: str):
+        self.remove(key)
+        normalized = normalize_name(name)
+        self._names[key] = (name, normalized)
+        for trigram in _substring_trigrams(normalized):
+            self._postings.setdefault(trigram, set()).add(key)
+
+    def remove(self, key: Hashable):
+        entry = self._names.pop(key, None)
+        if entry is None:
+            return
+        for trigram in _substring_trigrams(entry[1]):
+            keys = self._postings.get(trigram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[trigram]
+
+    def search(self, query: str) -> List[Tuple[Hashable, float]]:
+        """
+        Retorna las claves cuyo nombre contiene `query` como (clave, similitud),
+        de mayor a menor similitud.
+        """
+        normalized_query = normalize_name(query)
+        query_trigrams = _substring_trigrams(normalized_query)
+        if query_trigrams:
+            postings = sorted((self._postings.get(trigram, set()) for trigram in query_trigrams), key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+        else:
+            # Consultas de menos de tres caracteres: no hay trigramas con qué filtrar
+            candidates = set(self._names)
+
+        matches = [
+            (key, trigram_similarity(self._names[key][0], query))
+            for key in candidates
+            if normalized_query in self._names[key][1]
+        ]
+        matches.sort(key=lambda match: -match[1])
+        return matches
+
+    def __len__(self) -> int:
+        return len(self._names)